@@ -0,0 +1,146 @@
+import argparse
+import hashlib
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.snapshot import write_snapshot
+
+# Generates a synthetic qBittorrent library as a snapshot file (the --record format),
+# for bench/mock_qbit.py or qb-tagger.py --replay. Shaped like a real seedbox: most
+# content is on one tracker, a share is cross-seeded to several, a few torrents are
+# unregistered or erroring, and file counts range from single files to rarred and
+# season pack releases.
+
+# (announce host, weight, private); the hosts match example_trackers.json, plus a
+# public tracker and a private one that isn't in trackers.json
+TRACKERS = [
+    ("tracker.stackoverflow.tech", 30, True),
+    ("tlz.digital", 20, True),
+    ("tracker.avistaz.to", 10, True),
+    ("tracker.cinemaz.to", 5, True),
+    ("tt.jumbo.torrenting.com", 10, True),
+    ("tracker.opentrackr.org", 20, False),
+    ("tracker.unlisted.example", 5, True),
+]
+
+WORKING_MESSAGES = ["", "", "", "This torrent is private"]
+UNREGISTERED_MESSAGES = ["Unregistered torrent", "Torrent not registered with this tracker", "torrent not found", "Trumped"]
+ERROR_MESSAGES = ["Connection timed out", "Service unavailable", "tracker is down"]
+
+CATEGORIES = ["", "sonarr", "radarr", "cross-seed", "manual"]
+
+TRACKER_STATUS_WORKING = 2
+TRACKER_STATUS_NOT_WORKING = 4
+
+def pick_tracker(r):
+    return r.choices(TRACKERS, weights=[weight for _, weight, _ in TRACKERS])[0]
+
+def release(r, i):
+    # name and file list of one piece of content
+    title = f"Synthetic.Title.{i}"
+    kind = r.choices(["movie", "episode", "season", "rarred", "dangerous"], weights=[40, 35, 20, 4.9, 0.1])[0]
+    if kind == "movie":
+        name = f"{title}.{r.randint(1970, 2025)}.1080p.BluRay.x264-GRP"
+        files = [f"{name}/{name}.mkv"] + [f"{name}/{extra}" for extra in r.sample(["sample.mkv", f"{name}.nfo", "subs/en.srt"], r.randint(0, 3))]
+    elif kind == "episode":
+        name = f"{title}.S{r.randint(1, 12):02d}E{r.randint(1, 24):02d}.1080p.WEB.h264-GRP"
+        files = [f"{name}.mkv"]
+    elif kind == "season":
+        season = r.randint(1, 12)
+        name = f"{title}.S{season:02d}.1080p.WEB.h264-GRP"
+        files = [f"{name}/{title}.S{season:02d}E{e:02d}.1080p.WEB.h264-GRP.mkv" for e in range(1, r.randint(6, 24) + 1)]
+    elif kind == "rarred":
+        name = f"{title}.{r.randint(1970, 2025)}.720p.HDTV.x264-GRP"
+        files = [f"{name}/{name}.rar"] + [f"{name}/{name}.r{n:02d}" for n in range(r.randint(10, 60))]
+    else:
+        name = f"{title}.2024.1080p.WEB.h264-GRP"
+        files = [f"{name}/{name}.mkv", f"{name}/codec.scr"]
+    return name, [{"index": n, "name": f, "size": r.randint(50, 4000) * 1024 * 1024} for n, f in enumerate(files)]
+
+def tracker_list(r, host, private):
+    # the pseudo-trackers qBittorrent always lists first, then the real one
+    trackers = [
+        {"url": "** [DHT] **", "tier": -1, "status": TRACKER_STATUS_WORKING if not private else 0, "msg": "" if not private else "This torrent is private"},
+        {"url": "** [PeX] **", "tier": -1, "status": TRACKER_STATUS_WORKING if not private else 0, "msg": "" if not private else "This torrent is private"},
+        {"url": "** [LSD] **", "tier": -1, "status": TRACKER_STATUS_WORKING if not private else 0, "msg": "" if not private else "This torrent is private"},
+    ]
+    roll = r.random()
+    if roll < 0.02:
+        status, msg = TRACKER_STATUS_NOT_WORKING, r.choice(UNREGISTERED_MESSAGES)
+    elif roll < 0.04:
+        status, msg = TRACKER_STATUS_NOT_WORKING, r.choice(ERROR_MESSAGES)
+    else:
+        status, msg = TRACKER_STATUS_WORKING, r.choice(WORKING_MESSAGES) if private else ""
+    # one passkey per tracker, so every torrent on a tracker shares its announce URL
+    passkey = hashlib.md5(host.encode()).hexdigest()
+    trackers.append({"url": f"https://{host}/{passkey}/announce", "tier": 0, "status": status, "msg": msg})
+    return trackers
+
+def generate(count, seed=1, save_path="/data/torrents/", now=None):
+    r = random.Random(seed)
+    now = now or time.time()
+    torrents, trackers, files = {}, {}, {}
+    i = 0
+    while len(torrents) < count:
+        name, content_files = release(r, i)
+        size = sum(f["size"] for f in content_files)
+        multi_file = "/" in content_files[0]["name"]
+        content_path = os.path.join(save_path, name if multi_file else content_files[0]["name"])
+        category = r.choice(CATEGORIES)
+
+        # 70% on one tracker, the rest cross-seeded to 2-4; the first copy is the one
+        # that was downloaded, the others were added already complete
+        copies = 1 if r.random() < 0.7 else r.randint(2, 4)
+        hosts = r.sample(TRACKERS, min(copies, len(TRACKERS)))
+        added_on = now - r.randint(0, 365) * 86400 - r.randint(0, 86400)
+        for copy, (host, _, private) in enumerate(hosts):
+            if len(torrents) >= count:
+                break
+            h = hashlib.sha1(f"{seed}:{i}:{copy}".encode()).hexdigest()
+            complete = r.random() > 0.03
+            copy_added = added_on + copy * r.randint(60, 86400)
+            tracker = tracker_list(r, host, private)
+            working = any(t["tier"] >= 0 and t["status"] == TRACKER_STATUS_WORKING for t in tracker)
+            torrents[h] = {
+                "name": name,
+                "added_on": int(copy_added),
+                "completion_on": int(copy_added + r.randint(60, 7200)) if complete else -1,
+                "amount_left": 0 if complete else r.randint(1, size),
+                "downloaded": (size if complete else r.randint(0, size)) if copy == 0 else 0,
+                "size": size,
+                "content_path": content_path,
+                "save_path": save_path,
+                "category": category if copy == 0 else "cross-seed",
+                "tags": "",
+                "state": ("stalledUP" if r.random() < 0.8 else "uploading") if complete else "stalledDL",
+                "force_start": r.random() < 0.01,
+                "dlspeed": 0 if complete else r.randint(0, 10 * 1024 * 1024),
+                "up_limit": 0,
+                "num_complete": r.randint(0, 200),
+                "private": private,
+                "tracker": tracker[-1]["url"] if working else "",
+                "trackers_count": 1,
+            }
+            trackers[h] = tracker
+            files[h] = content_files
+        i += 1
+    return torrents, trackers, files
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic qBittorrent library snapshot.")
+    parser.add_argument("count", type=int, help="Number of torrents, e.g. 1000 to 1000000.")
+    parser.add_argument("-o", "--output", default=None, help="Snapshot path. Defaults to bench/library-COUNT.json.gz.")
+    parser.add_argument("-s", "--seed", default=1, type=int, help="Random seed; the same seed and count give the same library.")
+    parser.add_argument("--save-path", default="/data/torrents/", help="save_path of every torrent.")
+    args = parser.parse_args()
+
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(__file__)), f"library-{args.count}.json.gz")
+    now = time.time()
+    start = time.perf_counter()
+    torrents, trackers, files = generate(args.count, args.seed, args.save_path, now)
+    write_snapshot(output, now, "v5.0.0", torrents, trackers, files)
+    print(f"Generated {len(torrents)} torrents ({sum(len(f) for f in files.values())} files) in {time.perf_counter() - start:.1f}s: {output}")
@@ -0,0 +1,200 @@
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.snapshot import load_snapshot
+
+# Stand-in for the qBittorrent WebUI API, serving a snapshot (from --record or
+# bench/generate_library.py) so Phase 1 and the write path can be benchmarked without
+# a real server. Covers what qb-tagger uses: login, version, torrents/info, trackers,
+# files, sync/maindata, the tag, upload limit and category writes, and export/delete.
+#
+# Latency is added to every API call, and server_threads caps how many calls are
+# handled at once: qBittorrent runs its WebUI on one thread, so 1 (the default)
+# reproduces its serialization.
+
+class MockQBit:
+
+    def __init__(self, snapshot, latency_ms=0, jitter_ms=0, server_threads=1):
+        self.torrents = {h: dict(fields) for h, fields in snapshot["torrents"].items()}
+        self.trackers = snapshot["trackers"]
+        self.files = snapshot["files"]
+        self.app_version = snapshot.get("app_version") or "v5.0.0"
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.slots = threading.Semaphore(server_threads) if server_threads > 0 else None
+        self.lock = threading.Lock()
+        self.calls = {}
+
+        # sync/maindata: every write bumps rid and remembers which fields of which
+        # torrents changed, so a client passing its last rid gets just those
+        self.rid = 1
+        self.changes = []           # (rid, hash, field name)
+        self.removed = []           # (rid, hash)
+
+    def handle(self, endpoint, params):
+        with self.lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+        if self.slots:
+            self.slots.acquire()
+        try:
+            if self.latency or self.jitter:
+                time.sleep(self.latency + random.uniform(0, self.jitter))
+            with self.lock:
+                return self.route(endpoint, params)
+        finally:
+            if self.slots:
+                self.slots.release()
+
+    def route(self, endpoint, params):
+        # returns (status, body); bodies that aren't str are sent as JSON
+        if endpoint == "auth/login":
+            return 200, "Ok."
+        if endpoint == "auth/logout":
+            return 200, ""
+        if endpoint == "app/version":
+            return 200, self.app_version
+        if endpoint == "app/webapiVersion":
+            return 200, "2.11.2"
+        if endpoint == "torrents/info":
+            return 200, self.torrents_info(params)
+        if endpoint in ("torrents/trackers", "torrents/files"):
+            source = self.trackers if endpoint == "torrents/trackers" else self.files
+            h = params.get("hash", "")
+            if h not in source or h not in self.torrents:
+                return 404, "Torrent hash was not found"
+            return 200, source[h]
+        if endpoint == "sync/maindata":
+            return 200, self.maindata(int(params.get("rid") or 0))
+        if endpoint in ("torrents/addTags", "torrents/removeTags"):
+            tags = [t.strip() for t in params.get("tags", "").split(",") if t.strip()]
+            for h in self.hashes(params):
+                current = [t.strip() for t in self.torrents[h]["tags"].split(",") if t.strip()]
+                if endpoint == "torrents/addTags":
+                    current += [t for t in tags if t not in current]
+                else:
+                    current = [t for t in current if t not in tags]
+                self.write(h, "tags", ", ".join(current))
+            return 200, ""
+        if endpoint == "torrents/setUploadLimit":
+            for h in self.hashes(params):
+                self.write(h, "up_limit", int(params.get("limit", 0)))
+            return 200, ""
+        if endpoint == "torrents/setCategory":
+            for h in self.hashes(params):
+                self.write(h, "category", params.get("category", ""))
+            return 200, ""
+        if endpoint == "torrents/export":
+            h = params.get("hash", "")
+            if h not in self.torrents:
+                return 404, "Torrent hash was not found"
+            name = self.torrents[h]["name"]
+            return 200, f"d4:infod4:name{len(name)}:{name}ee"  # just enough of a .torrent for backups
+        if endpoint == "torrents/delete":
+            for h in self.hashes(params):
+                del self.torrents[h]
+                self.rid += 1
+                self.removed.append((self.rid, h))
+            return 200, ""
+        return 404, f"Unknown endpoint {endpoint}"
+
+    def hashes(self, params):
+        hashes = params.get("hashes", "")
+        if hashes == "all":
+            return list(self.torrents)
+        return [h for h in hashes.split("|") if h in self.torrents]
+
+    def write(self, h, field, value):
+        self.torrents[h][field] = value
+        self.rid += 1
+        self.changes.append((self.rid, h, field))
+
+    def torrents_info(self, params):
+        torrents = [dict(fields, hash=h) for h, fields in self.torrents.items()]
+        if params.get("hashes"):
+            wanted = set(params["hashes"].split("|"))
+            torrents = [t for t in torrents if t["hash"] in wanted]
+        if params.get("sort"):
+            torrents.sort(key=lambda t: t.get(params["sort"], 0), reverse=params.get("reverse") == "true")
+        offset = int(params.get("offset") or 0)
+        limit = int(params.get("limit") or 0)
+        return torrents[offset:offset + limit] if limit > 0 else torrents[offset:]
+
+    def maindata(self, rid):
+        if rid <= 0 or rid > self.rid:
+            return {"rid": self.rid, "full_update": True, "torrents": self.torrents, "categories": {}, "tags": [], "server_state": {}}
+        torrents = {}
+        for change_rid, h, field in self.changes:
+            if change_rid > rid and h in self.torrents:
+                torrents.setdefault(h, {})[field] = self.torrents[h][field]
+        removed = [h for change_rid, h in self.removed if change_rid > rid]
+        return {"rid": self.rid, "torrents": torrents, "torrents_removed": removed}
+
+
+class Handler(BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"   # keep-alive, like the real WebUI
+    disable_nagle_algorithm = True  # headers and body go out separately; don't wait on delayed ACKs
+
+    def do_GET(self):
+        self.dispatch(b"")
+
+    def do_POST(self):
+        self.dispatch(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+
+    def dispatch(self, body):
+        url = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        params.update({k: v[-1] for k, v in parse_qs(body.decode()).items()})
+        endpoint = url.path.removeprefix("/api/v2/")
+        status, payload = self.server.mock.handle(endpoint, params)
+        if isinstance(payload, str):
+            data, content_type = payload.encode(), "text/plain; charset=UTF-8"
+        else:
+            data, content_type = json.dumps(payload).encode(), "application/json"
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        if endpoint == "auth/login":
+            self.send_header("Set-Cookie", "SID=mock; HttpOnly; path=/")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass  # one line per request would swamp the benchmark output
+
+
+def serve(mock, host="127.0.0.1", port=0):
+    # Start the server on a background thread; port 0 picks a free port. Returns the
+    # server, whose server_address has the actual port.
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.mock = mock
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a library snapshot through a mock qBittorrent WebUI API.")
+    parser.add_argument("snapshot", help="Snapshot from qb-tagger.py --record or bench/generate_library.py.")
+    parser.add_argument("-p", "--port", default=8080, type=int)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--latency-ms", default=0, type=float, help="Added to every API call.")
+    parser.add_argument("--jitter-ms", default=0, type=float, help="Random extra latency, up to this much.")
+    parser.add_argument("--server-threads", default=1, type=int, help="API calls handled at once; 1 serializes them like qBittorrent, 0 is unlimited.")
+    args = parser.parse_args()
+
+    mock = MockQBit(load_snapshot(args.snapshot), args.latency_ms, args.jitter_ms, args.server_threads)
+    server = serve(mock, args.host, args.port)
+    print(f"Serving {len(mock.torrents)} torrents on http://{args.host}:{server.server_address[1]} (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        print(f"API calls: {json.dumps(mock.calls, sort_keys=True)}")
@@ -0,0 +1,91 @@
+import argparse
+import ast
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.config import ConfigManager
+from src.torrentmanager import TorrentManager
+from src import util
+
+from generate_library import generate
+from mock_qbit import MockQBit, serve
+
+# Measures how get_torrents (Phase 1), analyze_torrents and update_torrents scale with
+# library size and fetch_workers, against bench/mock_qbit.py serving a synthetic
+# library. Every run starts from a fresh copy of the library, so each one has the same
+# tag and limit writes to make.
+
+def load_default_config():
+    # default_config lives in qb-tagger.py's main block; read it from the source so the
+    # benchmark always runs with the same settings as the real script
+    with open(os.path.join(ROOT, "qb-tagger.py")) as f:
+        tree = ast.parse(f.read())
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Assign) and getattr(node.targets[0], "id", None) == "default_config":
+            return OrderedDict(ast.literal_eval(node.value.args[0]))
+    raise RuntimeError("default_config not found in qb-tagger.py")
+
+def run(snapshot, workers, args):
+    mock = MockQBit(snapshot, args.latency_ms, args.jitter_ms, args.server_threads)
+    server = serve(mock)
+
+    config_manager = ConfigManager(os.path.join(tempfile.gettempdir(), "qb-tagger-bench.yaml"), load_default_config())
+    config = config_manager.config
+    config["server"] = "127.0.0.1"
+    config["port"] = server.server_address[1]
+    config["username"] = ""
+    config["tracker_config"] = os.path.join(ROOT, "example_trackers.json")
+    config["cache_dir"] = args.cache_dir
+    config["fetch_workers"] = workers
+    config["fetch_backend"] = args.backend
+    config["page_size"] = args.page_size
+    config["adaptive_concurrency"]["enabled"] = args.adaptive
+    util.Config_Manager = config_manager
+    util.Current_Time = snapshot["recorded_at"]
+
+    timings = {}
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        manager = TorrentManager(False, True, ["update-tags"])
+        for phase in ("get_torrents", "analyze_torrents", "update_torrents"):
+            start = time.perf_counter()
+            getattr(manager, phase)()
+            timings[phase] = time.perf_counter() - start
+    server.shutdown()
+    server.server_close()
+    reads = sum(count for endpoint, count in mock.calls.items() if endpoint in ("torrents/info", "torrents/trackers", "torrents/files", "sync/maindata"))
+    return timings, reads, sum(mock.calls.values()) - reads
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark qb-tagger against a mock qBittorrent with synthetic libraries.")
+    parser.add_argument("--sizes", default=[1000, 10000], type=int, nargs="+", help="Library sizes (number of torrents).")
+    parser.add_argument("--workers", default=[1, 2, 4, 8, 16], type=int, nargs="+", help="fetch_workers values to try.")
+    parser.add_argument("--latency-ms", default=1, type=float, help="Mock server latency per API call.")
+    parser.add_argument("--jitter-ms", default=0, type=float, help="Random extra latency per API call, up to this much.")
+    parser.add_argument("--server-threads", default=1, type=int, help="API calls the mock handles at once (1 = serialized like qBittorrent, 0 = unlimited).")
+    parser.add_argument("--backend", default="threads", choices=("threads", "async"), help="fetch_backend to use.")
+    parser.add_argument("--adaptive", default=False, action="store_true", help="Let adaptive_concurrency pick the concurrency instead of fetch_workers.")
+    parser.add_argument("--page-size", default=0, type=int, help="page_size to use (0 = one sync/maindata call).")
+    parser.add_argument("--cache-dir", default="", help="cache_dir to use; empty (default) measures uncached runs.")
+    parser.add_argument("--seed", default=1, type=int)
+    args = parser.parse_args()
+
+    print(f"{'torrents':>9} {'workers':>7} {'phase 1':>9} {'torrents/s':>10} {'analyze':>9} {'update':>9} {'reads':>8} {'writes':>7}")
+    for size in args.sizes:
+        now = time.time()
+        torrents, trackers, files = generate(size, args.seed, now=now)
+        snapshot = {"recorded_at": now, "app_version": "v5.0.0", "torrents": torrents, "trackers": trackers, "files": files}
+        for workers in args.workers:
+            timings, reads, writes = run(snapshot, workers, args)
+            phase1 = timings["get_torrents"]
+            print(
+                f"{size:>9} {workers:>7} {phase1:>8.2f}s {size / phase1:>10.0f} "
+                f"{timings['analyze_torrents']:>8.2f}s {timings['update_torrents']:>8.2f}s {reads:>8} {writes:>7}"
+            )
@@ -1,5 +1,6 @@
 
 import argparse
+import time
 from collections import OrderedDict
 
 from src.config import ConfigManager
@@ -20,8 +21,25 @@ if __name__ == "__main__":
     parser.add_argument("-o", "--output-hash", default=None, help="Torrent hash or hashes (comma separated) for which to print TorrentInfo.")
     parser.add_argument("-e", "--output-extended", default=False, action="store_true", help="Print extended output. Only works when -o is used.")
     parser.add_argument("-op", "--operation", default=None, choices=('update-tags', 'move-orphaned', 'auto-delete'), action="append", help="Execution mode.")
+    parser.add_argument("-i", "--interval", default=0, type=int, help="Keep running, repeating every INTERVAL minutes. Later cycles only refetch torrents that changed.")
+    parser.add_argument("--record", default=None, metavar="SNAPSHOT", help="Save the torrent list, trackers and files fetched from qBittorrent to a compressed snapshot file.")
+    parser.add_argument("--replay", default=None, metavar="SNAPSHOT", help="Analyze a snapshot saved with --record instead of connecting to qBittorrent. Always a dry run.")
+    parser.add_argument("--plan", default=None, metavar="PLAN", help="Write every change (tags, limits, categories, auto-deletes, orphan moves) to a plan file instead of making it.")
+    parser.add_argument("--apply", default=None, metavar="PLAN", help="Apply a plan written by --plan. Resumes where an interrupted apply stopped.")
 
     args = parser.parse_args()
+
+    # a plan run changes nothing itself, so it always runs as if for real
+    if args.plan:
+        args.dry_run = False
+        args.interval = 0
+
+    # replays never touch qBittorrent; by default they exercise tagging and the orphan scan
+    if args.replay:
+        args.dry_run = not args.plan
+        args.interval = 0
+        if not args.operation:
+            args.operation = ['update-tags', 'move-orphaned']
     print(f"DRY-RUN: {args.dry_run}")
     print(f"CONFIG: {args.config}")
 
@@ -31,12 +49,132 @@ if __name__ == "__main__":
         ('username', ''),
         ('password', ''),
         ('tracker_config', 'trackers.json'),
-        # Number of parallel workers used to fetch per-torrent trackers/files in Phase 1.
-        # qBittorrent's WebUI tends to serialize API requests server-side, so high values
-        # add lock contention and can be slower; low values (2-4) are usually optimal.
-        # Tune per server: raise it only if your instance benefits from more concurrency.
+        # Directory for persistent caches (torrent file lists, ...). Empty to disable.
+        ('cache_dir', 'cache'),
+        # Number of parallel workers used to fetch per-torrent trackers/files in Phase 1
+        # when adaptive_concurrency is disabled. qBittorrent's WebUI tends to serialize API
+        # requests server-side, so high values add lock contention and can be slower; low
+        # values (2-4) are usually optimal. Tune per server.
         ('fetch_workers', 4),
+        # Let Phase 1 pick its own concurrency: start at 'initial' requests in flight, add
+        # one while throughput improves, halve on errors or when latency climbs without a
+        # throughput gain. The chosen level and latency percentiles are printed afterwards.
+        # Off by default: fetch_workers is used as a fixed limit.
+        ('adaptive_concurrency', {
+            'enabled': False,
+            'initial': 2,
+            'min': 1,
+            'max': 16
+        }),
+        # Phase 1 fetch backend. 'threads' uses fetch_workers threads sharing a pool of
+        # clients, one login and connection per request in flight. 'async' (requires
+        # aiohttp) uses a single login and a pooled keep-alive session of max_connections,
+        # with at most max_per_endpoint requests in flight per API endpoint (trackers,
+        # files).
+        ('fetch_backend', 'threads'),
+        ('async_fetch', {
+            'max_connections': 16,
+            'max_per_endpoint': 8
+        }),
+        # Stream the torrent list from qBittorrent in pages of this many torrents, fetching
+        # and processing each page before requesting the next. Keeps peak memory bounded on
+        # very large libraries, at the cost of the sync/maindata mirror used by --interval
+        # (every cycle becomes a full rebuild). 0 = off.
+        ('page_size', 0),
+        # When running with --interval, cycles after the first only rebuild torrents that
+        # changed in the sync/maindata delta. Every N cycles everything is rebuilt so state
+        # the delta doesn't carry (tracker messages, hardlinks) is refreshed. 0 = never.
+        # Between full refreshes, tracker messages are re-read only for torrents whose
+        # working tracker, tracker count or state changed; a message that changes alone
+        # (e.g. a tracker starting to report 'unregistered') can be up to N cycles stale.
+        ('full_refresh_cycles', 24),
+        # Retry failed trackers/files requests up to 'attempts' times with jittered
+        # exponential backoff. Up to max_failed_torrents torrents may still fail without
+        # aborting the run; delete decisions are then skipped for that run. Fetched results
+        # are checkpointed under cache_dir so a restarted run resumes where it stopped.
+        ('fetch_retry', {
+            'attempts': 4,
+            'backoff_seconds': 1,
+            'max_backoff_seconds': 30,
+            'max_failed_torrents': 0,
+            'checkpoint_max_age_minutes': 60
+        }),
+        # Tag, upload limit and category writes are grouped by value and sent for many
+        # torrents at once; this caps the number of torrent hashes per request to keep
+        # request bodies a safe size.
+        ('write_batch_size', 500),
+        # Writes (tag/limit/category batches, auto-deletes, --apply) run in parallel, up to
+        # max_in_flight requests at once and at most requests_per_second (0 = no limit).
+        # Writes to the same torrent always run in order, e.g. export before delete.
+        ('write_executor', {
+            'max_in_flight': 4,
+            'requests_per_second': 50
+        }),
+        # With tag_hardlink, hardlinks are detected in a stage of their own: files are
+        # grouped by directory, each directory is listed once, and directories are stat'ed
+        # on this many threads. Raise it for network filesystems and unRAID's FUSE layer.
+        ('hardlink_scan_workers', 8),
+        # The orphan scan lists the save paths' directories on this many threads, a level
+        # of the tree at a time, before working through them in order.
+        ('orphan_scan_workers', 8),
         ('path_mappings', []),
+        # Reuse cached tracker lists (stored under cache_dir) instead of calling
+        # torrents_trackers for every torrent. An entry is refetched once it is older than
+        # ttl_minutes, or bad_ttl_minutes for unregistered/erroring torrents, or as soon as
+        # the torrent's working tracker, tracker count or state changes. Tracker status
+        # (and so unregistered detection) can then be up to ttl_minutes old, so it's off
+        # by default.
+        ('tracker_cache', {
+            'enabled': False,
+            'ttl_minutes': 240,
+            'bad_ttl_minutes': 30
+        }),
+        # Keep snapshots of the save paths' directories (names and file stats, stored under
+        # cache_dir) for the orphan scan: a directory whose mtime hasn't changed since its
+        # snapshot isn't listed again, and its orphans are only worked out again if the
+        # torrent files in it changed. Snapshots of directories not seen for
+        # snapshot_days are dropped. Hardlink and inode checks never use snapshots, and
+        # files about to be moved or removed as orphans are always stat'ed again first.
+        ('stat_cache', {
+            'enabled': False,
+            'snapshot_days': 7
+        }),
+        # Tracker messages that mark a torrent unregistered: keywords match anywhere in
+        # the message, patterns are regular expressions; both ignore case. The number of
+        # torrents each rule matched is printed after Phase 1.
+        ('unregistered_messages', {
+            'keywords': [
+                "unregistered",
+                "not registered",
+                "pack out",
+                "complete season",
+                "dupe of",
+                "beyond-hd.me",
+                "infohash not found",
+                "tracker inactive",
+                "invalid infohash",
+                "unregistered torrent"
+            ],
+            'patterns': []
+        }),
+        # Extra tags, each added while its conditions hold and removed otherwise, e.g.
+        #   - tag: '#_big'
+        #     when: {size: {gt: 53687091200}, tracker_name: {in: [TL, AvistaZ]}}
+        # Conditions are TorrentInfo fields or torrent properties, compared with eq, ne,
+        # gt, gte, lt, lte, in, not_in, contains or matches (regex); a plain value means eq.
+        # See src/tagrules.py. report_timing prints the time spent in each rule.
+        ('tag_rules', {
+            'rules': [],
+            'report_timing': False
+        }),
+        # Cross-seeds are torrents sharing a content_path. by_content also groups torrents
+        # with the same files (relative path and size of each) wherever they're saved, and
+        # match_inode those whose largest file is the same file on disk (hardlinked copies,
+        # a cross-seed tool's link dir). Either needs every torrent's file list.
+        ('cross_seed_grouping', {
+            'by_content': False,
+            'match_inode': False
+        }),
         ('options', {
             'tag_hardlink': False   ,
             'remove_category_for_bad_torrents': False,
@@ -74,56 +212,88 @@ if __name__ == "__main__":
     config_manager.save() # save the file back to populate missing settings in config.yaml
     util.Config_Manager = config_manager
 
-    try:
-
-        # notification
-        notify = False
-        notification_config = util.Config_Manager.get('notification')
-        if notification_config['enabled'] and (not args.dry_run or notification_config['send_for_dry_run']):
-            notify_title = "QB-Tagger Summary"
-            notify_description = f"{'**DRY RUN**: ' if args.dry_run else ''}Running operations {args.operation}"
-            notify_webhook_url = notification_config['discord_webhook_url']
-            notify = True
-
-        # manager
-        manager = TorrentManager(args.dry_run, args.no_color)
-        manager.get_torrents()
-        manager.analyze_torrents()
-
-        # default, always update tags
-        if not args.operation or "update-tags" in args.operation:
-            manager.update_torrents()
-
-        # only run auto-delete when explicitly specified
-        if args.operation and "auto-delete" in args.operation:
-            manager.auto_delete_torrents()
-
-        # only run orphaned related tasks when explicitly specified
-        if args.operation and "move-orphaned" in args.operation:
-            manager.move_orphaned()
-            manager.remove_orphaned()
-
-        print()
-
-        if notify and args.operation and any(op in args.operation for op in ("move-orphaned", "auto-delete")):
-            util.send_discord_notification(notify_webhook_url, notify_title, notify_description, util.Discord_Summary)
-
-        if args.output_hash:
-            hash_list = [h.strip() for h in args.output_hash.split(",")]  # Split and strip whitespaces
-            for torrent_hash in hash_list:
-                torrent_info = manager.torrent_info_list.get(torrent_hash)
-                if torrent_info:
-                    print(torrent_info.to_str(args.output_extended))
-                else:
-                    print(f"\nWARNING: Torrent with hash {torrent_hash} not found.\n")
-
-        # surface any trackers missing from trackers.json as the final summary line
-        manager.warn_unmatched_trackers()
-
-    except Exception as e:
-        msg = f"{type(e).__name__} at line {e.__traceback__.tb_lineno} of {__file__}: {e}"
-        print("\n!!! Script failure !!!\n")
-        print(f"{msg}\n")
-        if notify:
-            util.Discord_Summary.append(("Script failure", msg))
-            util.send_discord_notification(notify_webhook_url, notify_title, notify_description, util.Discord_Summary)
+    manager = None
+    while True:
+
+        # per-cycle globals
+        util.Current_Time = time.time()
+        util.Discord_Summary.clear()
+
+        try:
+
+            # notification
+            notify = False
+            notification_config = util.Config_Manager.get('notification')
+            if notification_config['enabled'] and (not args.dry_run or notification_config['send_for_dry_run']) and not (args.replay or args.plan):
+                notify_title = "QB-Tagger Summary"
+                notify_description = f"{'**DRY RUN**: ' if args.dry_run else ''}Running operations {args.operation}"
+                notify_webhook_url = notification_config['discord_webhook_url']
+                notify = True
+
+            # apply a plan from an earlier --plan run, instead of analyzing
+            if args.apply:
+                manager = TorrentManager(args.dry_run, args.no_color)
+                manager.apply_plan(args.apply)
+                break
+
+            # manager
+            if manager is None:
+                manager = TorrentManager(args.dry_run, args.no_color, args.operation, args.replay, args.plan, bool(args.record))
+            manager.get_torrents()
+            if args.record:
+                manager.record_snapshot(args.record)
+            manager.analyze_torrents()
+
+            # default, always update tags
+            if not args.operation or "update-tags" in args.operation:
+                manager.update_torrents()
+
+            # only run auto-delete when explicitly specified
+            if args.operation and "auto-delete" in args.operation:
+                manager.auto_delete_torrents()
+
+            # only run orphaned related tasks when explicitly specified
+            if args.operation and "move-orphaned" in args.operation:
+                manager.move_orphaned()
+                manager.remove_orphaned()
+
+            if manager.plan_file:
+                manager.plan_file.close()
+                print(f"\nWrote {manager.plan_file.count} plan entries to '{args.plan}'. Run with --apply {args.plan} to apply them.")
+
+            print()
+
+            if notify and args.operation and any(op in args.operation for op in ("move-orphaned", "auto-delete")):
+                util.send_discord_notification(notify_webhook_url, notify_title, notify_description, util.Discord_Summary)
+
+            if args.output_hash:
+                hash_list = [h.strip() for h in args.output_hash.split(",")]  # Split and strip whitespaces
+                for torrent_hash in hash_list:
+                    torrent_info = manager.torrent_info_list.get(torrent_hash)
+                    if torrent_info:
+                        print(torrent_info.to_str(args.output_extended, manager.load_payload))
+                    else:
+                        print(f"\nWARNING: Torrent with hash {torrent_hash} not found.\n")
+
+            manager.save_stat_cache()
+            manager.commit_sync_state()
+
+            # surface any trackers missing from trackers.json as the final summary line
+            manager.warn_unmatched_trackers()
+
+        except Exception as e:
+            msg = f"{type(e).__name__} at line {e.__traceback__.tb_lineno} of {__file__}: {e}"
+            print("\n!!! Script failure !!!\n")
+            print(f"{msg}\n")
+            if notify:
+                util.Discord_Summary.append(("Script failure", msg))
+                util.send_discord_notification(notify_webhook_url, notify_title, notify_description, util.Discord_Summary)
+            # a one-shot run reports the failure in its exit status; with --interval the
+            # next cycle tries again
+            if not args.interval:
+                exit(1)
+
+        if not args.interval:
+            break
+        print(f"Next cycle in {args.interval} minutes...")
+        time.sleep(args.interval * 60)
@@ -0,0 +1,63 @@
+import json
+import os
+import time
+
+from qbittorrentapi import TrackersList, TorrentFilesList
+
+class FetchCheckpoint:
+
+    # Append-only record of Phase 1 fetch results, so a run that is interrupted or
+    # aborted can pick up where it stopped instead of refetching everything. JSON Lines,
+    # one [hash, trackers, files] record per line; a line cut short by a crash mid-write
+    # is skipped.
+    # The file is removed once a run fetches every torrent successfully.
+
+    FLUSH_EVERY = 200
+
+    def __init__(self, path, max_age_minutes):
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self.path = path
+        self.max_age = max_age_minutes * 60
+        self.file = None
+        self.pending = 0
+
+    def load(self):
+        # hash -> (TrackersList, TorrentFilesList) from a previous, unfinished run
+        results = {}
+        if not os.path.exists(self.path):
+            return results
+        if time.time() - os.path.getmtime(self.path) > self.max_age:
+            os.remove(self.path)  # too old to trust tracker state from it
+            return results
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    h, trackers, files = json.loads(line)
+                except ValueError:
+                    continue
+                results[h] = (TrackersList(trackers), TorrentFilesList(files) if files is not None else None)
+        return results
+
+    def append(self, torrent_hash, trackers, files):
+        if self.file is None:
+            self.file = open(self.path, "a")
+            if self.file.tell():
+                self.file.write("\n")  # in case the last run stopped mid-line
+        # files is None when the run didn't need the file list
+        self.file.write(json.dumps([torrent_hash, [dict(t) for t in trackers], [dict(f) for f in files] if files is not None else None]) + "\n")
+        self.pending += 1
+        if self.pending >= self.FLUSH_EVERY:
+            self.file.flush()
+            self.pending = 0
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def remove(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
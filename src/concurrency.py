@@ -0,0 +1,149 @@
+import asyncio
+import contextlib
+import threading
+import time
+
+class AIMDController:
+
+    # Picks Phase 1 fetch concurrency at runtime. Requests are grouped into windows;
+    # after each window the limit is raised by one while throughput keeps improving
+    # (additive increase), and cut in half when requests fail or latency balloons
+    # without any gain in throughput, which is what it looks like when qBittorrent
+    # starts serializing requests server-side (multiplicative decrease).
+
+    INCREASE_THRESHOLD = 1.05   # throughput must beat the best window by 5% to grow
+    LATENCY_TOLERANCE = 2.0     # median latency this many times the baseline = congested
+    DECREASE_FACTOR = 0.5
+
+    def __init__(self, initial, minimum, maximum):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = min(max(initial, self.minimum), self.maximum)
+        self.peak = self.limit
+        self.lock = threading.Lock()
+        self.latencies = []         # every request, for the end-of-phase report
+        self.errors = 0
+        self._window = []           # (latency, ok) since the last adjustment
+        self._window_start = None
+        self._best_throughput = 0.0
+        self._baseline_latency = None
+
+    def record(self, latency, ok):
+        with self.lock:
+            now = time.perf_counter()
+            if self._window_start is None:
+                self._window_start = now - latency
+            self.latencies.append(latency)
+            self._window.append((latency, ok))
+            if not ok:
+                self.errors += 1
+            # a window is a few rounds' worth of requests at the current limit
+            if len(self._window) >= max(8, self.limit * 4):
+                self._adjust(now)
+
+    def _adjust(self, now):
+        window, elapsed = self._window, max(now - self._window_start, 1e-6)
+        self._window = []
+        self._window_start = now
+
+        throughput = len(window) / elapsed
+        median = sorted(latency for latency, _ in window)[len(window) // 2]
+        failed = any(not ok for _, ok in window)
+        if self._baseline_latency is None or median < self._baseline_latency:
+            self._baseline_latency = median
+
+        congested = median > self._baseline_latency * self.LATENCY_TOLERANCE and throughput < self._best_throughput * self.INCREASE_THRESHOLD
+        if failed or congested:
+            self.limit = max(self.minimum, int(self.limit * self.DECREASE_FACTOR))
+            self._best_throughput = throughput  # re-learn from the new operating point
+        elif throughput >= self._best_throughput * self.INCREASE_THRESHOLD:
+            self._best_throughput = throughput
+            self.limit = min(self.maximum, self.limit + 1)
+        self.peak = max(self.peak, self.limit)
+
+    def percentile(self, p):
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+    def summary(self):
+        return (
+            f"Fetch concurrency: settled at {self.limit} (peak {self.peak}, range {self.minimum}-{self.maximum}); "
+            f"{len(self.latencies)} requests, {self.errors} errors; "
+            f"latency p50={self.percentile(50) * 1000:.0f}ms p90={self.percentile(90) * 1000:.0f}ms p99={self.percentile(99) * 1000:.0f}ms"
+        )
+
+
+class ThreadGate:
+
+    # Blocks worker threads so at most controller.limit requests are in flight
+
+    def __init__(self, controller):
+        self.controller = controller
+        self.in_flight = 0
+        self.condition = threading.Condition()
+
+    @contextlib.contextmanager
+    def request(self):
+        with self.condition:
+            while self.in_flight >= self.controller.limit:
+                self.condition.wait()
+            self.in_flight += 1
+        start = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self.controller.record(time.perf_counter() - start, ok)
+            with self.condition:
+                self.in_flight -= 1
+                self.condition.notify_all()
+
+
+class AsyncGate:
+
+    # asyncio counterpart of ThreadGate; must be created inside the running loop
+
+    def __init__(self, controller):
+        self.controller = controller
+        self.in_flight = 0
+        self.condition = asyncio.Condition()
+
+    @contextlib.asynccontextmanager
+    async def request(self):
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.in_flight < self.controller.limit)
+            self.in_flight += 1
+        start = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self.controller.record(time.perf_counter() - start, ok)
+            async with self.condition:
+                self.in_flight -= 1
+                self.condition.notify_all()
+
+
+class RateLimiter:
+
+    # Spaces requests evenly to stay under requests_per_second, across threads; a rate
+    # of 0 means unlimited
+
+    def __init__(self, requests_per_second):
+        self.interval = 1 / requests_per_second if requests_per_second > 0 else 0
+        self.next_slot = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self, requests=1):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_slot)
+            self.next_slot = start + self.interval * requests
+        if start > now:
+            time.sleep(start - now)
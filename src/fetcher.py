@@ -0,0 +1,272 @@
+import asyncio
+import contextlib
+import queue
+import random
+import threading
+import time
+import concurrent.futures
+from urllib.parse import urljoin, urlparse
+
+from qbittorrentapi import TrackersList, TorrentFilesList, NotFound404Error
+
+from .concurrency import ThreadGate, AsyncGate
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None  # only needed for fetch_backend: async
+
+# Phase 1 fetch backends. Both take jobs of (torrent_dict, trackers, files), where
+# trackers/files are None when they still need fetching, and yield results as
+# (hash, name, trackers, files, error) in completion order. Passing SKIP_FILES for
+# files leaves a file list that the run doesn't need unfetched. When given an
+# AIMDController, every request passes through its gate so the controller both
+# sets and measures the number of requests in flight.
+
+SKIP_FILES = object()
+
+def web_api_url(host, port):
+    # The WebUI base URL the way qbittorrentapi builds it from host and port: the
+    # scheme defaults to http, port is only added when host doesn't carry one, and any
+    # path in host (a reverse proxy's prefix) is kept. Always ends in "/", so
+    # urljoin(base, "api/v2/...") appends to the path.
+    if not host.lower().startswith(("http:", "https:", "//")):
+        host = "//" + host
+    url = urlparse(host)
+    if port is not None and not url.port:
+        url = url._replace(netloc=f"{url.netloc}:{port}")
+    url = url._replace(scheme=url.scheme.lower() or "http").geturl()
+    return url if url.endswith("/") else url + "/"
+
+class RetryPolicy:
+
+    # Per-request retries with "full jitter" exponential backoff: retry n waits a random
+    # time between 0 and min(max_backoff, backoff * 2**n), which spreads retries from
+    # many workers out instead of hammering a struggling server in lockstep.
+
+    def __init__(self, attempts, backoff, max_backoff):
+        self.attempts = max(1, attempts)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def delays(self):
+        # one delay per retry, then None for the final attempt
+        for attempt in range(self.attempts - 1):
+            yield random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+        yield None
+
+    @staticmethod
+    def retryable(e):
+        # a 404 means the torrent is gone; asking again won't bring it back
+        if isinstance(e, NotFound404Error):
+            return False
+        if aiohttp is not None and isinstance(e, aiohttp.ClientResponseError) and e.status == 404:
+            return False
+        return True
+
+
+class ThreadFetcher:
+
+    # qbittorrentapi wraps a requests.Session, which isn't safe to share across
+    # threads, so a client is only used by one request at a time. Clients are checked
+    # out of an idle pool once a request is through the gate and built (and logged in)
+    # only when the pool is empty, so there are never more clients than requests that
+    # were in flight at once: the controller's peak limit, not its ceiling.
+
+    def __init__(self, build_client, workers, controller=None, retry=None):
+        self.build_client = build_client
+        # with a controller, start enough threads for its ceiling and let the gate
+        # decide how many of them may talk to qBittorrent at once
+        self.workers = controller.maximum if controller else workers
+        self.controller = controller
+        self.retry = retry or RetryPolicy(1, 0, 0)
+        # the thread pool and the logged-in clients live across fetch() calls, so
+        # fetching page by page doesn't log in again for every page
+        self.executor = None
+        self.idle_clients = []
+        self.clients_lock = threading.Lock()
+        self.gate = ThreadGate(controller) if controller else None
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    @contextlib.contextmanager
+    def client(self):
+        with self.clients_lock:
+            client = self.idle_clients.pop() if self.idle_clients else None
+        if client is None:
+            client = self.build_client()
+        try:
+            yield client
+        finally:
+            with self.clients_lock:
+                self.idle_clients.append(client)
+
+    def fetch(self, jobs):
+        gate = self.gate
+
+        def request():
+            return gate.request() if gate else contextlib.nullcontext()
+
+        def call(method, h):
+            for delay in self.retry.delays():
+                try:
+                    with request(), self.client() as qb:
+                        return getattr(qb, method)(h)
+                except Exception as e:
+                    if delay is None or not self.retry.retryable(e):
+                        raise
+                    time.sleep(delay)
+
+        def fetch_one(job):
+            torrent_dict, trackers, files = job
+            h, name = torrent_dict.hash, torrent_dict.name
+            try:
+                if trackers is None:
+                    trackers = call("torrents_trackers", h)
+                if files is None:
+                    files = call("torrents_files", h)
+                return (h, name, trackers, files, None)
+            except Exception as e:
+                return (h, name, None, None, e)
+
+        if self.executor is None:
+            self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.workers)
+        futures = [self.executor.submit(fetch_one, job) for job in jobs]
+        for future in concurrent.futures.as_completed(futures):
+            yield future.result()
+
+
+class AsyncFetcher:
+
+    # Talks to the WebUI directly over one aiohttp session: a single login (one cookie
+    # jar) and a bounded keep-alive connection pool shared by every request, with a
+    # separate concurrency cap per endpoint so neither trackers nor files can starve
+    # the other. Responses are wrapped in the same qbittorrentapi list types that the
+    # threaded backend returns.
+
+    ENDPOINTS = ("trackers", "files")
+    DONE = object()     # queued after a fetch's last result
+
+    @staticmethod
+    def available():
+        return aiohttp is not None
+
+    def __init__(self, server, port, username, password, max_connections, max_per_endpoint, controller=None, retry=None):
+        self.base_url = web_api_url(server, port)
+        self.username = username
+        self.password = password
+        self.max_connections = max_connections
+        self.max_per_endpoint = max_per_endpoint
+        self.controller = controller
+        self.retry = retry or RetryPolicy(1, 0, 0)
+        self.loop = None
+        self.session = None
+
+    def fetch(self, jobs):
+        # The event loop runs on a helper thread for the fetcher's lifetime, so the
+        # session (and its login) is reused across fetch() calls. Results are handed
+        # back through a queue, so callers consume them incrementally just like the
+        # threaded backend. However _run ends, it finishes by queueing DONE (or the
+        # exception that stopped it), so a failure can't leave the caller waiting.
+        if self.loop is None:
+            self.loop = asyncio.new_event_loop()
+            self.loop_thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+            self.loop_thread.start()
+        jobs = list(jobs)
+        results = queue.Queue()
+        asyncio.run_coroutine_threadsafe(self._run_until_done(jobs, results.put), self.loop)
+        while True:
+            result = results.get()
+            if result is self.DONE:
+                return
+            if isinstance(result, BaseException):
+                raise result
+            yield result
+
+    def close(self):
+        if self.loop is None:
+            return
+        if self.session is not None:
+            asyncio.run_coroutine_threadsafe(self.session.close(), self.loop).result()
+            self.session = None
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.loop_thread.join()
+        self.loop.close()
+        self.loop = None
+
+    async def _run_until_done(self, jobs, emit):
+        try:
+            await self._run(jobs, emit)
+        except BaseException as e:
+            emit(e)
+            raise
+        else:
+            emit(self.DONE)
+
+    async def _run(self, jobs, emit):
+        if self.session is None:
+            self.semaphores = {endpoint: asyncio.Semaphore(self.max_per_endpoint) for endpoint in self.ENDPOINTS}
+            self.gate = AsyncGate(self.controller) if self.controller else None
+            connector = aiohttp.TCPConnector(limit=self.max_connections)
+            cookie_jar = aiohttp.CookieJar(unsafe=True)  # unsafe: allow cookies for bare IP hosts
+            timeout = aiohttp.ClientTimeout(total=300)
+            session = aiohttp.ClientSession(connector=connector, cookie_jar=cookie_jar, timeout=timeout)
+            try:
+                await self._login(session)
+            except Exception as e:
+                await session.close()
+                for torrent_dict, _, _ in jobs:
+                    emit((torrent_dict.hash, torrent_dict.name, None, None, e))
+                return
+            self.session = session
+
+        # Enough workers to keep every endpoint at its cap; the connector bounds how
+        # many of them are on the wire at once.
+        pending = iter(jobs)
+        workers = self.max_per_endpoint * len(self.ENDPOINTS)
+        if self.controller:
+            workers = max(workers, self.controller.maximum)
+
+        async def worker():
+            for job in pending:
+                emit(await self._fetch_one(self.session, self.semaphores, self.gate, job))
+
+        await asyncio.gather(*(worker() for _ in range(workers)))
+
+    async def _login(self, session):
+        # Installs that bypass auth for the host/LAN don't set credentials; skip login
+        if not self.username:
+            return
+        data = {"username": self.username, "password": self.password or ""}
+        async with session.post(urljoin(self.base_url, "api/v2/auth/login"), data=data) as response:
+            response.raise_for_status()
+            text = await response.text()
+            if text.strip() != "Ok.":
+                raise RuntimeError(f"qBittorrent login failed: {text.strip()}")
+
+    async def _get(self, session, semaphores, gate, endpoint, torrent_hash):
+        for delay in self.retry.delays():
+            try:
+                async with semaphores[endpoint], (gate.request() if gate else contextlib.nullcontext()):
+                    async with session.get(urljoin(self.base_url, f"api/v2/torrents/{endpoint}"), params={"hash": torrent_hash}) as response:
+                        response.raise_for_status()
+                        return await response.json(content_type=None)
+            except Exception as e:
+                if delay is None or not self.retry.retryable(e):
+                    raise
+                await asyncio.sleep(delay)
+
+    async def _fetch_one(self, session, semaphores, gate, job):
+        torrent_dict, trackers, files = job
+        h, name = torrent_dict.hash, torrent_dict.name
+        try:
+            if trackers is None:
+                trackers = TrackersList(await self._get(session, semaphores, gate, "trackers", h))
+            if files is None:
+                files = TorrentFilesList(await self._get(session, semaphores, gate, "files", h))
+            return (h, name, trackers, files, None)
+        except Exception as e:
+            return (h, name, None, None, e)
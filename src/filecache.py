@@ -0,0 +1,67 @@
+import os
+import sqlite3
+
+from qbittorrentapi import TorrentFilesList
+
+class FileCache:
+
+    # Persistent cache of per-torrent file lists, keyed by infohash. A torrent's file
+    # list never changes, so torrents_files() only needs calling once per hash ever.
+    # Only name, size and index are kept: that's all TorrentInfo and move_orphaned use.
+
+    QUERY_CHUNK = 500  # stay well below SQLite's host parameter limit
+
+    def __init__(self, path):
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " hash TEXT NOT NULL,"
+            " idx INTEGER NOT NULL,"
+            " name TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " PRIMARY KEY (hash, idx)"
+            ") WITHOUT ROWID"
+        )
+        self.conn.commit()
+
+    def load(self, hashes):
+        # hash -> TorrentFilesList for every requested hash the cache has seen
+        hashes = list(hashes)
+        rows_by_hash = {}
+        for i in range(0, len(hashes), self.QUERY_CHUNK):
+            chunk = hashes[i:i + self.QUERY_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            query = f"SELECT hash, idx, name, size FROM files WHERE hash IN ({placeholders}) ORDER BY hash, idx"
+            for h, idx, name, size in self.conn.execute(query, chunk):
+                rows_by_hash.setdefault(h, []).append({"index": idx, "name": name, "size": size})
+        return {h: TorrentFilesList(rows) for h, rows in rows_by_hash.items()}
+
+    def store(self, files_by_hash):
+        # Torrents still waiting on metadata report no files; don't cache those, so they
+        # get fetched again once qBittorrent knows the real file list.
+        rows = [
+            (h, file.get("index", i), file["name"], file["size"])
+            for h, files in files_by_hash.items()
+            for i, file in enumerate(files or [])
+        ]
+        if rows:
+            with self.conn:
+                self.conn.executemany("INSERT OR REPLACE INTO files (hash, idx, name, size) VALUES (?, ?, ?, ?)", rows)
+
+    def garbage_collect(self, live_hashes):
+        # Drop entries for torrents that no longer exist in qBittorrent
+        live_hashes = set(live_hashes)
+        stale = [h for (h,) in self.conn.execute("SELECT DISTINCT hash FROM files") if h not in live_hashes]
+        with self.conn:
+            for i in range(0, len(stale), self.QUERY_CHUNK):
+                chunk = stale[i:i + self.QUERY_CHUNK]
+                self.conn.execute(f"DELETE FROM files WHERE hash IN ({','.join('?' * len(chunk))})", chunk)
+        return len(stale)
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,62 @@
+import os
+import concurrent.futures
+from collections import defaultdict
+
+class HardlinkScanner:
+
+    # tag_hardlink as a stage of its own, instead of one os.stat per file while each
+    # TorrentInfo is built. Candidate files are grouped by directory and each directory is
+    # listed once through the run's stat store (src/statcache.py), which stats its files
+    # with os.scandir; link counts always come from this run's listings, never from
+    # snapshots of earlier runs. Directories are worked through on a thread pool.
+    # Every torrent's largest file is checked first; only torrents it didn't settle have
+    # their other files checked.
+
+    def __init__(self, context, workers):
+        self.context = context
+        self.workers = max(1, workers or 1)
+        self.directories = set()    # directories checked
+        self.files_checked = 0
+
+    def scan(self, torrent_infos):
+        # Sets is_hardlinked on each of torrent_infos; returns how many are hardlinked
+        candidates = []
+        for torrent_info in torrent_infos:
+            files = torrent_info.torrent_files
+            largest_first = sorted(range(len(files)), key=files.sizes.__getitem__, reverse=True)
+            paths = [os.path.join(torrent_info.save_path_host, files.names[i]) for i in largest_first]
+            torrent_info.is_hardlinked = False
+            if paths:
+                candidates.append((torrent_info, paths))
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as executor:
+            self.check([(torrent_info, paths[:1]) for torrent_info, paths in candidates], executor)
+            self.check([(torrent_info, paths[1:]) for torrent_info, paths in candidates if not torrent_info.is_hardlinked and len(paths) > 1], executor)
+        return sum(1 for torrent_info, _ in candidates if torrent_info.is_hardlinked)
+
+    def check(self, candidates, executor):
+        # one job per directory, stat'ing the names wanted from it
+        wanted = defaultdict(set)
+        for _, paths in candidates:
+            for path in paths:
+                directory, name = os.path.split(path)
+                wanted[directory].add(name)
+        nlinks = {}                 # path -> st_nlink, for the files that exist
+        for directory, found in zip(wanted, executor.map(self.stat_directory, wanted, wanted.values())):
+            for name, nlink in found.items():
+                nlinks[os.path.join(directory, name)] = nlink
+        self.directories.update(wanted)
+        self.files_checked += sum(len(names) for names in wanted.values())
+        for torrent_info, paths in candidates:
+            if any(nlinks.get(path, 0) > 1 for path in paths):
+                torrent_info.is_hardlinked = True
+
+    def stat_directory(self, directory, names):
+        # name -> st_nlink for those of names that exist in directory
+        stat_store = self.context.stat_store
+        found = {}
+        for name in names:
+            stat_result = stat_store.stat(os.path.join(directory, name))
+            if stat_result is not None:
+                found[name] = stat_result.st_nlink
+        return found
@@ -0,0 +1,39 @@
+import re
+
+class MessageClassifier:
+
+    # Tracker messages matched against the unregistered_messages config: keywords are
+    # plain substrings, patterns are regular expressions, both case-insensitive. All
+    # rules are compiled into one regex, one named group per rule, and results are
+    # memoized per message, since thousands of torrents share the same few messages.
+    # classify returns the rule that matched (its keyword, or the pattern in slashes),
+    # so the manager can report how often each rule fires.
+
+    def __init__(self, keywords, patterns):
+        self.rules = [keyword.lower() for keyword in keywords if keyword] + [f"/{pattern}/" for pattern in patterns if pattern]
+        alternatives = [re.escape(keyword.lower()) for keyword in keywords if keyword] + [pattern for pattern in patterns if pattern]
+        self.regex = None
+        if alternatives:
+            # invalid user patterns fail here, once, with the offending pattern named
+            for pattern in patterns:
+                if pattern:
+                    try:
+                        re.compile(pattern)
+                    except re.error as e:
+                        raise ValueError(f"invalid unregistered_messages pattern '{pattern}': {e}")
+            self.regex = re.compile("|".join(f"(?P<_rule{i}>{alt})" for i, alt in enumerate(alternatives)), re.IGNORECASE)
+        self.message_cache = {}     # message -> rule, or None
+
+    def match_message(self, message):
+        if message not in self.message_cache:
+            m = self.regex.search(message) if self.regex else None
+            self.message_cache[message] = self.rules[int(m.lastgroup[5:])] if m else None
+        return self.message_cache[message]
+
+    def classify(self, messages):
+        # the rule matching the first of messages that matches any, or None
+        for message in messages:
+            rule = self.match_message(message)
+            if rule is not None:
+                return rule
+        return None
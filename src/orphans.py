@@ -0,0 +1,152 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import concurrent.futures
+
+class PathTrie:
+
+    # Torrent files by directory: one node per path component, holding the names of
+    # the known files directly in it. Paths are split on os.sep with empty components
+    # dropped, so '/data//movies/' and '/data/movies' are the same directory.
+
+    __slots__ = ("dirs", "files")
+
+    def __init__(self):
+        self.dirs = {}
+        self.files = set()
+
+    def add(self, path):
+        *components, name = [c for c in path.split(os.sep) if c]
+        node = self
+        for component in components:
+            child = node.dirs.get(component)
+            if child is None:
+                child = node.dirs[component] = PathTrie()
+            node = child
+        node.files.add(name)
+
+    def find(self, directory):
+        # the node of directory, or None if no known file is under it
+        node = self
+        for component in directory.split(os.sep):
+            if component:
+                node = node.dirs.get(component)
+                if node is None:
+                    return None
+        return node
+
+class OrphanCache:
+
+    # The orphans found in each directory by the last orphan scans, stored under
+    # cache_dir with the directory's mtime and a digest of the torrent files known to
+    # be in it. While both match, the directory's orphans are taken from here instead
+    # of being worked out again. Rows not seen for snapshot_days are dropped. Paths are
+    # normalized with os.path.normpath, like the stat store's.
+
+    def __init__(self, path, snapshot_days):
+        self.max_age = snapshot_days * 24 * 60 * 60
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS dirs ("
+            " path TEXT PRIMARY KEY,"
+            " mtime_ns INTEGER NOT NULL,"
+            " known TEXT NOT NULL,"
+            " orphans TEXT NOT NULL,"
+            " checked_at REAL NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        self.conn.commit()
+
+    def load(self):
+        # directory -> (mtime_ns, known digest, orphan names)
+        return {
+            os.path.normpath(path): (mtime_ns, known, json.loads(orphans))
+            for path, mtime_ns, known, orphans in self.conn.execute("SELECT path, mtime_ns, known, orphans FROM dirs")
+        }
+
+    def save(self, results):
+        # results: directory -> (mtime_ns, known digest, orphan names)
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO dirs (path, mtime_ns, known, orphans, checked_at) VALUES (?, ?, ?, ?, ?)",
+                [(path, mtime_ns, known, json.dumps(orphans), now) for path, (mtime_ns, known, orphans) in results.items()])
+            self.conn.execute("DELETE FROM dirs WHERE checked_at < ?", (now - self.max_age,))
+
+    def close(self):
+        self.conn.close()
+
+class OrphanScanner:
+
+    # Finds the files under the save paths that belong to no torrent. The known files
+    # go into a PathTrie, so each directory is looked up once and its files are checked
+    # by name; a directory with no known file under it is all orphans without any
+    # checks. Directory listings come from the run's stat store (src/statcache.py),
+    # fetched breadth-first, a level at a time, on a thread pool, so every save path
+    # and subtree is listed in parallel; the stat taken while listing gives both the
+    # age and the size of an orphan.
+    #
+    # With an OrphanCache the scan is incremental: a directory whose listing is
+    # unchanged since it was last persisted (same mtime) and whose known files are the
+    # same reuses the orphans found last time. Every directory is still stat'ed once;
+    # a change deep in a tree doesn't change its parents' mtimes, so no subtree can be
+    # skipped on its parent's mtime alone.
+
+    def __init__(self, stat_store, workers, orphan_cache=None):
+        self.stat_store = stat_store
+        self.workers = max(1, workers or 1)
+        self.known = PathTrie()
+        self.orphan_cache = orphan_cache
+        self.previous = orphan_cache.load() if orphan_cache else {}
+        self.results = {}           # directory -> (mtime_ns, known digest, orphan names)
+        self.reused = 0             # directories whose orphans came from the cache
+
+    def add_known(self, path):
+        # save paths can be spelled with "." or ".." components; the trie is looked up
+        # with the normalized directories the scan walks
+        self.known.add(os.path.normpath(path))
+
+    def list_trees(self, tops):
+        # list every directory under tops into the stat store
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as executor:
+            level = list(dict.fromkeys(os.path.normpath(top) for top in tops))
+            while level:
+                next_level = []
+                listings = executor.map(lambda directory: self.stat_store.listing(directory, snapshot=True), level)
+                for directory, listing in zip(level, listings):
+                    if listing is not None:
+                        next_level.extend(os.path.join(directory, subdir) for subdir in listing.subdirs)
+                level = next_level
+
+    def orphans(self, top, ignore_files=()):
+        # (directory, name, FileStat) of each orphan under top, in os.walk order; the
+        # tree should be listed with list_trees first
+        top = os.path.normpath(top)
+        listing = self.stat_store.listing(top, snapshot=True)
+        if listing is None:
+            return
+        node = self.known.find(top)
+        known = hashlib.md5("\0".join(sorted(node.files)).encode()).hexdigest() if node is not None else ""
+        previous = self.previous.get(top)
+        if listing.cached and previous is not None and previous[:2] == (listing.mtime_ns, known):
+            names = previous[2]
+            self.reused += 1
+        else:
+            names = [name for name in listing.files if node is None or name not in node.files]
+        self.results[top] = (listing.mtime_ns, known, names)
+        for name in names:
+            file_stat = listing.files.get(name)
+            if file_stat is not None and name.lower() not in ignore_files:
+                yield top, name, file_stat
+        for subdir in listing.subdirs:
+            yield from self.orphans(os.path.join(top, subdir), ignore_files)
+
+    def save(self):
+        if self.orphan_cache:
+            self.orphan_cache.save(self.results)
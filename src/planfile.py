@@ -0,0 +1,69 @@
+import json
+import os
+import time
+
+# Change plans: what a run would change, written by --plan and executed later by
+# --apply. JSON Lines: a header line, then one entry per line, each one request's worth
+# of work ({"id": n, "op": ..., ...}). Every op is safe to repeat, and --apply records
+# the ids it finished in PLAN.applied, so an interrupted apply resumes where it stopped.
+
+PLAN_VERSION = 1
+
+class PlanFile:
+
+    def __init__(self, path):
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self.path = path
+        self.file = open(path, "w")
+        self.count = 0
+        self.file.write(json.dumps({"plan": PLAN_VERSION, "created_at": time.time()}) + "\n")
+        # a new plan starts with nothing applied
+        if os.path.exists(AppliedLog.path_for(path)):
+            os.remove(AppliedLog.path_for(path))
+
+    def append(self, op, **fields):
+        self.count += 1
+        self.file.write(json.dumps({"id": self.count, "op": op, **fields}) + "\n")
+
+    def close(self):
+        self.file.close()
+
+def read_plan(path):
+    # (header, entries)
+    with open(path) as f:
+        header = json.loads(f.readline())
+        if header.get("plan") != PLAN_VERSION:
+            raise ValueError(f"'{path}' is not a version {PLAN_VERSION} plan")
+        return header, [json.loads(line) for line in f if line.strip()]
+
+
+class AppliedLog:
+
+    # ids of plan entries already applied, one per line, flushed as they complete
+
+    @staticmethod
+    def path_for(plan_path):
+        return f"{plan_path}.applied"
+
+    def __init__(self, plan_path):
+        self.path = self.path_for(plan_path)
+        self.file = None
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return set()
+        with open(self.path) as f:
+            return {int(line) for line in f if line.strip().isdigit()}
+
+    def mark(self, entry_id):
+        if self.file is None:
+            self.file = open(self.path, "a")
+        self.file.write(f"{entry_id}\n")
+        self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
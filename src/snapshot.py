@@ -0,0 +1,88 @@
+import gzip
+import json
+import os
+
+import qbittorrentapi
+from qbittorrentapi import TrackersList, TorrentFilesList
+
+# Snapshots hold the raw API responses Phase 1 works from (torrent list, trackers and
+# files of every torrent) in one gzip-compressed JSON file, so analysis can be rerun
+# offline against production-sized data and with repeatable inputs.
+
+SNAPSHOT_VERSION = 1
+
+def save_snapshot(path, recorded_at, app_version, torrent_info_list, payloads):
+    # payloads: hash -> (torrent_dict, trackers) as fetched; TorrentInfo keeps neither
+    torrents, trackers, files = {}, {}, {}
+    for h, torrent_info in torrent_info_list.items():
+        torrent_dict, torrent_trackers = payloads[h]
+        fields = dict(torrent_dict)
+        fields.pop("hash", None)  # keyed by hash, like sync/maindata
+        torrents[h] = fields
+        trackers[h] = [dict(t) for t in torrent_trackers]
+        files[h] = [dict(f) for f in torrent_info.torrent_files or []]
+    write_snapshot(path, recorded_at, app_version, torrents, trackers, files)
+
+def write_snapshot(path, recorded_at, app_version, torrents, trackers, files):
+    # torrents: hash -> fields (without hash); trackers/files: hash -> list of dicts
+    snapshot = {
+        "version": SNAPSHOT_VERSION,
+        "recorded_at": recorded_at,
+        "app_version": app_version,
+        "torrents": torrents,
+        "trackers": trackers,
+        "files": files,
+    }
+    parent = os.path.dirname(path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    # write to a temp file first so an interrupted write never leaves a truncated snapshot
+    with gzip.open(f"{path}.tmp", "wt", encoding="utf-8") as f:
+        json.dump(snapshot, f)
+    os.replace(f"{path}.tmp", path)
+
+def load_snapshot(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        snapshot = json.load(f)
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {snapshot.get('version')} in '{path}'")
+    return snapshot
+
+
+class ReplayApp:
+
+    def __init__(self, version):
+        self.version = version
+
+
+class ReplayClient:
+
+    # Stands in for qbittorrentapi.Client during --replay: answers the read calls that
+    # get_torrents() makes from a snapshot, with no connection to qBittorrent. Replays
+    # always run dry, so none of the write calls are ever reached.
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.app = ReplayApp(f"{snapshot.get('app_version')} (snapshot)")
+
+    def sync_maindata(self, rid=0):
+        # always a full update; the torrent list of a snapshot never changes
+        return {"rid": 1, "full_update": True, "torrents": self.snapshot["torrents"]}
+
+    def torrents_info(self, sort=None, limit=None, offset=None, torrent_hashes=None):
+        torrents = [dict(fields, hash=h) for h, fields in self.snapshot["torrents"].items() if torrent_hashes is None or h in torrent_hashes.split("|")]
+        if sort:
+            torrents.sort(key=lambda t: t.get(sort, 0))
+        offset = offset or 0
+        torrents = torrents[offset:offset + limit] if limit else torrents[offset:]
+        return qbittorrentapi.TorrentInfoList(torrents, client=self)
+
+    def torrents_trackers(self, torrent_hash):
+        if torrent_hash not in self.snapshot["trackers"]:
+            raise qbittorrentapi.NotFound404Error(f"Torrent hash {torrent_hash} is not in the snapshot")
+        return TrackersList(self.snapshot["trackers"][torrent_hash])
+
+    def torrents_files(self, torrent_hash):
+        if torrent_hash not in self.snapshot["files"]:
+            raise qbittorrentapi.NotFound404Error(f"Torrent hash {torrent_hash} is not in the snapshot")
+        return TorrentFilesList(self.snapshot["files"][torrent_hash])
@@ -0,0 +1,186 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+# What's kept of a file's stat; the field names match os.stat_result's
+FileStat = namedtuple("FileStat", "st_ino st_dev st_nlink st_size st_mtime")
+
+# A directory's files (name -> FileStat) and subdirectories, its mtime when listed, and
+# whether it came from the persistent cache rather than being listed this run
+DirListing = namedtuple("DirListing", "files subdirs mtime_ns cached")
+
+class StatCache:
+
+    # Stats of the files under the save paths, by directory. A directory is listed once
+    # per run with os.scandir and every file in it is stat'ed (DirEntry.stat()), so
+    # lookups for the rest of the run cost nothing. With a path, listings also persist
+    # across runs as snapshots for the orphan scan: a directory's mtime changes whenever
+    # an entry is added, removed or renamed, so a directory whose mtime still matches
+    # its snapshot has the same names without being listed again. A file changed in
+    # place, or hardlinked from somewhere else, doesn't change its directory's mtime, so
+    # a snapshot's stats can be stale: stat() (the hardlink and inode checks) always
+    # uses a listing made this run, and the orphan scan stats any file it acts on again.
+    # Snapshots of directories not seen for snapshot_days are dropped. Directories are
+    # keyed by os.path.normpath, so '/data/' and '/data' share one listing. Lookups may
+    # come from several threads.
+
+    def __init__(self, path=None, snapshot_days=0):
+        self.snapshot_age = snapshot_days * 24 * 60 * 60
+        self.conn = None
+        if path:
+            parent = os.path.dirname(path)
+            if parent:
+                os.makedirs(parent, exist_ok=True)
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS dirs ("
+                " path TEXT PRIMARY KEY,"
+                " mtime_ns INTEGER NOT NULL,"
+                " checked_at REAL NOT NULL,"
+                " subdirs TEXT NOT NULL"
+                ") WITHOUT ROWID"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                " dir TEXT NOT NULL,"
+                " name TEXT NOT NULL,"
+                " ino INTEGER NOT NULL,"
+                " dev INTEGER NOT NULL,"
+                " nlink INTEGER NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " mtime REAL NOT NULL,"
+                " PRIMARY KEY (dir, name)"
+                ") WITHOUT ROWID"
+            )
+            self.conn.commit()
+        self.lock = threading.Lock()
+        self.begin_run()
+
+    def begin_run(self):
+        # forget this process's listings; directories may have changed since last run
+        self.listings = {}          # directory -> DirListing, or None if it can't be listed
+        self.scanned = {}           # directory -> DirListing listed this run, to persist
+        self.confirmed = set()      # directories whose snapshot was still valid
+        self.invalidations = 0      # snapshots found out of date (mtime changed)
+
+    def stat(self, path):
+        # FileStat of path, or None if it isn't a file (or can't be stat'ed); always
+        # from a listing made this run
+        directory, name = os.path.split(path)
+        listing = self.listing(directory)
+        if listing is None:
+            return None
+        return listing.files.get(name)
+
+    def walk(self, top, snapshot=False, topdown=True):
+        # Like os.walk(top): (directory, subdirectory names, {name: FileStat})
+        listing = self.listing(top, snapshot)
+        if listing is None:
+            return
+        if topdown:
+            yield top, listing.subdirs, listing.files
+        for subdir in listing.subdirs:
+            yield from self.walk(os.path.join(top, subdir), snapshot, topdown)
+        if not topdown:
+            yield top, listing.subdirs, listing.files
+
+    def forget(self, directory):
+        # directory was changed by this run; list it again when next asked for
+        with self.lock:
+            self.listings.pop(os.path.normpath(directory), None)
+
+    def listing(self, directory, snapshot=False):
+        # The DirListing of directory, None if it can't be listed. With snapshot, the
+        # persisted listing will do if the directory's mtime hasn't changed since.
+        directory = os.path.normpath(directory)
+        with self.lock:
+            if directory in self.listings:
+                listing = self.listings[directory]
+                if listing is None or not listing.cached or snapshot:
+                    return listing
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+        except OSError:
+            mtime_ns = None
+        listing = self.load(directory, mtime_ns) if snapshot and mtime_ns is not None else None
+        if listing is None and mtime_ns is not None:
+            listing = self.scan(directory, mtime_ns)
+            if listing is not None:
+                with self.lock:
+                    self.scanned[directory] = listing
+                    self.confirmed.discard(directory)
+        with self.lock:
+            self.listings[directory] = listing
+        return listing
+
+    def load(self, directory, mtime_ns):
+        # the persisted listing of directory, if it's still valid
+        if self.conn is None:
+            return None
+        with self.lock:
+            row = self.conn.execute("SELECT mtime_ns, subdirs FROM dirs WHERE path = ?", (directory,)).fetchone()
+            if row is None:
+                return None
+            if row[0] != mtime_ns:
+                self.invalidations += 1
+                return None
+            self.confirmed.add(directory)
+            files = {
+                name: FileStat(ino, dev, nlink, size, mtime)
+                for name, ino, dev, nlink, size, mtime in self.conn.execute(
+                    "SELECT name, ino, dev, nlink, size, mtime FROM files WHERE dir = ?", (directory,))
+            }
+        return DirListing(files, json.loads(row[1]), mtime_ns, True)
+
+    def scan(self, directory, mtime_ns):
+        # Files and subdirectories as os.walk sees them: symlinks to directories are
+        # neither, and aren't descended into
+        files, subdirs = {}, []
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir():
+                            if not entry.is_symlink():
+                                subdirs.append(entry.name)
+                            continue
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    files[entry.name] = FileStat(st.st_ino, st.st_dev, st.st_nlink, st.st_size, st.st_mtime)
+        except OSError:
+            return None
+        return DirListing(files, subdirs, mtime_ns, False)
+
+    def save(self):
+        # persist the directories listed this run, and drop those not seen for snapshot_days
+        if self.conn is None:
+            return
+        now = time.time()
+        with self.lock, self.conn:
+            for directory, listing in self.scanned.items():
+                self.conn.execute("DELETE FROM files WHERE dir = ?", (directory,))
+                self.conn.executemany(
+                    "INSERT INTO files (dir, name, ino, dev, nlink, size, mtime) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(directory, name, *file_stat) for name, file_stat in listing.files.items()])
+                self.conn.execute("INSERT OR REPLACE INTO dirs (path, mtime_ns, checked_at, subdirs) VALUES (?, ?, ?, ?)",
+                                  (directory, listing.mtime_ns, now, json.dumps(listing.subdirs)))
+            self.conn.executemany("UPDATE dirs SET checked_at = ? WHERE path = ?", [(now, directory) for directory in self.confirmed])
+            expired = [path for (path,) in self.conn.execute("SELECT path FROM dirs WHERE checked_at < ?", (now - self.snapshot_age,))]
+            for path in expired:
+                self.conn.execute("DELETE FROM dirs WHERE path = ?", (path,))
+                self.conn.execute("DELETE FROM files WHERE dir = ?", (path,))
+        self.scanned = {}
+        self.confirmed = set()
+
+    def summary(self):
+        return (f"Stat cache: {len(self.confirmed)} directories unchanged since their snapshot, "
+                f"{len(self.scanned)} listed, {self.invalidations} snapshots out of date")
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
@@ -0,0 +1,97 @@
+import qbittorrentapi
+
+# Torrent fields that change on nearly every delta (speeds, peer counts, running totals,
+# timers). A change in only these doesn't need the torrent's trackers or files
+# refetched or its TorrentInfo rebuilt; the reused TorrentInfo is refreshed in place.
+VOLATILE_FIELDS = frozenset((
+    "time_active", "seeding_time", "last_activity", "eta", "reannounce",
+    "num_complete", "num_incomplete", "num_seeds", "num_leechs", "availability", "seen_complete", "popularity",
+    "upspeed", "dlspeed", "up_limit", "dl_limit",
+    "uploaded", "uploaded_session", "downloaded", "downloaded_session", "completed", "amount_left", "ratio",
+))
+
+class SyncState:
+
+    # Local mirror of qBittorrent's torrent list, categories and tags, kept current
+    # through /api/v2/sync/maindata. The server remembers the last response it sent
+    # per WebUI session, so passing back its `rid` yields only what changed since.
+
+    def __init__(self):
+        self.rid = 0                # last rid whose cycle completed; sent with each request
+        # the rid received and the hashes changed or removed since the last commit();
+        # a cycle that fails before committing sees them again in the next update
+        self.pending_rid = 0
+        self.pending_changed = set()
+        self.pending_removed = set()
+        self.torrents = {}          # hash -> dict of torrent fields
+        self.categories = {}        # name -> dict of category fields
+        self.tags = []
+        self.server_state = {}
+
+    def update(self, qb):
+        # Pull the next delta (or a full snapshot when the server decides rid is stale)
+        # and merge it into the mirror. Returns (changed_hashes, removed_hashes), where
+        # changed means new, or changed in a field outside VOLATILE_FIELDS, since the
+        # last commit(). The new rid is only used once commit() is called.
+        data = qb.sync_maindata(rid=self.rid)
+        self.pending_rid = data.get("rid", 0)
+        changed, removed = self._merge(data)
+        self.pending_changed = (self.pending_changed | changed) & self.torrents.keys()
+        self.pending_removed = (self.pending_removed | removed) - self.torrents.keys()
+        return set(self.pending_changed), set(self.pending_removed)
+
+    def commit(self):
+        # the cycle that consumed the last update() succeeded: ask for deltas from here on
+        self.rid = self.pending_rid
+        self.pending_changed = set()
+        self.pending_removed = set()
+
+    def _merge(self, data):
+        changed = set()
+        removed = set()
+        if data.get("full_update"):
+            incoming = {h: dict(t) for h, t in (data.get("torrents") or {}).items()}
+            removed = set(self.torrents) - set(incoming)
+            changed = {h for h, t in incoming.items() if h not in self.torrents or SyncState.differs(self.torrents[h], t) or SyncState.differs(t, self.torrents[h])}
+            self.torrents = incoming
+            self.categories = {name: dict(c) for name, c in (data.get("categories") or {}).items()}
+            self.tags = list(data.get("tags") or [])
+            self.server_state = dict(data.get("server_state") or {})
+            return changed, removed
+
+        # Partial update: torrents/categories only carry the fields that changed
+        for h, fields in (data.get("torrents") or {}).items():
+            if h not in self.torrents or SyncState.differs(self.torrents[h], fields):
+                changed.add(h)
+            self.torrents.setdefault(h, {}).update(fields)
+        for h in data.get("torrents_removed") or []:
+            if self.torrents.pop(h, None) is not None:
+                removed.add(h)
+        changed -= removed
+
+        for name, fields in (data.get("categories") or {}).items():
+            self.categories.setdefault(name, {}).update(fields)
+        for name in data.get("categories_removed") or []:
+            self.categories.pop(name, None)
+
+        for tag in data.get("tags") or []:
+            if tag not in self.tags:
+                self.tags.append(tag)
+        tags_removed = set(data.get("tags_removed") or [])
+        if tags_removed:
+            self.tags = [tag for tag in self.tags if tag not in tags_removed]
+
+        self.server_state.update(data.get("server_state") or {})
+        return changed, removed
+
+    @staticmethod
+    def differs(torrent, fields):
+        # whether fields change any of torrent's non-volatile fields
+        return any(torrent.get(key) != value for key, value in fields.items() if key not in VOLATILE_FIELDS)
+
+    def torrent_dict(self, torrent_hash, qb):
+        # maindata keys torrents by hash and omits the field itself; put it back so the
+        # result matches what torrents_info() returns and TorrentInfo consumes
+        data = dict(self.torrents[torrent_hash])
+        data["hash"] = torrent_hash
+        return qbittorrentapi.TorrentDictionary(data=data, client=qb)
@@ -0,0 +1,151 @@
+import json
+import re
+import time
+
+from .torrentinfo import TorrentInfo, TagNames
+
+# Tag rules: a tag is added to a torrent when any of its rules matches, and removed when
+# none do. A rule is a dict of conditions over TorrentInfo fields, all of which must hold:
+#
+#   - tag: "#_big_old"
+#     when:
+#       size: {gt: 53687091200}                 # torrent_dict fields work too
+#       torrent_added_since_days: {gte: 90}
+#       tracker_name: {in: [tlz, avistaz]}
+#
+# A plain value compares for equality, except true/false, which test truthiness. Fields
+# are TorrentInfo attributes (INFO_FIELDS) or, failing that, keys of the torrent's
+# torrent_dict. Rules are compiled once into predicate functions and evaluated in one
+# pass per torrent.
+
+INFO_FIELDS = {
+    "is_unregistered", "unregistered_rule", "is_tracker_error", "is_private", "is_polite_to_seed",
+    "tracker_name", "save_path_host", "content_path", "has_autobrr_tag", "has_hardlink_tag",
+    "torrent_added_since_days", "torrent_completed_since_days",
+} | set(TorrentInfo.FILE_ATTRS)
+
+OPERATORS = {
+    "eq": lambda value, arg: value == arg,
+    "ne": lambda value, arg: value != arg,
+    "gt": lambda value, arg: value is not None and value > arg,
+    "gte": lambda value, arg: value is not None and value >= arg,
+    "lt": lambda value, arg: value is not None and value < arg,
+    "lte": lambda value, arg: value is not None and value <= arg,
+    "in": lambda value, arg: value in arg,
+    "not_in": lambda value, arg: value not in arg,
+    "contains": lambda value, arg: value is not None and arg in value,
+    "matches": lambda value, arg: value is not None and arg.search(str(value)) is not None,
+}
+
+# The built-in tags, in the same form. 'feature' ties a file-list based rule to the file
+# feature that enables it (see TorrentManager._get_file_features).
+BUILTIN_TAG_RULES = [
+    {"tag": TagNames.UNREGISTERED.value, "when": {"is_unregistered": True}},
+    {"tag": TagNames.TRACKER_ERROR.value, "when": {"is_tracker_error": True, "is_unregistered": False}},
+    {"tag": TagNames.RARRED.value, "when": {"is_rarred": True}, "feature": "rarred"},
+    {"tag": TagNames.SEASON_PACK.value, "when": {"is_season_pack": True}, "feature": "season_pack"},
+    {"tag": TagNames.THROTTLED.value, "when": {"up_limit": {"gt": 0}}},
+    {"tag": TagNames.HARDLINK.value, "when": {"is_hardlinked": True}, "feature": "hardlink"},
+    {"tag": TagNames.NO_HARDLINK.value, "when": {"is_hardlinked": False}, "feature": "hardlink"},
+]
+
+def compile_getter(field):
+    if field in INFO_FIELDS:
+        return lambda torrent_info: getattr(torrent_info, field)
+    return lambda torrent_info: torrent_info.torrent_dict.get(field)
+
+def compile_condition(field, condition):
+    get = compile_getter(field)
+    if isinstance(condition, bool):
+        return (lambda torrent_info: bool(get(torrent_info))) if condition else (lambda torrent_info: not get(torrent_info))
+    if not isinstance(condition, dict):
+        return lambda torrent_info: get(torrent_info) == condition
+    tests = []
+    for op, arg in condition.items():
+        if op not in OPERATORS:
+            raise ValueError(f"unknown operator '{op}' for field '{field}' (expected one of {', '.join(OPERATORS)})")
+        if op == "matches":
+            try:
+                arg = re.compile(arg, re.IGNORECASE)
+            except re.error as e:
+                raise ValueError(f"invalid pattern '{arg}' for field '{field}': {e}")
+        elif op in ("in", "not_in"):
+            arg = frozenset(arg) if all(isinstance(a, str) for a in arg) else tuple(arg)
+        tests.append((OPERATORS[op], arg))
+    if len(tests) == 1:
+        test, arg = tests[0]
+        return lambda torrent_info: test(get(torrent_info), arg)
+    return lambda torrent_info: all(test(get(torrent_info), arg) for test, arg in tests)
+
+def compile_rule(rule):
+    if not isinstance(rule, dict) or not rule.get("tag") or not isinstance(rule.get("when"), dict) or not rule["when"]:
+        raise ValueError(f"tag rule {rule!r} needs a 'tag' and a non-empty 'when'")
+    conditions = [compile_condition(field, condition) for field, condition in rule["when"].items()]
+    if len(conditions) == 1:
+        return conditions[0]
+    return lambda torrent_info: all(condition(torrent_info) for condition in conditions)
+
+
+class TagRule:
+
+    def __init__(self, rule, feature=None):
+        self.tag = rule["tag"]
+        self.description = f"{self.tag} when {json.dumps(rule['when'], default=str)}"
+        self.predicate = compile_rule(rule)
+        self.feature = feature      # file feature that enables it, or None for always on
+        self.uses_files = any(field in TorrentInfo.FILE_ATTRS for field in rule["when"])
+        self.seconds = 0.0          # time spent evaluating it, when timed
+
+
+class TagRuleEngine:
+
+    def __init__(self, rules, timed=False):
+        # Config rules that read the file list run when update-tags does, under the
+        # "tag_rules" file feature
+        self.rules = [TagRule(rule, rule.get("feature")) for rule in BUILTIN_TAG_RULES]
+        for rule in rules:
+            compiled = TagRule(rule)
+            compiled.feature = "tag_rules" if compiled.uses_files else None
+            self.rules.append(compiled)
+        self.uses_files = any(rule.feature == "tag_rules" for rule in self.rules)
+        # torrent_dict fields the rules read, which TorrentInfo has to keep
+        self.torrent_fields = tuple(dict.fromkeys(field for rule in rules for field in rule["when"] if field not in INFO_FIELDS))
+        self.timed = timed
+        self.evaluations = 0
+
+    def active_rules(self, features):
+        # the rules this run evaluates, grouped by tag in first-seen order
+        by_tag = {}
+        for rule in self.rules:
+            if rule.feature is None or rule.feature in features:
+                by_tag.setdefault(rule.tag, []).append(rule)
+        return list(by_tag.items())
+
+    def evaluate(self, torrent_info, active_rules):
+        # (tags to add, tags to remove) for one torrent
+        add, remove = [], []
+        self.evaluations += 1
+        for tag, rules in active_rules:
+            if self.timed:
+                matched = False
+                for rule in rules:
+                    start = time.perf_counter()
+                    matched = rule.predicate(torrent_info)
+                    rule.seconds += time.perf_counter() - start
+                    if matched:
+                        break
+            else:
+                matched = any(rule.predicate(torrent_info) for rule in rules)
+            (add if matched else remove).append(tag)
+        return add, remove
+
+    def print_timing(self):
+        if not self.timed or not self.evaluations:
+            return
+        total = sum(rule.seconds for rule in self.rules)
+        print(f"Tag rules: {len(self.rules)} rules over {self.evaluations} torrents in {total * 1000:.1f} ms")
+        for rule in sorted(self.rules, key=lambda rule: -rule.seconds):
+            if rule.seconds:
+                print(f"  {rule.seconds * 1000:8.2f} ms  {rule.description}")
+            rule.seconds = 0.0
+        self.evaluations = 0
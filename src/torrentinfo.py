@@ -1,10 +1,13 @@
 import re
 import os
+import sys
+from array import array
 from enum import Enum, Flag, auto
 from collections import defaultdict
 from urllib.parse import urlparse
 
 from . import util
+from .statcache import StatCache
 
 class UpdateState(Flag):
     TAG_ADD = auto()
@@ -43,43 +46,159 @@ class TagNames(Enum):
     CROSS_SEED_ALL = "#_cs_all"
     PTP_ARCHIVE = "PTP-Archive"
 
+class TorrentFields(dict):
+
+    # The few torrent list fields analysis reads, copied out of qBittorrent's
+    # TorrentDictionary so the rest of it (magnet URI, tracker URL, paths, ~50 keys) can
+    # be dropped. Readable as d["size"] or d.size, like the original.
+    __slots__ = ()
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+class TorrentFiles:
+
+    # A torrent's file list as a tuple of names and an array of sizes, instead of one
+    # TorrentFile dict (priority, progress, piece range, ...) per file. Iterating gives
+    # the {"index", "name", "size"} dicts the file cache and snapshots store.
+    __slots__ = ("names", "sizes")
+
+    def __init__(self, torrent_files):
+        if isinstance(torrent_files, TorrentFiles):
+            self.names, self.sizes = torrent_files.names, torrent_files.sizes
+        else:
+            self.names = tuple(file["name"] for file in torrent_files)
+            self.sizes = array("q", (file["size"] for file in torrent_files))
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        for i, (name, size) in enumerate(zip(self.names, self.sizes)):
+            yield {"index": i, "name": name, "size": size}
+
+    def __repr__(self):
+        return f"TorrentFiles({list(zip(self.names, self.sizes))})"
+
+
+# Torrent list fields kept in TorrentInfo.torrent_dict; everything else is dropped after
+# construction. The manager adds the fields its tag rules read.
+TORRENT_FIELDS = ("hash", "name", "added_on", "completion_on", "size", "amount_left", "downloaded", "dlspeed", "up_limit", "num_complete", "force_start", "category")
+
+class RunContext:
+
+    # Per-run state TorrentInfo construction reads and fills in: the tracker matcher and
+    # message classifier, the torrent fields to keep, the lazy file loader, the stat
+    # store of the hardlink check (a src.statcache.StatCache, shared with the orphan
+    # scan), and with defer_hardlinks, the torrents left for the manager's hardlink
+    # stage (see src/hardlinks.py). cross_seeds (content_path -> the torrents
+    # cross-seeding it, in torrent list order) is indexed once construction is done, so
+    # cross-seed grouping comes out the same whichever order torrents were built in.
+
+    def __init__(self, tracker_matcher, message_classifier, files_loader=None, torrent_fields=TORRENT_FIELDS, defer_hardlinks=False, stat_store=None):
+        self.tracker_matcher = tracker_matcher
+        self.message_classifier = message_classifier
+        self.files_loader = files_loader
+        self.torrent_fields = torrent_fields
+        self.defer_hardlinks = defer_hardlinks
+        self.stat_store = stat_store if stat_store is not None else StatCache()
+        self.hardlink_pending = []
+        self.cross_seeds = {}
+
+    def stat(self, filename):
+        # stat of filename through the run's stat store; None if it can't be stat'ed
+        return self.stat_store.stat(filename)
+
+    def index_cross_seeds(self, torrent_infos, by_content=False, match_inode=False):
+        # Torrents sharing a content_path always cross-seed each other. by_content also
+        # joins torrents with the same content fingerprint (see content_fingerprint), and
+        # match_inode those whose largest file is the same inode on disk, e.g. hardlinked
+        # copies in another save path. Torrents are joined with union-find, in one pass
+        # that links each torrent to the first one seen with the same key.
+        if not by_content and not match_inode:
+            cross_seeds = defaultdict(list)
+            for torrent_info in torrent_infos:
+                cross_seeds[torrent_info.content_path].append(torrent_info)
+            self.cross_seeds = dict(cross_seeds)
+            return
+
+        torrent_infos = list(torrent_infos)
+        parent = list(range(len(torrent_infos)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        first_seen = {}     # (kind, key) -> index of the first torrent with it
+        for i, torrent_info in enumerate(torrent_infos):
+            keys = [("path", torrent_info.content_path)]
+            if by_content:
+                keys.append(("content", torrent_info.content_fingerprint()))
+            if match_inode:
+                keys.append(("inode", torrent_info.largest_file_inode()))
+            for key in keys:
+                if key[1] is None:
+                    continue
+                j = first_seen.setdefault(key, i)
+                if j != i:
+                    a, b = find(i), find(j)
+                    if a != b:
+                        parent[max(a, b)] = min(a, b)
+
+        # one list per group, in torrent list order, shared by its content paths
+        groups = defaultdict(list)
+        for i, torrent_info in enumerate(torrent_infos):
+            groups[find(i)].append(torrent_info)
+        self.cross_seeds = {}
+        for members in groups.values():
+            for torrent_info in members:
+                self.cross_seeds[torrent_info.content_path] = members
+
+
 class TorrentInfo:
 
-    # static variables
-    ContentPath_Dict = defaultdict(list)
-    Stat_Cache = {}
-    Stat_Cache_Hits = 0
+    # Attributes derived from the file list. When a TorrentInfo is built without its
+    # file list, these are filled in on first access (see __getattr__).
+    FILE_ATTRS = ("torrent_files", "is_rarred", "is_dangerous", "is_multi_file", "is_season_pack", "is_hardlinked")
+
+    # 100k+ of these live for the whole run, so no per-instance __dict__
+    __slots__ = (
+        "context", "torrent_dict", "tracker_count", "_hash", "_name", "current_tags", "content_path",
+        "has_autobrr_tag", "has_hardlink_tag", "is_private", "unregistered_rule", "is_unregistered",
+        "tracker_opts", "tracker_name", "unmatched_tracker_hosts", "is_polite_to_seed", "is_tracker_error",
+        "save_path_host", "torrent_files", "is_rarred", "is_dangerous", "is_multi_file",
+        "is_season_pack", "is_hardlinked", "_torrent_age", "torrent_added_since_days",
+        "torrent_completed_since_days", "delete_state", "cross_seed_state", "cross_seed_hashes",
+        "update_state", "update_tags_add", "update_tags_remove", "update_upload_limit",
+    )
 
-    def __init__(self, torrent_dict, torrent_files, torrent_trackers, tracker_options):
+    def __init__(self, torrent_dict, torrent_files, torrent_trackers, context):
 
-        # torrent info
-        self.torrent_dict = torrent_dict
-        self.torrent_files = torrent_files
-        self.torrent_trackers = torrent_trackers
-        self.torrent_trackers_filtered = list(filter(lambda tracker: tracker["tier"] >= 0, torrent_trackers))
+        # run state (see RunContext)
+        self.context = context
+
+        # torrent info; trackers are only read here, the full payloads are refetched for
+        # to_str(include_extended=True)
+        self.torrent_dict = TorrentInfo.compact_fields(torrent_dict, context.torrent_fields)
+        torrent_trackers_filtered = [tracker for tracker in torrent_trackers if tracker["tier"] >= 0]
+        self.tracker_count = len(torrent_trackers_filtered)
 
         # torrent props
         self._hash = torrent_dict.hash
         self._name = torrent_dict.name
-        self._torrent_age = util.get_age(torrent_dict.added_on)
-        self.torrent_added_since_days = util.days_since(torrent_dict.added_on)
-        self.torrent_completed_since_days = util.days_since(torrent_dict.completion_on)
-        self.current_tags = [t.strip() for t in torrent_dict.get("tags", "").split(",")]
+        self.current_tags = frozenset(sys.intern(t.strip()) for t in torrent_dict.get("tags", "").split(","))
 
-        # torrent state
-        self.delete_state = DeleteState.NONE
-        self.cross_seed_state = CrossSeedState.NONE
-        self.cross_seed_hashes = []
-
-        # update props
-        self.update_state = UpdateState(0)
-        self.update_tags_add = []
-        self.update_tags_remove = []
-        self.update_upload_limit = 0
+        # age and analysis/update state
+        self.reset()
 
-        # Track content_path
-        self.content_path = util.format_path(torrent_dict.content_path)
-        TorrentInfo.ContentPath_Dict[self.content_path].append(self)
+        # content_path, for cross-seed grouping (see RunContext.index_cross_seeds)
+        self.content_path = sys.intern(util.format_path(torrent_dict.content_path))
 
         # autobrr
         self.has_autobrr_tag = False
@@ -95,36 +214,15 @@ class TorrentInfo:
         if torrent_dict.get("private") is not None:
             self.is_private = bool(torrent_dict["private"])
         else:
-            self.is_private = any("private" in tracker["msg"].lower() for tracker in self.torrent_trackers)
-
-        # unregistered based on tracker message (matched case-insensitively)
-        unregistered_keywords = [
-            "unregistered",
-            "not registered",
-            "pack out",
-            "complete season",
-            "dupe of",
-            "beyond-hd.me",
-            "infohash not found",
-            "tracker inactive",
-            "invalid infohash",
-            "unregistered torrent",
-        ]
-        self.is_unregistered = False
-        for tracker in self.torrent_trackers:
-            msg = tracker["msg"].lower()
-            if any(keyword in msg for keyword in unregistered_keywords):
-                self.is_unregistered = True
-                break
-
-        # Find the first matching tracker for the torrent
-        self.tracker_opts = None
-        torrent_tracker_urls = {tracker.url for tracker in torrent_trackers}  # Create a set of tracker URLs for faster lookup
-        for tracker_entry in tracker_options:
-            # Check if any tracker URL in the option is a substring of the tracker URLs
-            if any(tracker_url in url for url in torrent_tracker_urls for tracker_url in tracker_entry["trackers"]):
-                self.tracker_opts = tracker_entry
-                break  # Break after the first match to avoid duplicates
+            self.is_private = any("private" in tracker["msg"].lower() for tracker in torrent_trackers)
+
+        # unregistered based on tracker message (see src/messageclassifier.py); the rule
+        # that matched is kept for the per-rule summary
+        self.unregistered_rule = context.message_classifier.classify(tracker["msg"] for tracker in torrent_trackers)
+        self.is_unregistered = self.unregistered_rule is not None
+
+        # Find the first matching tracker for the torrent (see src/trackermatcher.py)
+        self.tracker_opts = context.tracker_matcher.match(tracker.url for tracker in torrent_trackers)
 
         # Set the tracker name and options
         self.tracker_name = None
@@ -134,22 +232,65 @@ class TorrentInfo:
         # public
         if not self.is_private:
             self.tracker_name = "public"
-            public_tracker_entry = next((tracker for tracker in tracker_options if tracker["name"] == "public"), None)
-            self.tracker_opts = public_tracker_entry
+            self.tracker_opts = context.tracker_matcher.public_entry
 
         # Trackers with no matching entry in trackers.json. These torrents get left
         # untagged; collect their announce hosts so the manager can warn about them.
-        self.unmatched_tracker_hosts = []
+        self.unmatched_tracker_hosts = ()
         if self.tracker_opts is None:
-            self.unmatched_tracker_hosts = sorted({
+            self.unmatched_tracker_hosts = tuple(sorted({
                 urlparse(tracker.url).hostname
-                for tracker in self.torrent_trackers_filtered
+                for tracker in torrent_trackers_filtered
                 if urlparse(tracker.url).hostname
-            })
+            }))
+
+        # How many seeders? It's polite to seed if there's less seeders than polite value in config.
+        self.is_polite_to_seed = self.check_polite_to_seed()
+
+        # tracker error?
+        self.is_tracker_error = all(tracker.status == 4 for tracker in torrent_trackers_filtered)
+
+        # Track save paths
+        self.save_path_host = sys.intern(TorrentInfo.host_save_path(torrent_dict['save_path']))
+
+        # File-derived props. If the file list wasn't fetched up front (nothing this run
+        # was expected to need it), they're worked out on first access instead.
+        if torrent_files is not None or context.files_loader is None:
+            self.set_files(torrent_files or [], context.defer_hardlinks)
+
+    @staticmethod
+    def compact_fields(torrent_dict, torrent_fields):
+        # the torrent_fields of torrent_dict, with the repetitive strings interned
+        fields = TorrentFields((key, torrent_dict[key]) for key in torrent_fields if key in torrent_dict)
+        if isinstance(fields.get("category"), str):
+            fields["category"] = sys.intern(fields["category"])
+        return fields
+
+    def __getattr__(self, name):
+        # Only called for attributes that aren't set yet: load the file list on demand
+        if name in TorrentInfo.FILE_ATTRS and self.context.files_loader is not None:
+            self.ensure_files()
+            return getattr(self, name)
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    def loaded_files(self):
+        # The file list if it has been loaded, without triggering a lazy load
+        try:
+            return TorrentInfo.torrent_files.__get__(self)
+        except AttributeError:
+            return None
+
+    def ensure_files(self):
+        if self.loaded_files() is None:
+            self.set_files(self.context.files_loader(self._hash))
+
+    def set_files(self, torrent_files, defer_hardlinks=False):
+
+        self.torrent_files = TorrentFiles(torrent_files)
 
         # Is rarred?
         self.is_rarred = False
-        if any(file.name.endswith(".rar") for file in self.torrent_files):
+        if any(name.endswith(".rar") for name in self.torrent_files.names):
             self.is_rarred = True
 
         # Is dangerous?
@@ -165,30 +306,58 @@ class TorrentInfo:
         if self.is_multi_file:
             self.is_season_pack = self.check_season_pack(self._name)
 
-        # How many seeders? It's polite to seed if there's less seeders than polite value in config.
-        politeness = self.tracker_opts.get("polite", 0) if self.tracker_opts is not None else 0
-        self.is_polite_to_seed = (self.torrent_dict["num_complete"] < politeness) if politeness > 0 else False
-
-        # tracker error?
-        self.is_tracker_error = all(tracker.status == 4 for tracker in self.torrent_trackers_filtered)
+        # Detect hardlinks, if enabled. While the torrent list is built, that's left to
+        # the manager's hardlink stage, which batches the stats of every torrent.
+        self.is_hardlinked = False
+        if util.Config_Manager.get('options')['tag_hardlink'] and self.torrent_files:
+            if defer_hardlinks:
+                self.context.hardlink_pending.append(self)
+                return
+            for name in self.torrent_files.names:
+                filename = os.path.join(self.save_path_host, name)
+                if self.is_hard_link(filename):
+                    self.is_hardlinked = True
+                    break
 
-        # Track save paths
-        save_path = torrent_dict['save_path']
+    @staticmethod
+    def host_save_path(save_path):
+        # qBittorrent's save path, translated through path_mappings to the host's view
         if util.Config_Manager.get('path_mappings'):
             for mapping in util.Config_Manager.get('path_mappings'):
                 container_path = util.format_path(mapping['container_path'])
                 host_path = util.format_path(mapping['host_path'])
                 save_path = save_path.replace(container_path, host_path)
-        self.save_path_host = util.format_path(save_path)
+        return util.format_path(save_path)
 
-        # Detect hardlinks, if enabled
-        self.is_hardlinked = False
-        if util.Config_Manager.get('options')['tag_hardlink'] and self.torrent_files:
-            for file in self.torrent_files:
-                filename = os.path.join(self.save_path_host, file['name'])
-                if self.is_hard_link(filename):
-                    self.is_hardlinked = True
-                    break
+    def check_polite_to_seed(self):
+        politeness = self.tracker_opts.get("polite", 0) if self.tracker_opts is not None else 0
+        return (self.torrent_dict["num_complete"] < politeness) if politeness > 0 else False
+
+    def refresh(self, torrent_dict):
+        # Take the volatile fields of a sync delta that changed nothing else (see
+        # src/syncstate.py) into a reused TorrentInfo, and what's derived from them
+        for key in self.torrent_dict:
+            if key in torrent_dict:
+                self.torrent_dict[key] = torrent_dict[key]
+        self.is_polite_to_seed = self.check_polite_to_seed()
+
+    def reset(self):
+        # Time-based props and per-run analysis state. Called on construction, and again
+        # when an unchanged TorrentInfo is reused for a later sync cycle.
+        self._torrent_age = util.get_age(self.torrent_dict.added_on)
+        self.torrent_added_since_days = util.days_since(self.torrent_dict.added_on)
+        self.torrent_completed_since_days = util.days_since(self.torrent_dict.completion_on)
+
+        # torrent state
+        self.delete_state = DeleteState.NONE
+        self.cross_seed_state = CrossSeedState.NONE
+        self.cross_seed_hashes = ()
+
+        # update props; tuples, as most torrents never schedule anything
+        self.update_state = UpdateState(0)
+        self.update_tags_add = ()
+        self.update_tags_remove = ()
+        self.update_upload_limit = 0
 
     def check_dangerous(self):
         dangerous_extensions = [
@@ -201,30 +370,44 @@ class TorrentInfo:
             ".zipx"
         ]
 
-        if any(file.name.endswith(ext) for ext in dangerous_extensions for file in self.torrent_files):
+        if any(name.endswith(ext) for ext in dangerous_extensions for name in self.torrent_files.names):
             return True
 
         return False
 
 
     def is_hard_link(self, filename):
-        # Check if filename is already cached
-        if filename in TorrentInfo.Stat_Cache:
-            stat_result = TorrentInfo.Stat_Cache[filename]
-            TorrentInfo.Stat_Cache_Hits += 1
-        else:
-            try:
-                # Perform os.stat and cache the result
-                stat_result = os.stat(filename)
-                TorrentInfo.Stat_Cache[filename] = stat_result
-            except OSError:
-                return False  # Return False if there is an issue with the file
+        # stat through the run's cache; False if there is an issue with the file
+        stat_result = self.context.stat(filename)
+        if stat_result is None:
+            return False
 
         # Return True if the file is a hard link
         return stat_result.st_nlink > 1
 
-
-    def check_season_pack(self, torrent_name: str) -> bool:
+    def content_fingerprint(self):
+        # Total size and the sorted (path, size) of every file, with paths relative to the
+        # content root, so a copy under a renamed top folder still matches. None without
+        # a file list (e.g. still waiting on metadata).
+        names, sizes = self.torrent_files.names, self.torrent_files.sizes
+        if not names:
+            return None
+        if all("/" in name for name in names) and len({name.split("/", 1)[0] for name in names}) == 1:
+            names = [name.split("/", 1)[1] for name in names]
+        return (sum(sizes), tuple(sorted(zip(names, sizes))))
+
+    def largest_file_inode(self):
+        # (st_dev, st_ino) of the largest file on disk, or None
+        names, sizes = self.torrent_files.names, self.torrent_files.sizes
+        if not names:
+            return None
+        largest = max(range(len(sizes)), key=sizes.__getitem__)
+        stat_result = self.context.stat(os.path.join(self.save_path_host, names[largest]))
+        return (stat_result.st_dev, stat_result.st_ino) if stat_result is not None else None
+
+
+    @staticmethod
+    def check_season_pack(torrent_name: str) -> bool:
         season_pack_patterns = [
             r"S\d{1,2}[^E]",  # Match season like "S01", "S01-S02", without episode
             r"Season \d+",  # Match "Season 1", "Season 2"
@@ -245,12 +428,12 @@ class TorrentInfo:
     def torrent_add_tag(self, tag):
         # Add the tag only if it's not in current tags and not already scheduled for adding
         if tag not in self.current_tags and tag not in self.update_tags_add:
-            self.update_tags_add.append(tag)  # Using set for efficient lookups
+            self.update_tags_add += (tag,)
             self.update_state |= UpdateState.TAG_ADD
 
         # Remove it from the removal list if it was marked for removal
         if tag in self.update_tags_remove:
-            self.update_tags_remove.remove(tag)
+            self.update_tags_remove = tuple(t for t in self.update_tags_remove if t != tag)
             # Check if there are no more tags left to remove and clear TAG_REMOVE flag
             if not self.update_tags_remove:
                 self.update_state &= ~UpdateState.TAG_REMOVE
@@ -258,16 +441,27 @@ class TorrentInfo:
     def torrent_remove_tag(self, tag):
         # Remove the tag only if it's in current tags and not already scheduled for removal
         if tag in self.current_tags and tag not in self.update_tags_remove:
-            self.update_tags_remove.append(tag)
+            self.update_tags_remove += (tag,)
             self.update_state |= UpdateState.TAG_REMOVE
 
         # Remove it from the add list if it was scheduled to be added
         if tag in self.update_tags_add:
-            self.update_tags_add.remove(tag)  # Remove tag from tags_add
+            self.update_tags_add = tuple(t for t in self.update_tags_add if t != tag)
             # Check if there are no more tags left to add and clear TAG_ADD flag
             if not self.update_tags_add:
                 self.update_state &= ~UpdateState.TAG_ADD
 
+    def torrent_update_tags(self, add, remove):
+        # torrent_add_tag/torrent_remove_tag for many tags at once, as set differences
+        # against the current and already scheduled tags; add and remove don't overlap
+        current = self.current_tags
+        add_set, remove_set = set(add), set(remove)
+        scheduled_add, scheduled_remove = set(self.update_tags_add), set(self.update_tags_remove)
+        self.update_tags_add = tuple([tag for tag in self.update_tags_add if tag not in remove_set] + [tag for tag in add if tag not in current and tag not in scheduled_add])
+        self.update_tags_remove = tuple([tag for tag in self.update_tags_remove if tag not in add_set] + [tag for tag in remove if tag in current and tag not in scheduled_remove])
+        self.update_state = (self.update_state | UpdateState.TAG_ADD) if self.update_tags_add else (self.update_state & ~UpdateState.TAG_ADD)
+        self.update_state = (self.update_state | UpdateState.TAG_REMOVE) if self.update_tags_remove else (self.update_state & ~UpdateState.TAG_REMOVE)
+
     def torrent_remove_category(self):
 
         if not util.Config_Manager.get('options')['remove_category_for_bad_torrents']:
@@ -287,20 +481,30 @@ class TorrentInfo:
             self.update_upload_limit = up_limit
             self.update_state |= UpdateState.UPLOAD_LIMIT
 
-    def to_str(self, include_extended=False):
+    def to_str(self, include_extended=False, payload_loader=None):
         # List of attributes to exclude from dynamic formatting
-        excluded_attrs = {"torrent_dict", "torrent_files", "torrent_trackers", "torrent_trackers_filtered"}
+        excluded_attrs = {"torrent_dict", "torrent_files", "context"}
+
+        # load the file list (and file-derived attributes) if it was deferred
+        self.ensure_files()
 
         # Retrieve all instance attributes and exclude the specified ones
-        attrs = {key: value for key, value in vars(self).items() if key not in excluded_attrs}
+        attrs = {key: getattr(self, key) for key in TorrentInfo.__slots__ if key not in excluded_attrs}
 
         # Sort the attributes by key name and prepare the formatted output with both key and value
         str_attrs = "\n".join([f"    {key} = {value}" for key, value in sorted(attrs.items())])
 
+        # Only the compact fields are kept, so the extended output refetches the torrent,
+        # its trackers and files through payload_loader (hash -> (dict, trackers, files))
+        torrent_dict, torrent_trackers, torrent_files = self.torrent_dict, [], self.torrent_files
+        if include_extended and payload_loader is not None:
+            torrent_dict, torrent_trackers, torrent_files = payload_loader(self._hash)
+        torrent_trackers_filtered = [tracker for tracker in torrent_trackers if tracker["tier"] >= 0]
+
         # Formatting
-        str_torrent_dict = str(self.torrent_dict).replace("TorrentDictionary({", "TorrentDictionary({\n        ").replace(", '", ", \n        '").replace("})", "\n      }),")
-        str_torrent_trackers = str(self.torrent_trackers_filtered).replace("Tracker({", "\n        Tracker({").replace("})]", "})\n      ],")
-        str_torrent_files = str(self.torrent_files).replace("TorrentFile({", "\n        TorrentFile({").replace("})]", "})\n      ],")
+        str_torrent_dict = str(torrent_dict).replace("TorrentDictionary({", "TorrentDictionary({\n        ").replace(", '", ", \n        '").replace("})", "\n      }),")
+        str_torrent_trackers = str(torrent_trackers_filtered).replace("Tracker({", "\n        Tracker({").replace("})]", "})\n      ],")
+        str_torrent_files = str(torrent_files).replace("TorrentFile({", "\n        TorrentFile({").replace("})]", "})\n      ],")
 
         # Combine the dynamically generated attributes and the formatted torrent_dict
         if include_extended:
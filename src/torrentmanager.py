@@ -2,30 +2,88 @@ import qbittorrentapi
 import sys
 import os
 import shutil
-import threading
-import concurrent.futures
+import time
 
 from colorama import Fore, Back, Style, init
 from tqdm import tqdm
 from collections import defaultdict
 
 from .torrentinfo import *
+from .syncstate import SyncState
+from .filecache import FileCache
+from .trackercache import TrackerCache
+from .fetcher import ThreadFetcher, AsyncFetcher, RetryPolicy, SKIP_FILES
+from .checkpoint import FetchCheckpoint
+from .concurrency import AIMDController
+from .snapshot import save_snapshot, load_snapshot, ReplayClient
+from .writeplan import WritePlan
+from .planfile import PlanFile, AppliedLog, read_plan
+from .writer import WriteExecutor, WriteTask, WriteReport
+from .trackermatcher import TrackerMatcher
+from .messageclassifier import MessageClassifier
+from .tagrules import TagRuleEngine
+from .hardlinks import HardlinkScanner
+from .statcache import StatCache
+from .orphans import OrphanScanner, OrphanCache
 from . import util
 
 class TorrentManager:
 
-    def __init__(self, dry_run, no_color):
+    def __init__(self, dry_run, no_color, operations=None, replay=None, plan=None, record=False):
 
         # args
         self.server = util.Config_Manager.get("server")
         self.port = util.Config_Manager.get("port")
         self.dry_run = dry_run
         self.no_color = no_color
+        self.operations = operations or []
+
+        # with a plan file, changes are written to it for --apply instead of being made
+        # (see src/planfile.py)
+        self.plan_file = PlanFile(plan) if plan else None
+
+        # replaying a snapshot instead of talking to qBittorrent (see src/snapshot.py)
+        self.replay_path = replay
+        self.replay_snapshot = None
+        if replay:
+            try:
+                self.replay_snapshot = load_snapshot(replay)
+            except Exception as e:
+                print(f"ERROR: Failed to load snapshot '{replay}': {e}")
+                sys.exit(1)
 
         # dict to store torrents
         self.torrent_info_list = defaultdict(list)
+
+        # TorrentInfo only keeps what analysis needs; --record also needs the raw torrent
+        # list entry and tracker list of every torrent (hash -> (torrent_dict, trackers))
+        self.recorded_payloads = {} if record else None
         self.torrent_tag_hashes_list = defaultdict(list)
 
+        # mirror of qBittorrent's torrent list, updated from sync/maindata deltas
+        self.sync_state = SyncState()
+        self.cycle = 0
+        self.missing_hashes = set()     # torrents whose details could not be fetched
+
+        # persistent caches, stored under cache_dir (disabled when cache_dir is empty, and
+        # for replays, which must neither read nor pollute the live caches)
+        self.cache_dir = util.Config_Manager.get("cache_dir") if not self.replay_snapshot else ""
+        self.file_cache = FileCache(os.path.join(self.cache_dir, "files.sqlite")) if self.cache_dir else None
+        self.tracker_cache = None
+        tracker_cache_config = util.Config_Manager.get("tracker_cache")
+        if self.cache_dir and tracker_cache_config['enabled']:
+            self.tracker_cache = TrackerCache(
+                os.path.join(self.cache_dir, "trackers.sqlite"),
+                tracker_cache_config['ttl_minutes'],
+                tracker_cache_config['bad_ttl_minutes'],
+            )
+        self.stat_cache = None
+        self.orphan_cache = None
+        stat_cache_config = util.Config_Manager.get("stat_cache")
+        if self.cache_dir and stat_cache_config['enabled']:
+            self.stat_cache = StatCache(os.path.join(self.cache_dir, "stats.sqlite"), stat_cache_config['snapshot_days'])
+            self.orphan_cache = OrphanCache(os.path.join(self.cache_dir, "orphans.sqlite"), stat_cache_config['snapshot_days'])
+
         # connect to qb
         self.qb = self.connect_to_qb(self.server, self.port)
 
@@ -33,63 +91,108 @@ class TorrentManager:
         tracker_json_path = util.Config_Manager.get("tracker_config")
         if tracker_json_path:
             self.tracker_options = util.load_trackers(tracker_json_path)
+            self.tracker_matcher = TrackerMatcher(self.tracker_options)
+
+        # declarative tag rules
+        tag_rules_config = util.Config_Manager.get("tag_rules")
+        try:
+            self.tag_rules = TagRuleEngine(tag_rules_config['rules'] or [], tag_rules_config['report_timing'])
+        except ValueError as e:
+            print(f"ERROR: Invalid tag_rules: {e}")
+            sys.exit(1)
+
+        # tracker messages that mean a torrent is unregistered
+        unregistered_config = util.Config_Manager.get("unregistered_messages")
+        try:
+            self.message_classifier = MessageClassifier(unregistered_config['keywords'] or [], unregistered_config['patterns'] or [])
+        except ValueError as e:
+            print(f"ERROR: {e}")
+            sys.exit(1)
+
+        # TorrentInfo keeps the torrent list fields analysis reads, plus those tag rules read
+        self.torrent_fields = TORRENT_FIELDS + tuple(field for field in self.tag_rules.torrent_fields if field not in TORRENT_FIELDS)
+        self.context = None     # per-run TorrentInfo state, see get_torrents
 
     def get_torrents(self):
 
         # process torrents and create list of TorrentInfo objects
         print(f"\n=== Phase 1: Getting a list of torrents from qBitTorrent ===")
+        self.cycle += 1
+
+        # ages and delete days are worked out relative to when the snapshot was taken,
+        # so replays of the same snapshot give the same results
+        if self.replay_snapshot:
+            util.Current_Time = self.replay_snapshot["recorded_at"]
+
+        # Per-run fetch state, shared by every batch of torrents ingested below.
+        # Resume from the checkpoint left by an interrupted or aborted run, if recent.
+        retry_config = util.Config_Manager.get("fetch_retry")
+        self._checkpoint = None
+        if self.cache_dir:
+            self._checkpoint = FetchCheckpoint(os.path.join(self.cache_dir, "fetch_checkpoint.jsonl"), retry_config['checkpoint_max_age_minutes'])
+        self._resumed = self._checkpoint.load() if self._checkpoint else {}
+        if self._resumed:
+            print(f"Resuming from checkpoint: {len(self._resumed)} torrent(s) already fetched")
+        controller = self._build_controller()
+        self._fetcher = self._build_fetcher(controller)
+        self._fetch_errors = []             # (name, hash, exception)
+        self._fetch_stats = defaultdict(int)
+        self._file_features = self._get_file_features()
+
+        # Fresh per-run state for TorrentInfo construction (see RunContext). Hardlinks are
+        # checked afterwards, for every torrent at once. File stats go through the
+        # persistent stat cache if enabled, else a stat store for this run only.
+        tag_hardlink = util.Config_Manager.get('options')['tag_hardlink']
+        if self.stat_cache:
+            self.stat_cache.begin_run()
+        stat_store = self.stat_cache or StatCache()
+        self.context = RunContext(self.tracker_matcher, self.message_classifier, self._load_files, self.torrent_fields, tag_hardlink, stat_store)
+
+        # Either stream the torrent list page by page (bounded memory), or keep a local
+        # mirror updated from sync/maindata deltas (cheap repeated cycles).
+        page_size = util.Config_Manager.get("page_size") or 0
         try:
-            qb_torrents = self.qb.torrents_info()
-        except Exception as e:
-            print(f"ERROR! Failed to get torrent list from qBitTorrent: {e}")
-            print(f"Exiting!")
-            exit(1)  # Exit early if we can't fetch the torrents
-
-        # Phase A: fetch each torrent's trackers and files in parallel (I/O bound).
-        # qbittorrentapi wraps a requests.Session, which isn't safe to share across
-        # threads, so each worker thread lazily builds its own client (thread-local).
-        fetched = {}            # hash -> (torrent_trackers, torrent_files)
-        errors = []             # (name, hash, exception)
-        thread_local = threading.local()
-
-        def worker_client():
-            client = getattr(thread_local, "client", None)
-            if client is None:
-                client = self._build_client()
-                thread_local.client = client
-            return client
-
-        def fetch(torrent_dict):
-            h, name = torrent_dict.hash, torrent_dict.name
+            if page_size > 0:
+                live_hashes, full_refresh = self._ingest_pages(page_size), True
+            else:
+                live_hashes, full_refresh = self._ingest_sync()
+        finally:
+            self._fetcher.close()
+
+        # hardlink stage for the torrents built this run (see src/hardlinks.py)
+        self.context.defer_hardlinks = False
+        if self.context.hardlink_pending:
+            self.detect_hardlinks(self.context.hardlink_pending)
+            self.context.hardlink_pending = []
+
+        # group cross-seeds, in torrent list order, for cross-seed analysis
+        grouping_config = util.Config_Manager.get("cross_seed_grouping")
+        by_content, match_inode = grouping_config['by_content'], grouping_config['match_inode']
+        if by_content or match_inode:
             try:
-                qb = worker_client()
-                trackers = qb.torrents_trackers(h)
-                files = qb.torrents_files(h)
-                return (h, name, trackers, files, None)
+                self._ensure_files(self.torrent_info_list.values())
             except Exception as e:
-                return (h, name, None, None, e)
-
-        workers = util.Config_Manager.get("fetch_workers") or 4
-        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
-            futures = [executor.submit(fetch, td) for td in qb_torrents]
-            for future in tqdm(concurrent.futures.as_completed(futures), total=len(futures), desc="Fetching torrent details", unit=" torrent", ncols=120):
-                h, name, trackers, files, err = future.result()
-                if err is not None:
-                    errors.append((name, h, err))
-                else:
-                    fetched[h] = (trackers, files)
-
-        # Phase B: construct TorrentInfo sequentially. Construction mutates class-level
-        # shared state (ContentPath_Dict, Stat_Cache), so it must stay single-threaded;
-        # iterating qb_torrents in order keeps cross-seed grouping deterministic.
-        for torrent_dict in tqdm(qb_torrents, desc="Processing torrents", unit=" torrent", ncols=120):
-            if torrent_dict.hash not in fetched:
-                continue  # fetch failed for this torrent; reported below
-            torrent_trackers, torrent_files = fetched[torrent_dict.hash]
-            self.torrent_info_list[torrent_dict.hash] = TorrentInfo(torrent_dict, torrent_files, torrent_trackers, self.tracker_options)
-
-        # If any fetch failed, report every failure and abort. Proceeding with missing
-        # torrents could corrupt cross-seed analysis and lead to wrong deletions.
+                print(f"Error: {e}. Grouping cross-seeds by content_path only this run.")
+                by_content = match_inode = False
+        self.context.index_cross_seeds(self.torrent_info_list.values(), by_content, match_inode)
+
+        if controller and controller.latencies:
+            print(controller.summary())
+        if self.file_cache:
+            print(f"File lists: {self._fetch_stats['files_cached']} cached, {self._fetch_stats['files_fetched']} fetched, {self._fetch_stats['files_skipped']} not needed")
+            if full_refresh:
+                self.file_cache.garbage_collect(live_hashes)
+        if self.tracker_cache:
+            print(f"Tracker lists: {self._fetch_stats['trackers_cached']} cached, {self._fetch_stats['trackers_fetched']} fetched or resumed")
+            if full_refresh:
+                self.tracker_cache.garbage_collect(live_hashes)
+
+        # If any fetch failed (after retries), report every failure. Past the failure
+        # budget, abort: the checkpoint is kept so the next run resumes from it. Within
+        # the budget, carry on without those torrents, but missing torrents could
+        # corrupt cross-seed analysis, so no delete decisions are made this run.
+        errors = self._fetch_errors
+        self.missing_hashes = {h for _, h, _ in errors}
         if errors:
             print(f"\nERROR: Failed to fetch details for {len(errors)} torrent(s):")
             display_limit = 25
@@ -97,12 +200,413 @@ class TorrentManager:
                 print(f"  - {name} ({h}): {err}")
             if len(errors) > display_limit:
                 print(f"  ... and {len(errors) - display_limit} more.")
-            print("Exiting without making changes!")
-            exit(1)
+            if self._checkpoint:
+                self._checkpoint.close()
+            if len(errors) > retry_config['max_failed_torrents']:
+                raise RuntimeError(f"{len(errors)} torrent(s) failed to fetch (max_failed_torrents is {retry_config['max_failed_torrents']}); stopping without making changes")
+            print(f"Continuing with {len(errors)} torrent(s) missing (max_failed_torrents is {retry_config['max_failed_torrents']}). Delete/cross-seed tags, auto-delete and orphan moves are skipped this run.")
+        elif self._checkpoint:
+            self._checkpoint.remove()
+
+        self.print_unregistered_summary()
 
         # store hashes per tag in a list, used for keep_last
         self.build_tag_to_hashes()
 
+    def _ingest_sync(self):
+
+        try:
+            changed, removed = self.sync_state.update(self.qb)
+        except Exception as e:
+            raise RuntimeError(f"Failed to get torrent list from qBitTorrent: {e}") from e
+
+        # Only torrents new or changed in more than their volatile fields in the sync
+        # delta need their details refetched and their TorrentInfo rebuilt; tracker,
+        # trackers_count and state aren't volatile, so a torrent whose tracker status
+        # changes has its trackers read again. Every full_refresh_cycles cycles everything
+        # is rebuilt anyway, to pick up state the delta doesn't carry (tracker messages
+        # that change on their own, hardlinks).
+        full_refresh_cycles = util.Config_Manager.get("full_refresh_cycles") or 0
+        full_refresh = self.cycle == 1 or (full_refresh_cycles > 0 and (self.cycle - 1) % full_refresh_cycles == 0)
+        if full_refresh:
+            rebuild = set(self.sync_state.torrents)
+        else:
+            rebuild = changed | {h for h in self.sync_state.torrents if h not in self.torrent_info_list}
+            print(f"Sync cycle {self.cycle}: {len(rebuild)} changed, {len(removed)} removed, {len(self.sync_state.torrents)} total")
+        qb_torrents = {h: self.sync_state.torrent_dict(h, self.qb) for h in self.sync_state.torrents if h in rebuild}
+
+        fetched, fresh_trackers = self._fetch_details(qb_torrents, self.torrent_info_list, show_progress=True)
+
+        # Build TorrentInfo in sync order. Unchanged torrents keep their TorrentInfo, with
+        # their volatile fields (speeds, peer counts, ...) refreshed and per-run state reset.
+        previous_info_list = self.torrent_info_list
+        self.torrent_info_list = defaultdict(list)
+        with tqdm(total=len(self.sync_state.torrents), desc="Processing torrents", unit=" torrent", ncols=120) as progress:
+            built = self._build_torrent_infos({h: qb_torrents[h] for h in self.sync_state.torrents if h in fetched}, fetched, progress)
+            for h in self.sync_state.torrents:
+                if h in built:
+                    self.torrent_info_list[h] = built[h]
+                elif h not in rebuild and h in previous_info_list:
+                    torrent_info = previous_info_list[h]
+                    torrent_info.refresh(self.sync_state.torrents[h])
+                    torrent_info.reset()
+                    torrent_info.context = self.context
+                    self.torrent_info_list[h] = torrent_info
+                    progress.update(1)
+                # otherwise the fetch failed for this torrent; reported by get_torrents
+
+        self._store_trackers(qb_torrents, fetched, fresh_trackers)
+        return set(self.sync_state.torrents), full_refresh
+
+    def _ingest_pages(self, page_size):
+
+        # Streaming mode: page through torrents_info() and push each page through
+        # fetching and TorrentInfo construction before requesting the next, so the raw
+        # torrent list and fetched details never sit in memory for the whole library.
+        previous_info_list = self.torrent_info_list
+        self.torrent_info_list = defaultdict(list)
+        live_hashes = set()
+        with tqdm(desc="Processing torrents", unit=" torrent", ncols=120) as progress:
+            for page in self._torrent_pages(page_size):
+                # a torrent shifting pages between requests may show up twice; skip repeats
+                qb_torrents = {td.hash: td for td in page if td.hash not in live_hashes}
+                live_hashes.update(qb_torrents)
+                self._ingest_page(qb_torrents, previous_info_list)
+                progress.update(len(qb_torrents))
+
+            # A torrent removed while paging shifts the later pages up, so the torrent
+            # that moved across the page boundary is never served. A second pass over the
+            # pages, keeping only hashes, finds what the first one missed, which is then
+            # fetched by hash, a page at a time. Those whose details then fail to fetch
+            # count as missing like any other, which blocks delete and orphan decisions
+            # for the run; those no longer listed were removed.
+            missed = self._missed_by_pages(live_hashes, page_size)
+            if missed:
+                print(f"\n{len(missed)} torrent(s) shifted between pages; fetching them separately")
+                for i in range(0, len(missed), page_size):
+                    try:
+                        page = self.qb.torrents_info(torrent_hashes="|".join(missed[i:i + page_size]))
+                    except Exception as e:
+                        raise RuntimeError(f"Failed to get torrent list from qBitTorrent: {e}") from e
+                    qb_torrents = {td.hash: td for td in page if td.hash not in live_hashes}
+                    live_hashes.update(qb_torrents)
+                    self._ingest_page(qb_torrents, previous_info_list)
+                    progress.update(len(qb_torrents))
+        return live_hashes
+
+    def _ingest_page(self, qb_torrents, previous_info_list):
+        fetched, fresh_trackers = self._fetch_details(qb_torrents, previous_info_list)
+        self.torrent_info_list.update(self._build_torrent_infos({h: td for h, td in qb_torrents.items() if h in fetched}, fetched))
+        self._store_trackers(qb_torrents, fetched, fresh_trackers)
+
+    def _missed_by_pages(self, live_hashes, page_size):
+        # hashes the pages didn't serve, in list order, from a second paged listing of
+        # which only the hashes are kept
+        missed = {}
+        for page in self._torrent_pages(page_size):
+            missed.update((td.hash, None) for td in page if td.hash not in live_hashes)
+        return list(missed)
+
+    def _build_torrent_infos(self, qb_torrents, fetched, progress=None):
+        # TorrentInfo for each of qb_torrents (hash -> torrent_dict, all in fetched), in
+        # the same order, built against the run context
+        built = {}
+        for h, torrent_dict in qb_torrents.items():
+            torrent_trackers, torrent_files = fetched[h]
+            built[h] = TorrentInfo(torrent_dict, torrent_files, torrent_trackers, self.context)
+            if self.recorded_payloads is not None:
+                self.recorded_payloads[h] = (torrent_dict, torrent_trackers)
+            if progress is not None:
+                progress.update(1)
+        return built
+
+    def detect_hardlinks(self, torrent_infos):
+        start = time.perf_counter()
+        scanner = HardlinkScanner(self.context, util.Config_Manager.get("hardlink_scan_workers"))
+        hardlinked = scanner.scan(torrent_infos)
+        print(f"Hardlinks: {hardlinked} of {len(torrent_infos)} torrents hardlinked ({scanner.files_checked} files in {len(scanner.directories)} directories checked in {time.perf_counter() - start:.1f}s)")
+
+    def _torrent_pages(self, page_size):
+        # Sorted by added_on so torrents added mid-scan land on the last page rather than
+        # shifting every page after them
+        offset = 0
+        while True:
+            try:
+                page = self.qb.torrents_info(sort="added_on", limit=page_size, offset=offset)
+            except Exception as e:
+                raise RuntimeError(f"Failed to get torrent list from qBitTorrent: {e}") from e
+            if page:
+                yield page
+            if len(page) < page_size:
+                return
+            offset += page_size
+
+    def _fetch_details(self, qb_torrents, previous_info_list, show_progress=False):
+        # Fetch trackers and files for a batch of torrents, in parallel (I/O bound), using
+        # the backend selected by fetch_backend (see src/fetcher.py). Returns
+        # (hash -> (trackers, files), hashes whose trackers came fresh from qBittorrent).
+
+        # A torrent's file list never changes, so reuse the one from the previous cycle,
+        # or from the on-disk cache, and only call torrents_files() for unseen hashes.
+        # Torrents whose file list nothing in this run needs are skipped altogether;
+        # their TorrentInfo loads it lazily if it's accessed after all.
+        known_files = {}
+        for h in qb_torrents:
+            previous = previous_info_list.get(h)
+            if previous is not None and previous.loaded_files():
+                known_files[h] = previous.loaded_files()
+        if self.file_cache:
+            known_files.update(self.file_cache.load(h for h in qb_torrents if h not in known_files))
+        for h, td in qb_torrents.items():
+            if h not in known_files and not self._needs_files(td):
+                known_files[h] = SKIP_FILES
+
+        # Tracker lists are reused from the cache unless expired or the torrent list shows
+        # a change (working tracker, tracker count, state). Torrents already tagged as
+        # unregistered/erroring use the short TTL so their detection stays fresh.
+        cached_trackers = {}
+        if self.tracker_cache:
+            bad_tags = {TagNames.UNREGISTERED.value, TagNames.TRACKER_ERROR.value}
+            for h, entry in self.tracker_cache.load(qb_torrents).items():
+                torrent_dict = qb_torrents[h]
+                is_bad = any(t.strip() in bad_tags for t in torrent_dict.get("tags", "").split(","))
+                if not self.tracker_cache.needs_refresh(torrent_dict, entry, util.Current_Time, is_bad):
+                    cached_trackers[h] = entry[3]
+
+        jobs = []
+        for h, td in qb_torrents.items():
+            # an empty list is a valid cached or known value, so test membership
+            resumed_trackers, resumed_files = self._resumed.get(h, (None, None))
+            trackers = cached_trackers[h] if h in cached_trackers else resumed_trackers
+            files = known_files[h] if h in known_files else resumed_files
+            jobs.append((td, trackers, files))
+        needs_fetch = {td.hash for td, trackers, files in jobs if trackers is None or files is None}
+
+        fetched = {}            # hash -> (torrent_trackers, torrent_files)
+        results = self._fetcher.fetch(jobs)
+        if show_progress:
+            results = tqdm(results, total=len(jobs), desc="Fetching torrent details", unit=" torrent", ncols=120)
+        for h, name, trackers, files, err in results:
+            if err is not None:
+                self._fetch_errors.append((name, h, err))
+            else:
+                if files is SKIP_FILES:
+                    files = None
+                fetched[h] = (trackers, files)
+                if self._checkpoint and h in needs_fetch:
+                    self._checkpoint.append(h, trackers, files)
+
+        # persist newly fetched file lists
+        if self.file_cache:
+            new_files = {h: files for h, (_, files) in fetched.items() if h not in known_files and files is not None}
+            self.file_cache.store(new_files)
+            skipped = sum(1 for files in known_files.values() if files is SKIP_FILES)
+            self._fetch_stats['files_cached'] += len(fetched) - len(new_files) - skipped
+            self._fetch_stats['files_fetched'] += len(new_files)
+            self._fetch_stats['files_skipped'] += skipped
+
+        fresh_trackers = {h for h in fetched if h not in cached_trackers and h not in self._resumed}
+        self._fetch_stats['trackers_cached'] += len(fetched) - len(fresh_trackers)
+        self._fetch_stats['trackers_fetched'] += len(fresh_trackers)
+        return fetched, fresh_trackers
+
+    def _get_file_features(self):
+        # File lists feed the rarred, malware, season-pack and hardlink checks and the
+        # orphan scan. The checks only end up in tags and tag-driven states, which only
+        # update-tags writes, so work out which of them this run actually uses.
+        features = set()
+        if not self.operations or "update-tags" in self.operations:
+            features.update(("rarred", "dangerous", "season_pack"))
+            if util.Config_Manager.get('options')['tag_hardlink']:
+                features.add("hardlink")
+            if self.tag_rules.uses_files:
+                features.add("tag_rules")
+        config_orphaned = util.Config_Manager.get('orphaned_files')
+        if "move-orphaned" in self.operations and config_orphaned['move_orphaned'] and config_orphaned['move_orphaned_after_days'] >= 0:
+            features.add("orphans")
+        grouping_config = util.Config_Manager.get('cross_seed_grouping')
+        if grouping_config['by_content'] or grouping_config['match_inode']:
+            features.add("cross_seed")
+        return features
+
+    def _needs_files(self, torrent_dict):
+        # Whether to fetch this torrent's file list up front: only when one of this run's
+        # features could come out differently depending on it
+        features = self._file_features
+        # rarred and malware look at every file of every torrent
+        if "rarred" in features or "dangerous" in features or "hardlink" in features or "tag_rules" in features or "cross_seed" in features:
+            return True
+        if "orphans" in features:
+            excluded_save_paths = util.Config_Manager.get('orphaned_files')['excluded_save_paths'] or []
+            return TorrentInfo.host_save_path(torrent_dict['save_path']) not in excluded_save_paths
+        return False
+
+    def _load_files(self, torrent_hash):
+        # Lazy file list loader handed to TorrentInfo: on-disk cache first, then qBittorrent
+        if self.file_cache:
+            cached = self.file_cache.load([torrent_hash])
+            if torrent_hash in cached:
+                return cached[torrent_hash]
+        files = self.qb.torrents_files(torrent_hash)
+        if self.file_cache:
+            self.file_cache.store({torrent_hash: files})
+        return files
+
+    def load_payload(self, torrent_hash):
+        # The full torrent list entry, trackers and files of one torrent, for output that
+        # shows more than TorrentInfo keeps (to_str with include_extended)
+        torrent_dict = self.qb.torrents_info(torrent_hashes=torrent_hash)[0]
+        return torrent_dict, self.qb.torrents_trackers(torrent_hash), self.qb.torrents_files(torrent_hash)
+
+    def _ensure_files(self, torrent_infos):
+        # Bulk version of the lazy load: fetch missing file lists in parallel before a
+        # pass that reads many of them
+        missing = [torrent_info for torrent_info in torrent_infos if torrent_info.loaded_files() is None]
+        if not missing:
+            return
+        by_hash = {torrent_info._hash: torrent_info for torrent_info in missing}
+        if self.file_cache:
+            for h, files in self.file_cache.load(by_hash).items():
+                by_hash.pop(h).set_files(files)
+        # () in place of the trackers: they're not kept, and not needed here
+        jobs = [(torrent_info.torrent_dict, (), None) for torrent_info in by_hash.values()]
+        fetcher = self._build_fetcher(self._build_controller())
+        new_files = {}
+        for h, name, _, files, err in tqdm(fetcher.fetch(jobs), total=len(jobs), desc="Fetching file lists", unit=" torrent", ncols=120):
+            if err is not None:
+                raise RuntimeError(f"Failed to fetch file list for {name} ({h}): {err}")
+            by_hash[h].set_files(files)
+            new_files[h] = files
+        fetcher.close()
+        if self.file_cache:
+            self.file_cache.store(new_files)
+
+    def _store_trackers(self, qb_torrents, fetched, fresh_trackers):
+        # remember freshly fetched tracker lists, along with whether they looked bad
+        if not self.tracker_cache:
+            return
+        self.tracker_cache.store({
+            h: (qb_torrents[h], torrent_info.is_unregistered or torrent_info.is_tracker_error, fetched[h][0])
+            for h in fresh_trackers
+            if (torrent_info := self.torrent_info_list.get(h)) is not None
+        }, util.Current_Time)
+
+    def apply_plan(self, path):
+
+        # Execute a plan written by --plan. Entries already applied (listed in
+        # PLAN.applied) are skipped, so an interrupted apply can simply be rerun.
+        print(f"\n=== Apply plan ===\n")
+        try:
+            _, entries = read_plan(path)
+        except Exception as e:
+            print(f"ERROR: Failed to read plan '{path}': {e}")
+            sys.exit(1)
+
+        applied_log = AppliedLog(path)
+        applied = applied_log.load()
+        pending = [entry for entry in entries if entry["id"] not in applied]
+        if len(pending) < len(entries):
+            print(f"Resuming: {len(entries) - len(pending)} of {len(entries)} entries already applied.")
+
+        if self.dry_run:
+            for entry in pending:
+                print(f"  [DRY RUN] Will {self.describe_plan_entry(entry)}")
+            print(f"\n[DRY RUN] Will apply {len(pending)} entries.")
+            return
+
+        # Entries run in parallel where they touch different torrents/paths, and in plan
+        # order where they share one. Empty directory cleanup waits for everything before it.
+        tasks = []
+        for entry in pending:
+            tasks.append(WriteTask(
+                self.describe_plan_entry(entry),
+                self.plan_entry_keys(entry),
+                lambda qb, entry=entry: self.apply_plan_entry(qb, entry),
+                requests=2 if entry["op"] == "delete_torrent" else 1,
+                barrier=entry["op"] == "remove_empty_dirs",
+                context=entry["id"],
+            ))
+        report = WriteReport()
+        for task, _, error in self._build_write_executor().run(tasks, report):
+            if error is None:
+                print(f"  {task.description[0].upper()}{task.description[1:]}")
+                applied_log.mark(task.context)
+        applied_log.close()
+
+        if report.failures:
+            print(f"\nApplied {report.succeeded} entries, {len(report.failures)} failed. Rerun --apply to retry them.")
+            report.print_summary()
+        else:
+            print(f"\nApplied {report.succeeded} entries.")
+
+    def plan_entry_keys(self, entry):
+        op = entry["op"]
+        if op in self.WRITE_DESCRIPTIONS:
+            return entry["hashes"]
+        if op == "delete_torrent":
+            return [entry["hash"]]
+        if op == "move_file":
+            return [entry["src"], entry["dst"]]
+        return [entry.get("path")]
+
+    def describe_plan_entry(self, entry):
+        op = entry["op"]
+        if op in self.WRITE_DESCRIPTIONS:
+            return f"{self.WRITE_DESCRIPTIONS[op]} '{entry['value']}' for {len(entry['hashes'])} torrent(s)"
+        if op == "delete_torrent":
+            return f"remove torrent '{entry['name']}' ({entry['hash']})"
+        if op == "move_file":
+            return f"move {entry['src']} to {entry['dst']}"
+        if op == "remove_file":
+            return f"remove {entry['path']}"
+        if op == "remove_empty_dirs":
+            return f"remove empty directories in {entry['path']}"
+        return f"apply unknown entry {entry}"
+
+    def apply_plan_entry(self, qb, entry):
+        # Every op is safe to repeat: an entry interrupted after it took effect but
+        # before it was marked as applied just runs again.
+        op = entry["op"]
+        if op in self.WRITE_DESCRIPTIONS:
+            self.qb_write(qb, op, entry["value"], entry["hashes"])
+        elif op == "delete_torrent":
+            try:
+                self.export_and_delete(qb, entry["hash"], entry["backup_destination"])
+            except qbittorrentapi.NotFound404Error:
+                pass  # already removed
+        elif op == "move_file":
+            if not os.path.exists(entry["src"]):
+                if os.path.exists(entry["dst"]):
+                    return  # already moved
+                raise FileNotFoundError(f"{entry['src']} no longer exists")
+            self.move_file(entry["src"], entry["dst"])
+        elif op == "remove_file":
+            if os.path.exists(entry["path"]):
+                os.remove(entry["path"])
+        elif op == "remove_empty_dirs":
+            self.remove_empty_dirs(entry["path"])
+        else:
+            raise ValueError(f"Unknown plan op '{op}'")
+
+    def record_snapshot(self, path):
+        # Save this run's torrent list, trackers and files for --replay. File lists this
+        # run didn't need are fetched now, so the snapshot serves every operation.
+        self._ensure_files(self.torrent_info_list.values())
+        save_snapshot(path, util.Current_Time, self.qb.app.version, self.torrent_info_list, self.recorded_payloads)
+        print(f"Recorded snapshot of {len(self.torrent_info_list)} torrents to '{path}'")
+
+    def commit_sync_state(self):
+        # called once a cycle's analysis and writes are done; until then the next
+        # sync/maindata request repeats this cycle's delta (see src/syncstate.py)
+        self.sync_state.commit()
+
+    def save_stat_cache(self):
+        # persist what this run stat'ed and report how much the cache saved
+        if self.stat_cache is None or self.context is None:
+            return
+        print(self.stat_cache.summary())
+        self.stat_cache.save()
+
     def warn_unmatched_trackers(self):
 
         # Collect announce hosts that matched no entry in trackers.json, deduplicated,
@@ -121,6 +625,15 @@ class TorrentManager:
             print(f"  - {host if self.no_color else f'{Fore.YELLOW}{host}{Fore.RESET}'}  (e.g. {example_name})")
             print()
 
+    def print_unregistered_summary(self):
+        # how many torrents each unregistered_messages rule matched
+        hits = defaultdict(int)
+        for torrent_info in self.torrent_info_list.values():
+            if torrent_info.unregistered_rule is not None:
+                hits[torrent_info.unregistered_rule] += 1
+        if hits:
+            print(f"Unregistered: {sum(hits.values())} torrent(s) - " + ", ".join(f"'{rule}' {count}" for rule, count in sorted(hits.items(), key=lambda item: -item[1])))
+
     def analyze_torrents(self):
 
         # process the list for cross-seeds and deletes and set torrentinfo object props accordingly
@@ -137,13 +650,18 @@ class TorrentManager:
 
         # set torrentinfo props, separate loop to make sure cross-seed orphans are set properly
         # for torrent_info in self.torrent_info_list.values():
+        self._active_tag_rules = self.tag_rules.active_rules(self._file_features)
         for torrent_info in tqdm(self.torrent_info_list.values(), desc="Processing torrents (second pass)", unit=" torrent", ncols=120):
             self.set_torrent_info(torrent_info)
+        self.tag_rules.print_timing()
 
     def update_torrents(self):
 
         i = 0
         print(f"\n=== Update torrents ===\n")
+        # changes are collected here and sent grouped by tag, upload limit or category
+        # once every torrent is done
+        plan = WritePlan()
         for torrent_info in self.torrent_info_list.values():
 
             if torrent_info.update_state == UpdateState(0):
@@ -157,18 +675,20 @@ class TorrentManager:
 
             # add tags
             if UpdateState.TAG_ADD in torrent_info.update_state:
-                self.qb_add_tag(torrent_info)
+                self.qb_add_tag(torrent_info, plan)
 
             # remove tags
             if UpdateState.TAG_REMOVE in torrent_info.update_state:
-                self.qb_remove_tag(torrent_info)
+                self.qb_remove_tag(torrent_info, plan)
 
             # set upload limit
             if UpdateState.UPLOAD_LIMIT in torrent_info.update_state:
-                self.qb_set_upload_limit(torrent_info)
+                self.qb_set_upload_limit(torrent_info, plan)
 
             if UpdateState.CATEGORY_REMOVE in torrent_info.update_state:
-                self.qb_remove_category(torrent_info)
+                self.qb_remove_category(torrent_info, plan)
+
+        self.apply_write_plan(plan)
 
         if i > 0:
             print(f"\nProcessed {len(self.torrent_info_list)} torrents and updated {i} torrents.")
@@ -177,6 +697,9 @@ class TorrentManager:
 
     def build_tag_to_hashes(self):
 
+        # Rebuilt from scratch every cycle
+        self.torrent_tag_hashes_list.clear()
+
         # Iterate over all torrent info in the list
         for torrent_info in self.torrent_info_list.values():
             # Add the torrent hash to the corresponding tag in the defaultdict
@@ -194,24 +717,10 @@ class TorrentManager:
         if torrent_info.tracker_name:
             torrent_info.torrent_add_tag(torrent_info.tracker_name)
 
-        unregistered_tag = TagNames.UNREGISTERED.value
-        torrent_info.torrent_add_tag(unregistered_tag) if torrent_info.is_unregistered else torrent_info.torrent_remove_tag(unregistered_tag)
-
-        tracker_error_tag = TagNames.TRACKER_ERROR.value
-        (
-            torrent_info.torrent_add_tag(tracker_error_tag)
-            if torrent_info.is_tracker_error and not torrent_info.is_unregistered
-            else torrent_info.torrent_remove_tag(tracker_error_tag)
-        )
-
-        rarred_tag = TagNames.RARRED.value
-        torrent_info.torrent_add_tag(rarred_tag) if torrent_info.is_rarred else torrent_info.torrent_remove_tag(rarred_tag)
-
-        season_pack_tag = TagNames.SEASON_PACK.value
-        torrent_info.torrent_add_tag(season_pack_tag) if torrent_info.is_season_pack else torrent_info.torrent_remove_tag(season_pack_tag)
-
-        throttled_tag = TagNames.THROTTLED.value
-        torrent_info.torrent_add_tag(throttled_tag) if torrent_info.torrent_dict["up_limit"] > 0 else torrent_info.torrent_remove_tag(throttled_tag)
+        # unregistered, tracker error, rarred, season pack, throttled, hardlink and the
+        # tag_rules from config (see src/tagrules.py)
+        add, remove = self.tag_rules.evaluate(torrent_info, self._active_tag_rules)
+        torrent_info.torrent_update_tags(add, remove)
 
         ptp_archive_save_path = util.Config_Manager.get('options')['ptp_archive_save_path']
         if ptp_archive_save_path and torrent_info.save_path_host == util.format_path(ptp_archive_save_path) and torrent_info.tracker_name == "PTP":
@@ -228,26 +737,22 @@ class TorrentManager:
             if not hasParent:
                 torrent_info.cross_seed_state = CrossSeedState.ORPHAN
 
-        # update cross-seed tags
-        self.update_cross_seed_tags(torrent_info)
+        # Cross-seed and delete tags are only trustworthy when every torrent was fetched
+        if not self.missing_hashes:
 
-        # update delete tags
-        if not torrent_info.torrent_trackers_filtered:
-            torrent_info.delete_state = DeleteState.DELETE_NOW
-            torrent_info.torrent_remove_category()
-        self.update_delete_tags(torrent_info)
+            # update cross-seed tags
+            self.update_cross_seed_tags(torrent_info)
+
+            # update delete tags
+            if not torrent_info.tracker_count:
+                torrent_info.delete_state = DeleteState.DELETE_NOW
+                torrent_info.torrent_remove_category()
+            self.update_delete_tags(torrent_info)
 
         # Remove category if we are in an error state. Allows sonarr and radarr to give up.
         if torrent_info.is_tracker_error or torrent_info.is_unregistered:
             torrent_info.torrent_remove_category()
 
-        # hardlink
-        if util.Config_Manager.get('options')['tag_hardlink']:
-            hl_tag_add = TagNames.HARDLINK.value if torrent_info.is_hardlinked else TagNames.NO_HARDLINK.value
-            hl_tag_remove = TagNames.NO_HARDLINK.value if torrent_info.is_hardlinked else TagNames.HARDLINK.value
-            torrent_info.torrent_add_tag(hl_tag_add)
-            torrent_info.torrent_remove_tag(hl_tag_remove)
-
 
     def update_cross_seed_tags(self, torrent_info):
 
@@ -291,7 +796,7 @@ class TorrentManager:
         if torrent_info.torrent_dict['amount_left'] > 0:
             torrent_info.cross_seed_state = CrossSeedState.NONE
         else:
-            file_torrents = TorrentInfo.ContentPath_Dict[torrent_info.content_path]
+            file_torrents = self.context.cross_seeds[torrent_info.content_path]
             if len(file_torrents) > 1:
                 if torrent_info.torrent_dict["downloaded"] == 0:
                     torrent_info.cross_seed_state = CrossSeedState.PEER
@@ -301,8 +806,7 @@ class TorrentManager:
                 torrent_info.cross_seed_state = CrossSeedState.NONE
 
             # Add cross-seed hashes
-            for torrent in file_torrents:
-                torrent_info.cross_seed_hashes.append(torrent._hash)
+            torrent_info.cross_seed_hashes += tuple(torrent._hash for torrent in file_torrents)
 
         # Determine deletion
         if torrent_info.torrent_dict["force_start"]:
@@ -313,7 +817,7 @@ class TorrentManager:
             torrent_info.delete_state = DeleteState.READY
 
         # Has dangerous file?
-        if torrent_info.is_dangerous:
+        if "dangerous" in self._file_features and torrent_info.is_dangerous:
             torrent_info.delete_state = DeleteState.MALWARE_DELETE
 
         # tracker_opts is None when the torrent matches no entry in trackers.json
@@ -332,10 +836,13 @@ class TorrentManager:
                 # which only holds once pass 1 completes. Record eligibility for now.
                 self._keep_last_eligible.append(torrent_info)
 
+    def _is_season_pack(self, torrent_info):
+        return "season_pack" in self._file_features and torrent_info.is_season_pack
+
     def handle_delete_state(self, torrent_info: TorrentInfo, tracker_delete_days):
 
         # Not cross-seeded and BTN
-        if torrent_info.cross_seed_state == CrossSeedState.NONE and torrent_info.tracker_name == "BTN" and torrent_info.is_season_pack:
+        if torrent_info.cross_seed_state == CrossSeedState.NONE and torrent_info.tracker_name == "BTN" and self._is_season_pack(torrent_info):
             torrent_info.delete_state = DeleteState.NEVER
             return
 
@@ -345,7 +852,7 @@ class TorrentManager:
             # Determine if BTN is involved in cross-seeds
             is_btn_involved = any(self.torrent_info_list[cross_hash].tracker_name == "BTN" for cross_hash in torrent_info.cross_seed_hashes)
 
-            if torrent_info.is_season_pack and is_btn_involved:
+            if self._is_season_pack(torrent_info) and is_btn_involved:
                 for cross_hash in torrent_info.cross_seed_hashes:
                     self.torrent_info_list[cross_hash].delete_state = DeleteState.NEVER
                 return
@@ -412,11 +919,46 @@ class TorrentManager:
             if torrent_info._hash in keep_last_hashes:
                 torrent_info.delete_state = DeleteState.KEEP_LAST
 
+    def _build_controller(self):
+        # AIMD controller that picks fetch concurrency at runtime; None means use the
+        # fixed fetch_workers / async_fetch limits as configured
+        adaptive_config = util.Config_Manager.get("adaptive_concurrency")
+        if not adaptive_config['enabled']:
+            return None
+        return AIMDController(adaptive_config['initial'], adaptive_config['min'], adaptive_config['max'])
+
+    def _build_retry_policy(self):
+        retry_config = util.Config_Manager.get("fetch_retry")
+        return RetryPolicy(retry_config['attempts'], retry_config['backoff_seconds'], retry_config['max_backoff_seconds'])
+
+    def _build_fetcher(self, controller=None):
+        # Phase 1 fetch backend: "threads" (a pool of qbittorrentapi clients) or
+        # "async" (one aiohttp session with a pooled connection, needs aiohttp).
+        backend = util.Config_Manager.get("fetch_backend")
+        if backend == "async" and not self.replay_snapshot:
+            if AsyncFetcher.available():
+                async_config = util.Config_Manager.get("async_fetch")
+                return AsyncFetcher(
+                    self.server,
+                    self.port,
+                    util.Config_Manager.get("username"),
+                    util.Config_Manager.get("password"),
+                    async_config['max_connections'],
+                    async_config['max_per_endpoint'],
+                    controller,
+                    self._build_retry_policy(),
+                )
+            print("WARNING: fetch_backend is 'async' but aiohttp is not installed (pip install aiohttp). Using threads.")
+        return ThreadFetcher(self._build_client, util.Config_Manager.get("fetch_workers") or 4, controller, self._build_retry_policy())
+
     def _build_client(self) -> qbittorrentapi.Client:
         # Build a qBittorrent client from config. Optional WebUI credentials are only
         # passed when set, so installs that bypass auth for the host/LAN are unchanged.
-        # Used both for the main client and for each parallel fetch worker (each thread
-        # needs its own, since the underlying requests.Session isn't thread-safe).
+        # Used both for the main client and for the fetch workers' client pool (a client
+        # serves one request at a time, since the underlying requests.Session isn't
+        # thread-safe).
+        if self.replay_snapshot:
+            return ReplayClient(self.replay_snapshot)
         client_kwargs = {"host": self.server, "port": self.port}
         username = util.Config_Manager.get("username")
         password = util.Config_Manager.get("password")
@@ -428,10 +970,11 @@ class TorrentManager:
 
     def connect_to_qb(self, server, port) -> qbittorrentapi.Client:
         try:
+            target = f"snapshot {self.replay_path}" if self.replay_snapshot else f"{server}:{port}"
             if self.no_color:
-                print(f"\nConnecting to: {server}:{port}")
+                print(f"\nConnecting to: {target}")
             else:
-                print(f"\nConnecting to: {Fore.GREEN}{server}:{port}{Fore.RESET}")
+                print(f"\nConnecting to: {Fore.GREEN}{target}{Fore.RESET}")
             qb = self._build_client()
             # Accessing qb.app.version forces the lazy login, so bad credentials or an
             # unreachable host fail here with a clear message rather than mid-run.
@@ -448,61 +991,102 @@ class TorrentManager:
 
 
 
-    def qb_add_tag(self, torrent_info: TorrentInfo):
+    def qb_add_tag(self, torrent_info: TorrentInfo, plan: WritePlan):
 
         torrent_hash = torrent_info._hash
         for tag in torrent_info.update_tags_add:
-            try:
-                if self.dry_run:
-                    print(f"  [DRY RUN] Will add tag '{tag if self.no_color else f'{Fore.GREEN}{tag}{Fore.RESET}'}' to torrent {torrent_hash if self.no_color else f'{Fore.CYAN}{torrent_hash}{Fore.RESET}'}")
-                else:
-                    self.qb.torrents_add_tags(tag, torrent_hash)
-                    print(f"  Adding tag '{tag if self.no_color else f'{Fore.GREEN}{tag}{Fore.RESET}'}' to torrent {torrent_hash if self.no_color else f'{Fore.CYAN}{torrent_hash}{Fore.RESET}'}")
-            except Exception as e:
-                print(f"  Failed to set tag '{tag}' for {torrent_hash}: {e}")
+            if self.dry_run:
+                print(f"  [DRY RUN] Will add tag '{tag if self.no_color else f'{Fore.GREEN}{tag}{Fore.RESET}'}' to torrent {torrent_hash if self.no_color else f'{Fore.CYAN}{torrent_hash}{Fore.RESET}'}")
+            else:
+                print(f"  Adding tag '{tag if self.no_color else f'{Fore.GREEN}{tag}{Fore.RESET}'}' to torrent {torrent_hash if self.no_color else f'{Fore.CYAN}{torrent_hash}{Fore.RESET}'}")
+                plan.add("add_tag", tag, torrent_hash)
 
-    def qb_remove_category(self, torrent_info: TorrentInfo):
+    def qb_remove_category(self, torrent_info: TorrentInfo, plan: WritePlan):
 
         category = torrent_info.torrent_dict["category"]
         torrent_hash = torrent_info._hash
-        try:
-            if self.dry_run:
-                print(f"  [DRY RUN] Will remove category '{category if self.no_color else f'{Fore.GREEN}{category}{Fore.RESET}'}' from torrent {torrent_hash if self.no_color else f'{Fore.CYAN}{torrent_hash}{Fore.RESET}'}")
-            else:
-                print(f"  Removing category '{category if self.no_color else f'{Fore.GREEN}{category}{Fore.RESET}'}' from torrent {torrent_hash if self.no_color else f'{Fore.CYAN}{torrent_hash}{Fore.RESET}'}")
-                self.qb.torrents_set_category("", torrent_hash)
-        except Exception as e:
-            print(f"  Failed to remove category on torrent for {torrent_hash}: {e}")
+        if self.dry_run:
+            print(f"  [DRY RUN] Will remove category '{category if self.no_color else f'{Fore.GREEN}{category}{Fore.RESET}'}' from torrent {torrent_hash if self.no_color else f'{Fore.CYAN}{torrent_hash}{Fore.RESET}'}")
+        else:
+            print(f"  Removing category '{category if self.no_color else f'{Fore.GREEN}{category}{Fore.RESET}'}' from torrent {torrent_hash if self.no_color else f'{Fore.CYAN}{torrent_hash}{Fore.RESET}'}")
+            plan.add("set_category", "", torrent_hash)
 
-    def qb_remove_tag(self, torrent_info: TorrentInfo):
+    def qb_remove_tag(self, torrent_info: TorrentInfo, plan: WritePlan):
 
         torrent_hash = torrent_info._hash
         for tag in torrent_info.update_tags_remove:
-            try:
-                if self.dry_run:
-                    print(f"  [DRY RUN] Will remove tag '{tag if self.no_color else f'{Fore.RED}{tag}{Fore.RESET}'}' from torrent {torrent_hash if self.no_color else f'{Fore.CYAN}{torrent_hash}{Fore.RESET}'}")
-                else:
-                    print(f"  Removing tag '{tag if self.no_color else f'{Fore.RED}{tag}{Fore.RESET}'}' from torrent {torrent_hash if self.no_color else f'{Fore.CYAN}{torrent_hash}{Fore.RESET}'}")
-                    self.qb.torrents_remove_tags(tag, torrent_hash)
-            except Exception as e:
-                print(f"  Failed to remove tag '{tag}' from {torrent_hash}: {e}")
+            if self.dry_run:
+                print(f"  [DRY RUN] Will remove tag '{tag if self.no_color else f'{Fore.RED}{tag}{Fore.RESET}'}' from torrent {torrent_hash if self.no_color else f'{Fore.CYAN}{torrent_hash}{Fore.RESET}'}")
+            else:
+                print(f"  Removing tag '{tag if self.no_color else f'{Fore.RED}{tag}{Fore.RESET}'}' from torrent {torrent_hash if self.no_color else f'{Fore.CYAN}{torrent_hash}{Fore.RESET}'}")
+                plan.add("remove_tag", tag, torrent_hash)
+
+    WRITE_DESCRIPTIONS = {
+        "add_tag": "set tag",
+        "remove_tag": "remove tag",
+        "set_upload_limit": "set upload limit",
+        "set_category": "set category",
+    }
 
-    def qb_set_upload_limit(self, torrent_info: TorrentInfo):
+    def apply_write_plan(self, plan: WritePlan):
+
+        # Send the planned writes, one request per tag, upload limit or category for up to
+        # write_batch_size hashes. A failed request is reported for each torrent it covered.
+        if not plan:
+            return
+        batch_size = util.Config_Manager.get("write_batch_size") or 500
+        tasks = []
+        requests = 0
+        for action, value, hashes in plan.batches(batch_size):
+            requests += 1
+            if self.plan_file:
+                self.plan_file.append(action, value=value, hashes=hashes)
+                continue
+            tasks.append(WriteTask(
+                f"{self.WRITE_DESCRIPTIONS[action]} '{value}' for {len(hashes)} torrent(s)",
+                hashes,
+                lambda qb, action=action, value=value, hashes=hashes: self.qb_write(qb, action, value, hashes),
+            ))
+        if self.plan_file:
+            print(f"\nPlanned {len(plan)} changes in {requests} requests.")
+            return
+        report = WriteReport()
+        for _ in self._build_write_executor().run(tasks, report):
+            pass
+        print(f"\nSent {len(plan)} changes in {requests} requests.")
+        report.print_summary()
+
+    def qb_write(self, qb, action, value, hashes):
+        if action == "add_tag":
+            qb.torrents_add_tags(value, hashes)
+        elif action == "remove_tag":
+            qb.torrents_remove_tags(value, hashes)
+        elif action == "set_upload_limit":
+            qb.torrents_set_upload_limit(value, hashes)
+        elif action == "set_category":
+            qb.torrents_set_category(value, hashes)
+
+    def _build_write_executor(self):
+        write_config = util.Config_Manager.get("write_executor")
+        return WriteExecutor(self._build_client, write_config['max_in_flight'], write_config['requests_per_second'])
+
+    def qb_set_upload_limit(self, torrent_info: TorrentInfo, plan: WritePlan):
 
         upload_limit = torrent_info.update_upload_limit
         torrent_hash = torrent_info._hash
-        try:
-            if self.dry_run:
-                print(f"  [DRY RUN] Will set upload_limit to '{upload_limit if self.no_color else f'{Fore.GREEN}{upload_limit}{Fore.RESET}'}' for torrent {torrent_hash if self.no_color else f'{Fore.CYAN}{torrent_hash}{Fore.RESET}'}")
-            else:
-                print(f"  Setting upload_limit to '{upload_limit if self.no_color else f'{Fore.GREEN}{upload_limit}{Fore.RESET}'}' for torrent {torrent_hash if self.no_color else f'{Fore.CYAN}{torrent_hash}{Fore.RESET}'}")
-                self.qb.torrents_set_upload_limit(upload_limit, torrent_hash)
-        except Exception as e:
-            print(f"  Failed to set upload limit for {torrent_hash}: {e}")
+        if self.dry_run:
+            print(f"  [DRY RUN] Will set upload_limit to '{upload_limit if self.no_color else f'{Fore.GREEN}{upload_limit}{Fore.RESET}'}' for torrent {torrent_hash if self.no_color else f'{Fore.CYAN}{torrent_hash}{Fore.RESET}'}")
+        else:
+            print(f"  Setting upload_limit to '{upload_limit if self.no_color else f'{Fore.GREEN}{upload_limit}{Fore.RESET}'}' for torrent {torrent_hash if self.no_color else f'{Fore.CYAN}{torrent_hash}{Fore.RESET}'}")
+            plan.add("set_upload_limit", upload_limit, torrent_hash)
 
     def move_orphaned(self):
         print("\n=== Find and move orphaned files ===")
 
+        if self.missing_hashes:
+            print(f"\nSkipping because {len(self.missing_hashes)} torrent(s) are missing; their files would look orphaned.")
+            return
+
         try:
             config_orphaned = util.Config_Manager.get('orphaned_files')
             if not config_orphaned['move_orphaned']:
@@ -521,73 +1105,84 @@ class TorrentManager:
             print(f"Error: Failed to retrieve orphaned_files config: {e}")
             return
 
-        # Generate list of unique files
-        unique_files = set()
-        unique_save_paths = set()
-        for torrent_info in self.torrent_info_list.values():
-            unique_save_paths.add(torrent_info.save_path_host)
+        # Only torrents whose files can sit under a scanned save path matter: those saved
+        # in (or above) a save path that isn't excluded. Load any of their file lists that
+        # weren't fetched up front.
+        unique_save_paths = {torrent_info.save_path_host for torrent_info in self.torrent_info_list.values()}
+        scanned_save_paths = [save_path for save_path in unique_save_paths if not (excluded_save_paths and save_path in excluded_save_paths)]
+        relevant = [
+            torrent_info for torrent_info in self.torrent_info_list.values()
+            if any(torrent_info.save_path_host.startswith(p) or p.startswith(torrent_info.save_path_host) for p in scanned_save_paths)
+        ]
+        try:
+            self._ensure_files(relevant)
+        except Exception as e:
+            print(f"Error: {e}. Skipping so files of that torrent aren't mistaken for orphans.")
+            return
+
+        # Known files by directory; the save paths' trees are listed in parallel up front.
+        # Directories unchanged since the last scan reuse its results (see src/orphans.py).
+        scanner = OrphanScanner(self.context.stat_store, util.Config_Manager.get("orphan_scan_workers"), self.orphan_cache)
+        for torrent_info in relevant:
             if torrent_info.torrent_files:
-                for file in torrent_info.torrent_files:
-                    filename = os.path.join(torrent_info.save_path_host, file['name'])
-                    unique_files.add(filename)
+                for name in torrent_info.torrent_files.names:
+                    scanner.add_known(os.path.join(torrent_info.save_path_host, name))
+        scanner.list_trees(scanned_save_paths)
 
         ignore_files = {".ds_store", "thumbs.db"}  # Set of files to ignore
         summary = ""
         total_total_size = 0
-        for save_path in unique_save_paths:
-
-            if excluded_save_paths and save_path in excluded_save_paths:
-                continue
+        for save_path in scanned_save_paths:
 
             print(f"\nScanning {save_path}")
             moved = 0
             total_size = 0
             try:
-                for root, _, filenames in os.walk(save_path):
-                    # Filter out ignored files
-                    filenames = [f for f in filenames if f.lower() not in ignore_files]
-
-                    for file in filenames:
-                        full_path = os.path.join(root, file)
-                        root2 = util.format_path(root)
-
-                        # Check if the file is orphaned
-                        if full_path not in unique_files:
-                            dest_path = full_path.replace(save_path, orphan_dest)
-                            dest_path_parent = dest_path.rsplit(os.sep, 1)[0]
-
-                            if util.file_modified_older_than(full_path, move_orphaned_after_days):
-                                moved += 1
-                                file_size = os.path.getsize(full_path)
-                                total_size += file_size
-                                if self.dry_run:
-                                    print(f"-- [DRY RUN] Will move {full_path if self.no_color else f'{Fore.GREEN}{root2}{Fore.YELLOW}{file}{Fore.RESET}'} [{util.format_bytes(file_size)}] TO {dest_path_parent if self.no_color else f'{Fore.CYAN}{dest_path_parent}{Fore.RESET}'}")
-                                else:
-                                    print(f"-- MOVING {full_path if self.no_color else f'{Fore.GREEN}{root2}{Fore.YELLOW}{file}{Fore.RESET}'} [{util.format_bytes(file_size)}] TO {dest_path_parent if self.no_color else f'{Fore.CYAN}{dest_path_parent}{Fore.RESET}'}")
-                                    try:
-                                        # Create destination path if it doesn't exist
-                                        os.makedirs(dest_path_parent, exist_ok=True)
-
-                                        # remove if exists at destination
-                                        if os.path.exists(dest_path):
-                                            os.remove(dest_path)
-
-                                        # move file
-                                        shutil.move(full_path, dest_path_parent)
-
-                                    except (OSError, shutil.Error) as move_error:
-                                        print(f"   Error moving {full_path}: {move_error}")
+                for root, file, file_stat in scanner.orphans(save_path, ignore_files):
+                    full_path = os.path.join(root, file)
+                    root2 = util.format_path(root)
+
+                    # the scanner hands back normalized directories, so the destination is
+                    # built from the path relative to the normalized save path; never move
+                    # a file onto itself (move_file clears the destination first)
+                    dest_path = os.path.join(orphan_dest, os.path.relpath(full_path, os.path.normpath(save_path)))
+                    dest_path_parent = dest_path.rsplit(os.sep, 1)[0]
+                    if os.path.realpath(dest_path) == os.path.realpath(full_path):
+                        print(f"-- Skipping {full_path}: orphan_destination maps it onto itself")
+                        continue
+
+                    if util.file_modified_older_than(full_path, move_orphaned_after_days, file_stat.st_mtime):
+                        moved += 1
+                        file_size = file_stat.st_size
+                        total_size += file_size
+                        if self.dry_run:
+                            print(f"-- [DRY RUN] Will move {full_path if self.no_color else f'{Fore.GREEN}{root2}{Fore.YELLOW}{file}{Fore.RESET}'} [{util.format_bytes(file_size)}] TO {dest_path_parent if self.no_color else f'{Fore.CYAN}{dest_path_parent}{Fore.RESET}'}")
+                        else:
+                            print(f"-- MOVING {full_path if self.no_color else f'{Fore.GREEN}{root2}{Fore.YELLOW}{file}{Fore.RESET}'} [{util.format_bytes(file_size)}] TO {dest_path_parent if self.no_color else f'{Fore.CYAN}{dest_path_parent}{Fore.RESET}'}")
+                            if self.plan_file:
+                                self.plan_file.append("move_file", src=full_path, dst=dest_path)
+                                continue
+                            try:
+                                self.move_file(full_path, dest_path)
+                            except (OSError, shutil.Error) as move_error:
+                                print(f"   Error moving {full_path}: {move_error}")
+                            self.context.stat_store.forget(root)
+                            self.context.stat_store.forget(dest_path_parent)
 
                 # Remove empty directories after processing
                 total_total_size += total_size
-                self.remove_empty_dirs(save_path)
-                print(f"-- {'[DRY RUN] Will move' if self.dry_run else 'Moved'} {moved} files with total size [{util.format_bytes(total_size)}].")
+                self.clean_empty_dirs(save_path)
+                print(f"-- {'[DRY RUN] Will move' if self.dry_run else 'Planned to move' if self.plan_file else 'Moved'} {moved} files with total size [{util.format_bytes(total_size)}].")
                 if moved > 0:
                     summary += f"\n\nSave Path: *{save_path}* \nMoved {moved} files **[{util.format_bytes(total_size)}]**."
 
             except Exception as e:
                 print(f"-- Error scanning {save_path}: {e}")
 
+        scanner.save()
+        if self.orphan_cache:
+            print(f"\nOrphan scan: {scanner.reused} of {len(scanner.results)} directories unchanged since the last scan")
+
         if total_total_size > 0:
             util.Discord_Summary.append(("Move orphaned files", summary))
         else:
@@ -614,16 +1209,17 @@ class TorrentManager:
         try:
             print(f"Removing files older than {remove_age_days} days in {orphan_dest}")
 
-            # Traverse through the directory and process files
+            # Traverse through the directory and process files, listed in parallel up front
+            OrphanScanner(self.context.stat_store, util.Config_Manager.get("orphan_scan_workers")).list_trees([orphan_dest])
             removed = 0
             total_size = 0
-            for root, _, files in os.walk(orphan_dest):
-                for file in files:
+            for root, _, file_stats in self.context.stat_store.walk(orphan_dest, snapshot=True):
+                for file in file_stats:
                     file_path = os.path.join(root, file)
                     root_print = util.format_path(root)
 
                     try:
-                        if util.file_modified_older_than(file_path, remove_age_days):
+                        if util.file_modified_older_than(file_path, remove_age_days, file_stats[file].st_mtime):
                             removed += 1
                             file_size = os.path.getsize(file_path)
                             total_size += file_size
@@ -631,7 +1227,11 @@ class TorrentManager:
                                 print(f"-- [DRY RUN] Will remove {file_path if self.no_color else f'{Fore.GREEN}{root_print}{Fore.YELLOW}{file}{Fore.RESET}'} [{util.format_bytes(file_size)}]")
                             else:
                                 print(f"-- Removing {file_path if self.no_color else f'{Fore.GREEN}{root_print}{Fore.YELLOW}{file}{Fore.RESET}'} [{util.format_bytes(file_size)}]")
-                                os.remove(file_path)
+                                if self.plan_file:
+                                    self.plan_file.append("remove_file", path=file_path)
+                                else:
+                                    os.remove(file_path)
+                                    self.context.stat_store.forget(root)
 
                     except OSError as e:
                         print(f"-- Error accessing file {file_path}: {e}")
@@ -639,18 +1239,40 @@ class TorrentManager:
                         print(f"-- Error processing file {file_path}: {e}")
 
             # Remove empty directories after processing
-            self.remove_empty_dirs(orphan_dest)
+            self.clean_empty_dirs(orphan_dest)
             util.Discord_Summary.append(("Remove orphaned files", f"Orphan Destination: *{orphan_dest}* \nRemoved {removed} files **[{util.format_bytes(total_size)}]**."))
-            print(f"-- {'[DRY RUN] Will remove' if self.dry_run else 'Removed'} {removed} files with total size [{util.format_bytes(total_size)}].")
+            print(f"-- {'[DRY RUN] Will remove' if self.dry_run else 'Planned to remove' if self.plan_file else 'Removed'} {removed} files with total size [{util.format_bytes(total_size)}].")
         except Exception as e:
             print(f"-- Error traversing directory {orphan_dest}: {e}")
 
+    def move_file(self, full_path, dest_path):
+        # Create destination path if it doesn't exist
+        dest_path_parent = dest_path.rsplit(os.sep, 1)[0]
+        os.makedirs(dest_path_parent, exist_ok=True)
+
+        # remove if exists at destination
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+
+        # move file
+        shutil.move(full_path, dest_path_parent)
+
+    def clean_empty_dirs(self, directory):
+        # in plan mode, the directories only empty out once the plan's moves are applied
+        if self.plan_file and not self.dry_run:
+            self.plan_file.append("remove_empty_dirs", path=directory)
+        else:
+            self.remove_empty_dirs(directory)
+
     def remove_empty_dirs(self, directory):
         dirs_removed = False  # Flag to track if any directory was removed during the current pass
 
         try:
-            # Walk through directory tree from bottom-up to ensure empty directories are removed
-            for dirpath, dirnames, filenames in os.walk(directory, topdown=False):
+            # Walk through directory tree from bottom-up to ensure empty directories are removed,
+            # through the run's stat store if there is one (not when applying a plan)
+            stat_store = self.context.stat_store if self.context else None
+            walk = stat_store.walk(directory, snapshot=True, topdown=False) if stat_store else os.walk(directory, topdown=False)
+            for dirpath, dirnames, filenames in walk:
 
                 # If the directory is the top-level directory, skip it
                 if os.path.abspath(dirpath) == os.path.abspath(directory):
@@ -664,6 +1286,9 @@ class TorrentManager:
                         else:
                             print(f"-- Removing empty directory {dirpath if self.no_color else f'{Fore.YELLOW}{dirpath}{Fore.RESET}'}")
                             os.rmdir(dirpath)
+                            if stat_store:
+                                stat_store.forget(dirpath)
+                                stat_store.forget(os.path.dirname(dirpath))
                             if not os.path.exists(dirpath):  # Ensure directory was actually removed
                                 dirs_removed = True  # Set flag to True only when directory is actually removed
                     except OSError as e:
@@ -678,6 +1303,17 @@ class TorrentManager:
             self.remove_empty_dirs(directory)
 
 
+    def export_and_delete(self, qb, torrent_hash, backup_dest):
+        # back up the .torrent first and only delete once the backup is on disk
+        os.makedirs(backup_dest, exist_ok=True)
+        torrent_ex = qb.torrents_export(torrent_hash)
+        torrent_ex_path = os.path.join(backup_dest, f"{torrent_hash}.torrent")
+        with open(torrent_ex_path, 'wb') as f:
+            f.write(torrent_ex)
+        if not os.path.exists(torrent_ex_path):
+            raise RuntimeError("backup .torrent was not written")
+        qb.torrents_delete(delete_files=False, torrent_hashes=torrent_hash)
+
     def auto_delete_torrents(self):
 
         print("\n=== Auto-delete torrents ===\n")
@@ -687,6 +1323,10 @@ class TorrentManager:
             print("Auto-delete is not enabled. Skipping.")
             return
 
+        if self.missing_hashes:
+            print(f"Skipping because {len(self.missing_hashes)} torrent(s) are missing from this run.")
+            return
+
         auto_delete_tags = auto_delete_config['auto_delete_tags']
         if not auto_delete_tags:
             print("auto-delete-tags is not defined. Skipping.")
@@ -695,14 +1335,12 @@ class TorrentManager:
         total_size = 0
         removed = 0
         removed_hashes = set()
+        tasks = []
         backup_dest = auto_delete_config['backup_destination']
         if not backup_dest:
             print(f"backup_destination is not specified for auto-delete. Skipping.")
             return
 
-        if not os.path.exists(backup_dest):
-            os.makedirs(backup_dest)
-
         for torrent_info in self.torrent_info_list.values():
             matching_tag = next((tag for tag in auto_delete_tags if tag in torrent_info.current_tags), None)
             if matching_tag and torrent_info.torrent_completed_since_days >= auto_delete_config['auto_delete_age_days']:
@@ -717,14 +1355,25 @@ class TorrentManager:
                 else:
                     # remove torrents with delete_files set to False, as orphan cleanup will take care of them.
                     print(f"-- Removing [{matching_tag if self.no_color else f'{Fore.GREEN}{matching_tag}{Fore.RESET}'}] '{torrent_name if self.no_color else f'{Fore.YELLOW}{torrent_name}{Fore.RESET}'}' ({torrent_hash if self.no_color else f'{Fore.CYAN}{torrent_hash}{Fore.RESET}'}) torrent with size '{formatted_size if self.no_color else f'{Fore.GREEN}{formatted_size}{Fore.RESET}'}'")
-                    if backup_dest:
-                        torrent_ex = self.qb.torrents_export(torrent_hash)
-                        torrent_ex_path = os.path.join(backup_dest, f"{torrent_hash}.torrent")
-                        with open(torrent_ex_path, 'wb') as f:
-                            f.write(torrent_ex)
-                        if os.path.exists(torrent_ex_path):
-                            self.qb.torrents_delete(delete_files=False, torrent_hashes=torrent_hash)
-                            removed_hashes.add(torrent_hash)
+                    if self.plan_file:
+                        # treated as removed from here on, so the orphan scan plans the same moves a real run would
+                        self.plan_file.append("delete_torrent", hash=torrent_hash, name=torrent_name, backup_destination=backup_dest)
+                        removed_hashes.add(torrent_hash)
+                    else:
+                        tasks.append(WriteTask(
+                            f"remove torrent '{torrent_name}' ({torrent_hash})",
+                            [torrent_hash],
+                            lambda qb, torrent_hash=torrent_hash: self.export_and_delete(qb, torrent_hash, backup_dest),
+                            requests=2,
+                            context=torrent_hash,
+                        ))
+
+        # export and delete run in parallel across torrents, in that order per torrent
+        report = WriteReport()
+        for task, _, error in self._build_write_executor().run(tasks, report):
+            if error is None:
+                removed_hashes.add(task.context)
+        report.print_summary()
 
         for hash in removed_hashes:
             del self.torrent_info_list[hash]
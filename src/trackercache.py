@@ -0,0 +1,109 @@
+import json
+import os
+import sqlite3
+
+from qbittorrentapi import TrackersList
+
+class TrackerCache:
+
+    # Persistent cache of per-torrent tracker lists. Tracker status and messages are
+    # stable for most torrents, so torrents_trackers() is only called again when the
+    # entry expires or a cheap signal from the torrent list says something changed.
+
+    QUERY_CHUNK = 500
+
+    # Collapse qBittorrent states into the transitions that matter for trackers. Seeding
+    # torrents flip between uploading and stalledUP all the time (that's just peers
+    # coming and going), but a download stalling or anything going to error is a hint
+    # that the tracker stopped answering.
+    STATE_GROUPS = {
+        "uploading": "seeding",
+        "stalledUP": "seeding",
+        "forcedUP": "seeding",
+        "queuedUP": "seeding",
+        "downloading": "downloading",
+        "forcedDL": "downloading",
+        "metaDL": "downloading",
+        "forcedMetaDL": "downloading",
+        "stalledDL": "stalled",
+        "pausedUP": "stopped",
+        "stoppedUP": "stopped",
+        "pausedDL": "stopped",
+        "stoppedDL": "stopped",
+        "error": "error",
+        "missingFiles": "error",
+    }
+
+    def __init__(self, path, ttl_minutes, bad_ttl_minutes):
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self.ttl = ttl_minutes * 60
+        self.bad_ttl = bad_ttl_minutes * 60
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS trackers ("
+            " hash TEXT PRIMARY KEY,"
+            " fetched_at REAL NOT NULL,"
+            " signature TEXT NOT NULL,"
+            " is_bad INTEGER NOT NULL,"
+            " trackers TEXT NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        self.conn.commit()
+
+    @classmethod
+    def signature(cls, torrent_dict):
+        # `tracker` is the first working tracker and goes empty when none work, so an
+        # unregistered or erroring torrent changes it on its own
+        state = torrent_dict.get("state", "")
+        return json.dumps([
+            torrent_dict.get("tracker", ""),
+            torrent_dict.get("trackers_count"),
+            cls.STATE_GROUPS.get(state, state),
+        ])
+
+    def load(self, hashes):
+        # hash -> (fetched_at, signature, is_bad, TrackersList)
+        hashes = list(hashes)
+        entries = {}
+        for i in range(0, len(hashes), self.QUERY_CHUNK):
+            chunk = hashes[i:i + self.QUERY_CHUNK]
+            query = f"SELECT hash, fetched_at, signature, is_bad, trackers FROM trackers WHERE hash IN ({','.join('?' * len(chunk))})"
+            for h, fetched_at, signature, is_bad, trackers in self.conn.execute(query, chunk):
+                entries[h] = (fetched_at, signature, bool(is_bad), TrackersList(json.loads(trackers)))
+        return entries
+
+    def needs_refresh(self, torrent_dict, entry, now, is_bad=False):
+        # is_bad lets the caller force the short TTL, e.g. for torrents already tagged as
+        # unregistered or erroring in qBittorrent
+        if entry is None:
+            return True
+        fetched_at, signature, cached_bad, _ = entry
+        if signature != self.signature(torrent_dict):
+            return True
+        ttl = self.bad_ttl if (cached_bad or is_bad) else self.ttl
+        return now - fetched_at >= ttl
+
+    def store(self, entries, fetched_at):
+        # entries: hash -> (torrent_dict, is_bad, trackers)
+        rows = [
+            (h, fetched_at, self.signature(torrent_dict), int(is_bad), json.dumps([dict(t) for t in trackers]))
+            for h, (torrent_dict, is_bad, trackers) in entries.items()
+        ]
+        if rows:
+            with self.conn:
+                self.conn.executemany("INSERT OR REPLACE INTO trackers (hash, fetched_at, signature, is_bad, trackers) VALUES (?, ?, ?, ?, ?)", rows)
+
+    def garbage_collect(self, live_hashes):
+        live_hashes = set(live_hashes)
+        stale = [h for (h,) in self.conn.execute("SELECT hash FROM trackers") if h not in live_hashes]
+        with self.conn:
+            for i in range(0, len(stale), self.QUERY_CHUNK):
+                chunk = stale[i:i + self.QUERY_CHUNK]
+                self.conn.execute(f"DELETE FROM trackers WHERE hash IN ({','.join('?' * len(chunk))})", chunk)
+        return len(stale)
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,38 @@
+import re
+
+class TrackerMatcher:
+
+    # trackers.json compiled for matching announce URLs. A torrent belongs to the first
+    # entry (in file order) with a pattern that is a substring of any of its tracker
+    # URLs. All patterns go into one regex: a lookahead at every position, so overlapping
+    # matches aren't skipped, with alternatives in entry order, so the alternative found
+    # at a position is the earliest entry's. The earliest entry over all positions is the
+    # first match. Results are memoized per URL, since thousands of torrents share
+    # each announce URL.
+
+    def __init__(self, tracker_options):
+        self.entries = tracker_options
+        self.public_entry = next((entry for entry in tracker_options if entry["name"] == "public"), None)
+
+        self.pattern_entry = {}     # pattern -> index of the first entry listing it
+        for i, entry in enumerate(tracker_options):
+            for pattern in entry["trackers"]:
+                self.pattern_entry.setdefault(pattern, i)
+        alternatives = sorted(self.pattern_entry, key=self.pattern_entry.get)
+        self.regex = re.compile("(?=(" + "|".join(re.escape(p) for p in alternatives) + "))") if alternatives else None
+        self.url_cache = {}         # url -> entry index, or None
+
+    def match_url(self, url):
+        if url not in self.url_cache:
+            indexes = [self.pattern_entry[m.group(1)] for m in self.regex.finditer(url)] if self.regex else []
+            self.url_cache[url] = min(indexes) if indexes else None
+        return self.url_cache[url]
+
+    def match(self, urls):
+        # the first entry matching any of urls, or None
+        best = None
+        for url in urls:
+            index = self.match_url(url)
+            if index is not None and (best is None or index < best):
+                best = index
+        return self.entries[best] if best is not None else None
@@ -57,11 +57,16 @@ def days_since(timestamp):
     days_elapsed = elapsed_time / (60 * 60 * 24)
     return round(days_elapsed, 2)
 
-def file_modified_older_than(file_path, num_days):
+def file_modified_older_than(file_path, num_days, cached_mod_time=None):
     try:
 
         days_in_seconds = num_days * 24 * 60 * 60
 
+        # A cached modified time (see src/statcache.py) settles files modified recently
+        # without a stat; it can be stale, so a file it says is old is stat'ed to confirm
+        if cached_mod_time is not None and Current_Time - cached_mod_time <= days_in_seconds:
+            return False
+
         # Get the file's last modified time
         file_mod_time = os.path.getmtime(file_path)
 
@@ -0,0 +1,23 @@
+class WritePlan:
+
+    # Pending qBittorrent writes, inverted from per-torrent changes to
+    # (action, value) -> hashes, so each distinct tag, upload limit or category costs
+    # one API call (per chunk of hashes) instead of one per torrent. Groups keep
+    # first-seen order.
+
+    def __init__(self):
+        self.groups = {}
+
+    def add(self, action, value, torrent_hash):
+        self.groups.setdefault((action, value), []).append(torrent_hash)
+
+    def __len__(self):
+        return sum(len(hashes) for hashes in self.groups.values())
+
+    def batches(self, chunk_size):
+        # (action, value, hashes) with at most chunk_size hashes each, keeping the
+        # request body a safe size (41 bytes per hash)
+        chunk_size = max(1, chunk_size)
+        for (action, value), hashes in self.groups.items():
+            for i in range(0, len(hashes), chunk_size):
+                yield action, value, hashes[i:i + chunk_size]
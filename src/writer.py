@@ -0,0 +1,105 @@
+import concurrent.futures
+import threading
+
+from .concurrency import RateLimiter
+
+class WriteTask:
+
+    def __init__(self, description, keys, action, requests=1, barrier=False, context=None):
+        self.description = description
+        self.keys = set(keys)       # hashes/paths it touches; orders it after earlier tasks on them
+        self.action = action        # action(qb) -> result
+        self.requests = requests    # API calls it makes, for the rate limit
+        self.barrier = barrier      # waits for every earlier task
+        self.context = context      # whatever the caller needs back with the result
+
+
+class WriteReport:
+
+    # Outcome of a batch of writes: how many succeeded, and every failure with what it
+    # was doing and which torrents or paths it covered
+
+    def __init__(self):
+        self.succeeded = 0
+        self.failures = []          # (task, error)
+
+    def record(self, task, error):
+        if error is None:
+            self.succeeded += 1
+        else:
+            self.failures.append((task, error))
+
+    def print_summary(self, limit=10):
+        total = self.succeeded + len(self.failures)
+        if not self.failures:
+            return
+        print(f"\nWrite failures: {len(self.failures)} of {total} request(s) failed.")
+        by_error = {}
+        for task, error in self.failures:
+            by_error.setdefault(f"{type(error).__name__}: {error}", []).append(task)
+        for error, tasks in by_error.items():
+            print(f"  {error} ({len(tasks)} request(s), {sum(len(task.keys) for task in tasks)} item(s))")
+            for task in tasks[:limit]:
+                print(f"    - {task.description}")
+            if len(tasks) > limit:
+                print(f"    ... and {len(tasks) - limit} more.")
+
+
+class WriteExecutor:
+
+    # Runs qBittorrent writes concurrently, with at most max_in_flight at once and no
+    # more than requests_per_second overall. A task never starts before an earlier task
+    # that shares one of its keys has finished, so per-torrent order holds (e.g. tags
+    # are set before the torrent is deleted), while unrelated writes overlap. Each
+    # worker thread gets its own client, since a client's requests.Session isn't
+    # thread-safe; there are at most max_in_flight of them.
+
+    def __init__(self, build_client, max_in_flight, requests_per_second):
+        self.build_client = build_client
+        self.max_in_flight = max(1, max_in_flight)
+        self.limiter = RateLimiter(requests_per_second)
+        self.thread_local = threading.local()
+
+    def _client(self):
+        client = getattr(self.thread_local, "client", None)
+        if client is None:
+            client = self.build_client()
+            self.thread_local.client = client
+        return client
+
+    def run(self, tasks, report=None):
+        # Yields (task, result, error) in completion order; failures are also added to
+        # report when one is given. Tasks run in submission order wherever they share
+        # keys. Waiting on earlier tasks can't deadlock: the pool picks tasks up in
+        # submission order, so whatever a task waits on is already running or done.
+        def execute(task, dependencies):
+            concurrent.futures.wait(dependencies)
+            self.limiter.wait(task.requests)
+            return task.action(self._client())
+
+        last_by_key = {}
+        last_barrier = None
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+            futures = {}
+            for task in tasks:
+                if task.barrier:
+                    dependencies = set(futures)
+                else:
+                    dependencies = {last_by_key[key] for key in task.keys if key in last_by_key}
+                    if last_barrier is not None:
+                        dependencies.add(last_barrier)
+                future = executor.submit(execute, task, dependencies)
+                futures[future] = task
+                for key in task.keys:
+                    last_by_key[key] = future
+                if task.barrier:
+                    last_barrier = future
+            for future in concurrent.futures.as_completed(futures):
+                task = futures[future]
+                try:
+                    result, error = future.result(), None
+                except Exception as e:
+                    result, error = None, e
+                if report is not None:
+                    report.record(task, error)
+                yield task, result, error
@@ -0,0 +1,42 @@
+import os
+import sys
+
+import pytest
+
+# the modules under test are imported as the src package, from the repository root, and
+# the mock qBittorrent server and library generator from bench/
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "bench"))
+
+from generate_library import generate
+from mock_qbit import MockQBit, serve
+from run_bench import load_default_config
+from src import util
+from src.config import ConfigManager
+
+@pytest.fixture
+def mock_qbit():
+    # bench/mock_qbit.py serving a small synthetic library on a free port; rebind
+    # mock.torrents_info etc. to change what the server does mid-run
+    torrents, trackers, files = generate(60, seed=7)
+    mock = MockQBit({"torrents": torrents, "trackers": trackers, "files": files}, server_threads=0)
+    server = serve(mock)
+    mock.port = server.server_address[1]
+    yield mock
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def config(tmp_path, mock_qbit, monkeypatch):
+    # qb-tagger.py's default config pointed at mock_qbit, without persistent caches;
+    # tests adjust it before building a TorrentManager
+    config_manager = ConfigManager(str(tmp_path / "config.yaml"), load_default_config())
+    config = config_manager.config
+    config["server"] = "127.0.0.1"
+    config["port"] = mock_qbit.port
+    config["username"] = ""
+    config["tracker_config"] = os.path.join(ROOT, "example_trackers.json")
+    config["cache_dir"] = ""
+    monkeypatch.setattr(util, "Config_Manager", config_manager)
+    return config
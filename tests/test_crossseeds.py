@@ -0,0 +1,104 @@
+import os
+
+from src import util
+from src.torrentinfo import RunContext, TorrentInfo, TorrentFiles
+
+def make_files(root, paths):
+    for path, size in paths.items():
+        full = os.path.join(root, path)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        with open(full, "wb") as f:
+            f.write(b"x" * size)
+
+def torrent(context, name, save_path, files):
+    # just the TorrentInfo state cross-seed grouping reads: content path, save path and
+    # file list
+    torrent_info = TorrentInfo.__new__(TorrentInfo)
+    torrent_info.context = context
+    torrent_info._name = name
+    torrent_info.save_path_host = util.format_path(save_path)
+    torrent_info.content_path = util.format_path(os.path.join(save_path, files[0]["name"].split("/", 1)[0]))
+    torrent_info.torrent_files = TorrentFiles(files)
+    return torrent_info
+
+def groups(context):
+    # the cross-seed groups, as lists of names, each listed once
+    seen = {}
+    for members in context.cross_seeds.values():
+        seen[id(members)] = [torrent_info._name for torrent_info in members]
+    return sorted(seen.values())
+
+MOVIE = [{"name": "Movie/movie.mkv", "size": 300}, {"name": "Movie/movie.nfo", "size": 10}]
+RENAMED = [{"name": "Movie.2024/movie.mkv", "size": 300}, {"name": "Movie.2024/movie.nfo", "size": 10}]
+OTHER = [{"name": "Other/other.mkv", "size": 300}]
+
+def test_content_path_only():
+    context = RunContext(None, None)
+    torrents = [
+        torrent(context, "a", "/data/movies", MOVIE),
+        torrent(context, "b", "/data/movies", MOVIE),
+        torrent(context, "c", "/data/cross", RENAMED),
+    ]
+    context.index_cross_seeds(torrents)
+    assert groups(context) == [["a", "b"], ["c"]]
+
+def test_by_content_fingerprint():
+    # a copy under a renamed top folder has the same fingerprint; a different size doesn't
+    context = RunContext(None, None)
+    torrents = [
+        torrent(context, "a", "/data/movies", MOVIE),
+        torrent(context, "b", "/data/cross", RENAMED),
+        torrent(context, "c", "/data/cross", [{"name": "Movie.v2/movie.mkv", "size": 301}, {"name": "Movie.v2/movie.nfo", "size": 10}]),
+    ]
+    context.index_cross_seeds(torrents, by_content=True)
+    assert groups(context) == [["a", "b"], ["c"]]
+    assert torrents[0].content_fingerprint() == torrents[1].content_fingerprint()
+
+def test_by_inode(tmp_path):
+    # a hardlink of the largest file in another save path joins; a copy doesn't
+    movies, cross, copies = str(tmp_path / "movies"), str(tmp_path / "cross"), str(tmp_path / "copies")
+    make_files(movies, {"Movie/movie.mkv": 300, "Movie/movie.nfo": 10})
+    os.makedirs(os.path.join(cross, "Movie.2024"))
+    os.link(os.path.join(movies, "Movie", "movie.mkv"), os.path.join(cross, "Movie.2024", "movie.mkv"))
+    make_files(copies, {"Movie.2024/movie.mkv": 300})
+    context = RunContext(None, None)
+    torrents = [
+        torrent(context, "a", movies, MOVIE),
+        torrent(context, "b", cross, [{"name": "Movie.2024/movie.mkv", "size": 300}]),
+        torrent(context, "c", copies, [{"name": "Movie.2024/movie.mkv", "size": 300}]),
+        torrent(context, "d", str(tmp_path / "missing"), OTHER),
+    ]
+    context.index_cross_seeds(torrents, match_inode=True)
+    assert groups(context) == [["a", "b"], ["c"], ["d"]]
+    assert torrents[3].largest_file_inode() is None
+
+def test_groups_merge_transitively(tmp_path):
+    # a and b share a content path, a and c a fingerprint, c and d an inode: one group,
+    # in torrent list order, shared by every content path in it
+    first, second = str(tmp_path / "first"), str(tmp_path / "second")
+    make_files(first, {"Movie.2024/movie.mkv": 300, "Movie.2024/movie.nfo": 10})
+    os.makedirs(os.path.join(second, "Movie.Remux"))
+    os.link(os.path.join(first, "Movie.2024", "movie.mkv"), os.path.join(second, "Movie.Remux", "movie.mkv"))
+    context = RunContext(None, None)
+    torrents = [
+        torrent(context, "d", second, [{"name": "Movie.Remux/movie.mkv", "size": 300}]),
+        torrent(context, "a", "/data/movies", MOVIE),
+        torrent(context, "e", "/data/other", OTHER),
+        torrent(context, "b", "/data/movies", MOVIE[:1] + [{"name": "Movie/extra.srt", "size": 1}]),
+        torrent(context, "c", first, RENAMED),
+    ]
+    context.index_cross_seeds(torrents, by_content=True, match_inode=True)
+    assert groups(context) == [["d", "a", "b", "c"], ["e"]]
+    assert context.cross_seeds[torrents[0].content_path] is context.cross_seeds[torrents[1].content_path]
+
+def test_torrents_without_files_only_join_by_path():
+    context = RunContext(None, None)
+    torrents = [
+        torrent(context, "a", "/data/a", MOVIE),
+        torrent(context, "b", "/data/b", MOVIE),
+    ]
+    # e.g. both still waiting on metadata: no fingerprint or inode to match on
+    for torrent_info in torrents:
+        torrent_info.torrent_files = TorrentFiles([])
+    context.index_cross_seeds(torrents, by_content=True, match_inode=True)
+    assert groups(context) == [["a"], ["b"]]
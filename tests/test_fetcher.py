@@ -0,0 +1,108 @@
+from types import SimpleNamespace
+
+import pytest
+import qbittorrentapi
+from qbittorrentapi import NotFound404Error
+
+from src.fetcher import ThreadFetcher, AsyncFetcher, RetryPolicy
+
+def make_fetcher(backend, mock, retry=None, username=""):
+    # either backend pointed at mock_qbit, the way TorrentManager builds them
+    if backend == "threads":
+        credentials = {"username": username, "password": "secret"} if username else {}
+        return ThreadFetcher(lambda: qbittorrentapi.Client(host="127.0.0.1", port=mock.port, **credentials), 4, retry=retry)
+    return AsyncFetcher("127.0.0.1", mock.port, username, "secret", 4, 2, retry=retry)
+
+def fetch(fetcher, hashes):
+    jobs = [(SimpleNamespace(hash=h, name=f"name-{h}"), None, None) for h in hashes]
+    try:
+        return {h: (name, trackers, files, error) for h, name, trackers, files, error in fetcher.fetch(jobs)}
+    finally:
+        fetcher.close()
+
+def fail_first(mock, endpoint, count):
+    # answer the first count requests to endpoint with a 500, then as usual
+    route = mock.route
+    failures = [count]
+
+    def failing_route(name, params):
+        if name == endpoint and failures[0] > 0:
+            failures[0] -= 1
+            return 500, "Internal error"
+        return route(name, params)
+
+    mock.route = failing_route
+
+# the async backend, like aiohttp, is optional
+BACKENDS = ["threads"] + (["async"] if AsyncFetcher.available() else [])
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_fetch(mock_qbit, backend):
+    hashes = list(mock_qbit.torrents)[:10]
+    results = fetch(make_fetcher(backend, mock_qbit), hashes)
+    assert set(results) == set(hashes)
+    for h, (name, trackers, files, error) in results.items():
+        assert error is None
+        assert name == f"name-{h}"
+        assert [dict(t) for t in trackers] == mock_qbit.trackers[h]
+        assert [f.name for f in files] == [f["name"] for f in mock_qbit.files[h]]
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_not_found_is_not_retried(mock_qbit, backend):
+    results = fetch(make_fetcher(backend, mock_qbit, RetryPolicy(3, 0, 0)), ["missing"])
+    _, trackers, files, error = results["missing"]
+    assert trackers is None and files is None
+    assert not RetryPolicy.retryable(error)
+    assert mock_qbit.calls["torrents/trackers"] == 1
+    assert "torrents/files" not in mock_qbit.calls
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_transient_error_is_retried(mock_qbit, backend):
+    # qbittorrentapi repeats a failed request once itself, so fail two requests: enough
+    # to fail a first attempt with either backend
+    h = next(iter(mock_qbit.torrents))
+    fail_first(mock_qbit, "torrents/trackers", 2)
+    _, trackers, _, error = fetch(make_fetcher(backend, mock_qbit, RetryPolicy(3, 0, 0)), [h])[h]
+    assert error is None
+    assert [dict(t) for t in trackers] == mock_qbit.trackers[h]
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_transient_error_without_retries(mock_qbit, backend):
+    h = next(iter(mock_qbit.torrents))
+    fail_first(mock_qbit, "torrents/trackers", 2)
+    _, trackers, _, error = fetch(make_fetcher(backend, mock_qbit), [h])[h]
+    assert trackers is None
+    assert RetryPolicy.retryable(error)
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_login_failure_is_reported_per_job(mock_qbit, backend):
+    # wrong credentials: the login is refused, and so is everything else
+    mock_qbit.route = lambda name, params: (200, "Fails.") if name == "auth/login" else (403, "Forbidden")
+    hashes = list(mock_qbit.torrents)[:5]
+    results = fetch(make_fetcher(backend, mock_qbit, username="admin"), hashes)
+    assert set(results) == set(hashes)
+    for h, (name, trackers, files, error) in results.items():
+        assert name == f"name-{h}"
+        assert trackers is None and files is None
+        assert error is not None
+
+def test_retry_delays():
+    policy = RetryPolicy(4, 1, 3)
+    delays = list(policy.delays())
+    assert len(delays) == 4
+    assert delays[-1] is None
+    for attempt, delay in enumerate(delays[:-1]):
+        assert 0 <= delay <= min(3, 2 ** attempt)
+    assert list(RetryPolicy(0, 1, 3).delays()) == [None]
+
+def test_retryable():
+    assert not RetryPolicy.retryable(NotFound404Error())
+    assert RetryPolicy.retryable(qbittorrentapi.InternalServerError500Error())
+    assert RetryPolicy.retryable(ConnectionError())
+
+@pytest.mark.skipif(not AsyncFetcher.available(), reason="aiohttp is not installed")
+def test_retryable_aiohttp():
+    import aiohttp
+    request_info = aiohttp.RequestInfo(url=aiohttp.client.URL("http://localhost/"), method="GET", headers={}, real_url=aiohttp.client.URL("http://localhost/"))
+    assert not RetryPolicy.retryable(aiohttp.ClientResponseError(request_info, (), status=404))
+    assert RetryPolicy.retryable(aiohttp.ClientResponseError(request_info, (), status=503))
@@ -0,0 +1,44 @@
+import pytest
+
+from src.messageclassifier import MessageClassifier
+
+def test_keywords_match_anywhere_ignoring_case():
+    classifier = MessageClassifier(["unregistered", "dupe of"], [])
+    assert classifier.classify(["Torrent UNREGISTERED by staff"]) == "unregistered"
+    assert classifier.classify(["Dupe of 12345"]) == "dupe of"
+    assert classifier.classify(["Working"]) is None
+
+def test_keywords_are_literal():
+    classifier = MessageClassifier(["beyond-hd.me"], [])
+    assert classifier.classify(["beyond-hdXme"]) is None
+    assert classifier.classify(["see beyond-hd.me"]) == "beyond-hd.me"
+
+def test_patterns_are_regexes_reported_in_slashes():
+    classifier = MessageClassifier([], [r"torrent \d+ (deleted|trumped)"])
+    assert classifier.classify(["Torrent 42 Trumped"]) == r"/torrent \d+ (deleted|trumped)/"
+    assert classifier.classify(["torrent x deleted"]) is None
+
+def test_leftmost_match_then_rule_order():
+    classifier = MessageClassifier(["not registered", "unregistered"], [])
+    assert classifier.classify(["unregistered, not registered"]) == "unregistered"
+    assert MessageClassifier(["unregistered torrent", "unregistered"], []).classify(["unregistered torrent"]) == "unregistered torrent"
+    assert MessageClassifier(["unregistered", "unregistered torrent"], []).classify(["unregistered torrent"]) == "unregistered"
+
+def test_first_matching_message():
+    classifier = MessageClassifier(["unregistered"], ["gone"])
+    assert classifier.classify(["fine", "gone", "unregistered"]) == "/gone/"
+
+def test_empty_rules_are_ignored():
+    classifier = MessageClassifier(["", "pack out"], [""])
+    assert classifier.rules == ["pack out"]
+    assert classifier.classify([""]) is None
+    assert MessageClassifier([], []).classify(["unregistered"]) is None
+
+def test_invalid_pattern_names_it():
+    with pytest.raises(ValueError, match=r"\(unclosed"):
+        MessageClassifier(["ok"], ["(unclosed"])
+
+def test_results_are_memoized():
+    classifier = MessageClassifier(["unregistered"], [])
+    classifier.classify(["unregistered"])
+    assert classifier.message_cache == {"unregistered": "unregistered"}
@@ -0,0 +1,60 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from src import util
+from src.statcache import StatCache
+from src.torrentmanager import TorrentManager
+
+def make_files(root, paths):
+    # files from a day ago, old enough to be moved with move_orphaned_after_days: 0
+    for path in paths:
+        full = os.path.join(root, path)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        with open(full, "w") as f:
+            f.write(path)
+        os.utime(full, (util.Current_Time - 86400, util.Current_Time - 86400))
+
+def make_manager(monkeypatch, save_path, names, orphan_destination):
+    # just enough of a TorrentManager to move orphans out of one save path holding one
+    # torrent's files
+    config = {
+        "orphaned_files": {"move_orphaned": True, "move_orphaned_after_days": 0, "orphan_destination": orphan_destination, "excluded_save_paths": []},
+        "orphan_scan_workers": 2,
+    }
+    monkeypatch.setattr(util, "Config_Manager", SimpleNamespace(get=config.get))
+    monkeypatch.setattr(util, "Discord_Summary", [])
+    manager = TorrentManager.__new__(TorrentManager)
+    manager.dry_run = False
+    manager.no_color = True
+    manager.plan_file = None
+    manager.orphan_cache = None
+    manager.missing_hashes = set()
+    manager.context = SimpleNamespace(stat_store=StatCache())
+    manager.torrent_info_list = {"h": SimpleNamespace(save_path_host=util.format_path(save_path), torrent_files=SimpleNamespace(names=names))}
+    manager._ensure_files = lambda torrent_infos: None
+    return manager
+
+@pytest.mark.parametrize("spelling", ["{}//data/./", "{}/data/../data/"])
+def test_unnormalized_save_path(tmp_path, monkeypatch, spelling):
+    # the scanner reports normalized paths; the destination must still land under
+    # orphan_destination rather than back on the file itself
+    make_files(str(tmp_path / "data"), ["movie/movie.mkv", "movie/sample.mkv", "stray.nfo"])
+    dest = str(tmp_path / "orphans")
+    manager = make_manager(monkeypatch, spelling.format(tmp_path), ["movie/movie.mkv"], dest)
+    manager.move_orphaned()
+    assert os.path.exists(tmp_path / "data" / "movie" / "movie.mkv")
+    assert not os.path.exists(tmp_path / "data" / "movie" / "sample.mkv")
+    assert not os.path.exists(tmp_path / "data" / "stray.nfo")
+    assert (tmp_path / "orphans" / "movie" / "sample.mkv").read_text() == "movie/sample.mkv"
+    assert (tmp_path / "orphans" / "stray.nfo").read_text() == "stray.nfo"
+
+def test_destination_is_the_save_path(tmp_path, monkeypatch, capsys):
+    # orphan_destination spelled differently from the save path but naming the same
+    # directory: every orphan would be moved onto itself, and removed doing so
+    make_files(str(tmp_path / "data"), ["movie.mkv", "stray.nfo"])
+    manager = make_manager(monkeypatch, f"{tmp_path}/data", ["movie.mkv"], f"{tmp_path}/./data")
+    manager.move_orphaned()
+    assert (tmp_path / "data" / "stray.nfo").read_text() == "stray.nfo"
+    assert "maps it onto itself" in capsys.readouterr().out
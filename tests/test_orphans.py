@@ -0,0 +1,101 @@
+import os
+
+from src.orphans import PathTrie, OrphanScanner, OrphanCache
+from src.statcache import StatCache
+
+def make_tree(root, paths):
+    for path in paths:
+        full = os.path.join(root, path)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        if path.endswith("/"):
+            continue
+        with open(full, "w") as f:
+            f.write(path)
+
+def scan(scanner, tops, ignore_files=()):
+    scanner.list_trees(tops)
+    return sorted(os.path.relpath(os.path.join(directory, name), tops[0]) for top in tops for directory, name, _ in scanner.orphans(top, ignore_files))
+
+def test_trie_find():
+    trie = PathTrie()
+    trie.add("/data/movies/a/a.mkv")
+    trie.add("/data/movies/b.mkv")
+    assert trie.find("/data/movies").files == {"b.mkv"}
+    assert trie.find("/data/movies/a").files == {"a.mkv"}
+    assert trie.find("/data").files == set()
+    assert trie.find("/data/tv") is None
+
+def test_trie_ignores_empty_components():
+    trie = PathTrie()
+    trie.add("/data//movies/a.mkv")
+    assert trie.find("/data/movies/").files == {"a.mkv"}
+    assert trie.find("//data/movies").files == {"a.mkv"}
+
+def test_trie_partial_prefixes_dont_match():
+    # /data/mov is not a prefix directory of /data/movies
+    trie = PathTrie()
+    trie.add("/data/movies/a.mkv")
+    assert trie.find("/data/mov") is None
+    assert trie.find("/data/movies/a.mkv/x") is None
+
+def test_orphans_in_nested_directories(tmp_path):
+    root = str(tmp_path)
+    make_tree(root, ["known.mkv", "stray.nfo", "show/s01/e01.mkv", "show/s01/e01.srt", "show/extra/bonus.mkv", "empty/"])
+    scanner = OrphanScanner(StatCache(), 4)
+    scanner.add_known(os.path.join(root, "known.mkv"))
+    scanner.add_known(os.path.join(root, "show", "s01", "e01.mkv"))
+    # show/extra has no known file under it at all
+    assert scan(scanner, [root]) == ["show/extra/bonus.mkv", "show/s01/e01.srt", "stray.nfo"]
+
+def test_partial_name_prefixes_are_orphans(tmp_path):
+    root = str(tmp_path)
+    make_tree(root, ["movies/a.mkv", "mov/a.mkv", "movies/a.mkv.part"])
+    scanner = OrphanScanner(StatCache(), 2)
+    scanner.add_known(os.path.join(root, "movies", "a.mkv"))
+    assert scan(scanner, [root]) == ["mov/a.mkv", "movies/a.mkv.part"]
+
+def test_ignore_files_and_trailing_separators(tmp_path):
+    root = str(tmp_path)
+    make_tree(root, ["a/known.mkv", "a/Thumbs.db", "a/stray.txt"])
+    stat_store = StatCache()
+    scanner = OrphanScanner(stat_store, 2)
+    scanner.add_known(os.path.join(root, "a", "known.mkv"))
+    assert scan(scanner, [root + os.sep, root], {"thumbs.db"}) == ["a/stray.txt", "a/stray.txt"]
+    # '/x/' and '/x' are one directory, listed once
+    assert sorted(stat_store.listings) == [root, os.path.join(root, "a")]
+
+def test_orphan_stats(tmp_path):
+    root = str(tmp_path)
+    make_tree(root, ["stray.nfo"])
+    scanner = OrphanScanner(StatCache(), 1)
+    scanner.list_trees([root])
+    [(directory, name, file_stat)] = list(scanner.orphans(root))
+    assert (directory, name, file_stat.st_size) == (root, "stray.nfo", len("stray.nfo"))
+
+def test_incremental_scan_reuses_unchanged_directories(tmp_path):
+    root = str(tmp_path / "data")
+    cache = str(tmp_path / "cache")
+    make_tree(root, ["known.mkv", "stray.nfo", "sub/known2.mkv", "sub/stray2.nfo"])
+    known = [os.path.join(root, "known.mkv"), os.path.join(root, "sub", "known2.mkv")]
+
+    def run(known):
+        stat_store = StatCache(os.path.join(cache, "stats.sqlite"), 7)
+        orphan_cache = OrphanCache(os.path.join(cache, "orphans.sqlite"), 7)
+        scanner = OrphanScanner(stat_store, 2, orphan_cache)
+        for path in known:
+            scanner.add_known(path)
+        found = scan(scanner, [root])
+        scanner.save()
+        stat_store.save()
+        stat_store.close()
+        orphan_cache.close()
+        return found, scanner.reused
+
+    assert run(known) == (["stray.nfo", "sub/stray2.nfo"], 0)
+    assert run(known) == (["stray.nfo", "sub/stray2.nfo"], 2)
+    # a torrent's file going away makes it an orphan, although no directory changed
+    assert run(known[:1]) == (["stray.nfo", "sub/known2.mkv", "sub/stray2.nfo"], 1)
+    # so does a new file in a directory
+    make_tree(root, ["sub/new.nfo"])
+    os.utime(os.path.join(root, "sub"), ns=(0, 0))  # in case the clock hasn't ticked
+    assert run(known[:1]) == (["stray.nfo", "sub/known2.mkv", "sub/new.nfo", "sub/stray2.nfo"], 1)
@@ -0,0 +1,77 @@
+import collections
+
+import pytest
+
+from src.torrentmanager import TorrentManager
+
+PAGE_SIZE = 8
+
+def sorted_hashes(mock):
+    return [h for h, _ in sorted(mock.torrents.items(), key=lambda item: item[1]["added_on"])]
+
+def run_paged(config, mock, change):
+    # get_torrents in pages of PAGE_SIZE, with change(mock) applied once the second
+    # page has been served; returns (torrents ingested, hashes built, in build order).
+    # No request may list the whole library at once.
+    config["page_size"] = PAGE_SIZE
+    served = []
+    torrents_info = mock.torrents_info
+    def paged_torrents_info(params):
+        assert params.get("limit") == str(PAGE_SIZE) or len(params["hashes"].split("|")) <= PAGE_SIZE
+        page = torrents_info(params)
+        served.append(params.get("offset"))
+        if served.count(str(PAGE_SIZE)) == 1 and params.get("offset") == str(PAGE_SIZE):
+            change(mock)
+        return page
+    mock.torrents_info = paged_torrents_info
+
+    manager = TorrentManager(True, True)
+    built = []
+    build_torrent_infos = manager._build_torrent_infos
+    def record(qb_torrents, fetched, progress=None):
+        built.extend(qb_torrents)
+        return build_torrent_infos(qb_torrents, fetched, progress)
+    manager._build_torrent_infos = record
+    manager.get_torrents()
+    return manager.torrent_info_list, built
+
+def assert_complete(torrent_info_list, built, expected):
+    assert [h for h, count in collections.Counter(built).items() if count > 1] == []
+    assert set(torrent_info_list) == set(built)
+    assert set(expected) <= set(torrent_info_list)
+
+def test_unchanged_library(config, mock_qbit):
+    torrent_info_list, built = run_paged(config, mock_qbit, lambda mock: None)
+    assert_complete(torrent_info_list, built, mock_qbit.torrents)
+    assert len(built) == len(mock_qbit.torrents)
+
+def test_removed_from_an_earlier_page(config, mock_qbit, capsys):
+    # every later torrent shifts up a place: the first one on the third page would
+    # slip into the already served second page
+    removed = sorted_hashes(mock_qbit)[0]
+    shifted = sorted_hashes(mock_qbit)[2 * PAGE_SIZE]
+    torrent_info_list, built = run_paged(config, mock_qbit, lambda mock: mock.torrents.pop(removed))
+    assert shifted in torrent_info_list
+    assert_complete(torrent_info_list, built, mock_qbit.torrents)
+    assert "1 torrent(s) shifted between pages" in capsys.readouterr().out
+
+def test_removed_from_a_later_page(config, mock_qbit):
+    removed = sorted_hashes(mock_qbit)[-1]
+    torrent_info_list, built = run_paged(config, mock_qbit, lambda mock: mock.torrents.pop(removed))
+    assert removed not in torrent_info_list
+    assert_complete(torrent_info_list, built, mock_qbit.torrents)
+
+@pytest.mark.parametrize("position", ["first", "last"])
+def test_added_mid_scan(config, mock_qbit, position):
+    # an old torrent (added_on before everything) shifts every page down, so the
+    # second page's last torrent is served again on the third; a new one lands last
+    added = "f" * 40
+    h = sorted_hashes(mock_qbit)[0 if position == "first" else -1]
+    fields = dict(mock_qbit.torrents[h], added_on=mock_qbit.torrents[h]["added_on"] + (-1 if position == "first" else 1))
+    def add(mock):
+        mock.torrents[added] = fields
+        mock.trackers[added] = mock.trackers[h]
+        mock.files[added] = mock.files[h]
+    torrent_info_list, built = run_paged(config, mock_qbit, add)
+    assert added in torrent_info_list
+    assert_complete(torrent_info_list, built, mock_qbit.torrents)
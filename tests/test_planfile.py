@@ -0,0 +1,114 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from src import util
+from src.planfile import PlanFile, AppliedLog, read_plan
+from src.torrentmanager import TorrentManager
+
+@pytest.fixture
+def manager(monkeypatch):
+    # just enough of a TorrentManager to apply plans of file operations, which don't
+    # talk to qBittorrent
+    monkeypatch.setattr(util, "Config_Manager", SimpleNamespace(get={"write_executor": {"max_in_flight": 4, "requests_per_second": 0}}.get))
+    manager = TorrentManager.__new__(TorrentManager)
+    manager.dry_run = False
+    manager.context = None
+    manager._build_client = lambda: None
+    return manager
+
+def write_plan(path, entries):
+    plan = PlanFile(path)
+    for op, fields in entries:
+        plan.append(op, **fields)
+    plan.close()
+
+def test_plan_round_trip(tmp_path):
+    path = str(tmp_path / "plans" / "plan.jsonl")
+    write_plan(path, [("remove_file", {"path": "/a"}), ("move_file", {"src": "/b", "dst": "/c"})])
+    header, entries = read_plan(path)
+    assert header["plan"] == 1
+    assert entries == [{"id": 1, "op": "remove_file", "path": "/a"}, {"id": 2, "op": "move_file", "src": "/b", "dst": "/c"}]
+
+def test_read_plan_rejects_other_versions(tmp_path):
+    path = tmp_path / "plan.jsonl"
+    path.write_text('{"plan": 99}\n')
+    with pytest.raises(ValueError):
+        read_plan(str(path))
+
+def test_applied_log(tmp_path):
+    path = str(tmp_path / "plan.jsonl")
+    log = AppliedLog(path)
+    assert log.load() == set()
+    log.mark(1)
+    log.mark(3)
+    log.close()
+    with open(AppliedLog.path_for(path), "a") as f:
+        f.write("4")  # cut short mid-line
+    with open(AppliedLog.path_for(path), "a") as f:
+        f.write("x\n")
+    assert AppliedLog(path).load() == {1, 3}
+
+def test_new_plan_forgets_applied(tmp_path):
+    path = str(tmp_path / "plan.jsonl")
+    write_plan(path, [("remove_file", {"path": "/a"})])
+    AppliedLog(path).mark(1)
+    write_plan(path, [("remove_file", {"path": "/a"})])
+    assert AppliedLog(path).load() == set()
+
+def test_resume_after_partial_apply(tmp_path, manager, capsys):
+    src, dst = tmp_path / "src", tmp_path / "dst"
+    (src / "sub").mkdir(parents=True)
+    for name in ("a", "b", "sub/c"):
+        (src / name).write_text(name)
+    path = str(tmp_path / "plan.jsonl")
+    write_plan(path, [
+        ("move_file", {"src": str(src / "a"), "dst": str(dst / "a")}),
+        ("remove_file", {"path": str(src / "b")}),
+        ("move_file", {"src": str(src / "sub" / "c"), "dst": str(dst / "c")}),
+        ("remove_empty_dirs", {"path": str(src)}),
+    ])
+
+    # c goes missing: its move fails, the rest of the plan applies
+    os.rename(src / "sub" / "c", tmp_path / "c")
+    manager.apply_plan(path)
+    assert "3 entries, 1 failed" in capsys.readouterr().out
+    assert AppliedLog(path).load() == {1, 2, 4}
+    assert (dst / "a").read_text() == "a" and not (src / "b").exists()
+
+    # back in place, a rerun only does what's left
+    os.rename(tmp_path / "c", src / "sub" / "c")
+    manager.apply_plan(path)
+    out = capsys.readouterr().out
+    assert "Resuming: 3 of 4 entries already applied." in out
+    assert "Applied 1 entries." in out
+    assert AppliedLog(path).load() == {1, 2, 3, 4}
+    assert (dst / "c").read_text() == "sub/c"
+
+    # and once everything is applied, nothing runs
+    manager.apply_plan(path)
+    assert "Applied 0 entries." in capsys.readouterr().out
+
+def test_entries_applied_but_not_marked_run_again(tmp_path, manager, capsys):
+    # an apply interrupted between an entry taking effect and it being marked
+    (tmp_path / "dst").mkdir()
+    (tmp_path / "dst" / "a").write_text("a")
+    path = str(tmp_path / "plan.jsonl")
+    write_plan(path, [
+        ("move_file", {"src": str(tmp_path / "a"), "dst": str(tmp_path / "dst" / "a")}),
+        ("remove_file", {"path": str(tmp_path / "gone")}),
+    ])
+    manager.apply_plan(path)
+    assert "Applied 2 entries." in capsys.readouterr().out
+    assert AppliedLog(path).load() == {1, 2}
+
+def test_dry_run_applies_nothing(tmp_path, manager, capsys):
+    (tmp_path / "a").write_text("a")
+    path = str(tmp_path / "plan.jsonl")
+    write_plan(path, [("remove_file", {"path": str(tmp_path / "a")})])
+    manager.dry_run = True
+    manager.apply_plan(path)
+    assert "[DRY RUN] Will apply 1 entries." in capsys.readouterr().out
+    assert (tmp_path / "a").exists()
+    assert AppliedLog(path).load() == set()
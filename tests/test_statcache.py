@@ -0,0 +1,115 @@
+import os
+from types import SimpleNamespace
+
+from src.hardlinks import HardlinkScanner
+from src.statcache import StatCache
+from src.torrentinfo import TorrentFiles
+
+def make_files(root, paths):
+    for path in paths:
+        full = os.path.join(root, path)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        with open(full, "w") as f:
+            f.write(path)
+
+def touch_directory(directory, seconds):
+    # set a directory's mtime outright, in case the clock hasn't ticked since it was listed
+    os.utime(directory, ns=(seconds * 10**9, seconds * 10**9))
+
+def persisted(cache_path, directory):
+    # a fresh run's snapshot listing of directory, and that run's cache
+    stat_store = StatCache(cache_path, 7)
+    return stat_store.listing(directory, snapshot=True), stat_store
+
+def test_snapshot_reused_while_mtime_matches(tmp_path):
+    root, cache_path = str(tmp_path / "data"), str(tmp_path / "stats.sqlite")
+    make_files(root, ["a.mkv", "sub/b.mkv"])
+    stat_store = StatCache(cache_path, 7)
+    listing = stat_store.listing(root, snapshot=True)
+    assert not listing.cached
+    stat_store.save()
+    stat_store.close()
+
+    listing, stat_store = persisted(cache_path, root + os.sep)
+    assert listing.cached
+    assert sorted(listing.files) == ["a.mkv"]
+    assert listing.subdirs == ["sub"]
+    assert stat_store.invalidations == 0
+    assert stat_store.confirmed == {root}
+
+def test_snapshot_invalidated_when_mtime_changes(tmp_path):
+    root, cache_path = str(tmp_path / "data"), str(tmp_path / "stats.sqlite")
+    make_files(root, ["a.mkv"])
+    touch_directory(root, 1000)
+    stat_store = StatCache(cache_path, 7)
+    stat_store.listing(root, snapshot=True)
+    stat_store.save()
+    stat_store.close()
+
+    # a new file changes the directory's mtime: the snapshot is out of date and the
+    # directory is listed again, and that listing is what the next run reuses
+    make_files(root, ["b.mkv"])
+    touch_directory(root, 2000)
+    listing, stat_store = persisted(cache_path, root)
+    assert not listing.cached
+    assert sorted(listing.files) == ["a.mkv", "b.mkv"]
+    assert stat_store.invalidations == 1
+    stat_store.save()
+    stat_store.close()
+
+    listing, stat_store = persisted(cache_path, root)
+    assert listing.cached
+    assert sorted(listing.files) == ["a.mkv", "b.mkv"]
+    assert stat_store.invalidations == 0
+
+def test_stat_never_uses_a_snapshot(tmp_path):
+    # a hardlink made elsewhere changes the file's link count but not its directory's
+    # mtime, so the snapshot still matches; stat() lists the directory again regardless
+    root, cache_path = str(tmp_path / "data"), str(tmp_path / "stats.sqlite")
+    make_files(root, ["a.mkv"])
+    stat_store = StatCache(cache_path, 7)
+    stat_store.listing(root, snapshot=True)
+    stat_store.save()
+    stat_store.close()
+
+    os.link(os.path.join(root, "a.mkv"), str(tmp_path / "a.mkv"))
+    listing, stat_store = persisted(cache_path, root)
+    assert listing.cached
+    assert listing.files["a.mkv"].st_nlink == 1
+    assert stat_store.stat(os.path.join(root, "a.mkv")).st_nlink == 2
+
+def test_forget_lists_again(tmp_path):
+    root = str(tmp_path)
+    make_files(root, ["a.mkv"])
+    stat_store = StatCache()
+    assert stat_store.stat(os.path.join(root, "b.mkv")) is None
+    make_files(root, ["b.mkv"])
+    # listings last for the run, until the run says it changed the directory
+    assert stat_store.stat(os.path.join(root, "b.mkv")) is None
+    stat_store.forget(root + os.sep)
+    assert stat_store.stat(os.path.join(root, "b.mkv")).st_size == len("b.mkv")
+    assert stat_store.stat(os.path.join(root, "missing", "c.mkv")) is None
+
+def test_hardlink_scan_after_a_snapshot(tmp_path):
+    # the hardlink stage goes through the same store: a link made since the snapshot
+    # was taken is still seen, on the largest file or any other
+    root, cache_path = str(tmp_path / "data"), str(tmp_path / "stats.sqlite")
+    make_files(root, ["a/a.mkv", "a/a.nfo", "b/b.mkv", "b/b.nfo", "c/c.mkv"])
+    stat_store = StatCache(cache_path, 7)
+    for directory in ("a", "b", "c"):
+        stat_store.listing(os.path.join(root, directory), snapshot=True)
+    stat_store.save()
+    stat_store.close()
+
+    os.link(os.path.join(root, "a", "a.mkv"), str(tmp_path / "a.mkv"))
+    os.link(os.path.join(root, "b", "b.nfo"), str(tmp_path / "b.nfo"))
+    stat_store = StatCache(cache_path, 7)
+    for directory in ("a", "b", "c"):
+        assert stat_store.listing(os.path.join(root, directory), snapshot=True).cached
+    torrents = [
+        SimpleNamespace(save_path_host=root, torrent_files=TorrentFiles([{"name": f"{x}/{x}.mkv", "size": 100}, {"name": f"{x}/{x}.nfo", "size": 1}]))
+        for x in ("a", "b", "c")
+    ]
+    scanner = HardlinkScanner(SimpleNamespace(stat_store=stat_store), 2)
+    assert scanner.scan(torrents) == 2
+    assert [torrent.is_hardlinked for torrent in torrents] == [True, True, False]
@@ -0,0 +1,40 @@
+from src.torrentmanager import TorrentManager
+
+UNREGISTERED = {"url": "https://tracker.example/announce", "tier": 0, "status": 4, "msg": "Unregistered torrent"}
+
+def run_cycles(config, mock, change, full_refresh_cycles=0):
+    # two sync/maindata cycles with change(mock, h) in between; returns the second
+    # cycle's TorrentInfo for the first torrent
+    config["full_refresh_cycles"] = full_refresh_cycles
+    manager = TorrentManager(True, True)
+    manager.get_torrents()
+    manager.commit_sync_state()
+    h = next(iter(mock.torrents))
+    assert not manager.torrent_info_list[h].is_unregistered
+    change(mock, h)
+    manager.get_torrents()
+    return manager.torrent_info_list[h]
+
+def unregister(mock, h):
+    mock.trackers[h] = mock.trackers[h][:3] + [UNREGISTERED]
+
+def test_tracker_change_refetches_trackers(config, mock_qbit):
+    # losing the working tracker shows in the delta, so its messages are read again
+    def change(mock, h):
+        unregister(mock, h)
+        mock.write(h, "tracker", "")
+    assert run_cycles(config, mock_qbit, change).is_unregistered
+
+def test_state_change_refetches_trackers(config, mock_qbit):
+    def change(mock, h):
+        unregister(mock, h)
+        mock.write(h, "state", "stalledDL")
+    assert run_cycles(config, mock_qbit, change).is_unregistered
+
+def test_message_only_change_waits_for_full_refresh(config, mock_qbit):
+    # a new tracker message alone isn't in the delta; it's picked up by the next full
+    # refresh (the staleness documented next to full_refresh_cycles)
+    assert not run_cycles(config, mock_qbit, unregister).is_unregistered
+
+def test_full_refresh_rereads_messages(config, mock_qbit):
+    assert run_cycles(config, mock_qbit, unregister, full_refresh_cycles=1).is_unregistered
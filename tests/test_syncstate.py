@@ -0,0 +1,121 @@
+from src.syncstate import SyncState
+
+class FakeQB:
+
+    # answers sync_maindata from a dict of rid -> response, recording the rids asked for
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.requested = []
+
+    def sync_maindata(self, rid):
+        self.requested.append(rid)
+        return self.responses[rid]
+
+def full(rid, torrents):
+    return {"rid": rid, "full_update": True, "torrents": torrents}
+
+def test_rid_advances_on_commit():
+    qb = FakeQB({
+        0: full(1, {"a": {"name": "a", "tags": ""}}),
+        1: {"rid": 2, "torrents": {"a": {"tags": "x"}}},
+        2: {"rid": 3},
+    })
+    state = SyncState()
+    assert state.update(qb) == ({"a"}, set())
+    state.commit()
+    assert state.update(qb) == ({"a"}, set())
+    state.commit()
+    assert state.update(qb) == (set(), set())
+    assert qb.requested == [0, 1, 2]
+
+def test_uncommitted_cycle_is_repeated():
+    # a cycle that fails after update() doesn't commit: the next update asks from the
+    # same rid, and still reports what the failed cycle was handed even though the
+    # mirror already holds it
+    qb = FakeQB({
+        0: full(1, {"a": {"name": "a", "tags": ""}, "b": {"name": "b", "tags": ""}}),
+        1: {"rid": 2, "torrents": {"a": {"tags": "x"}}, "torrents_removed": ["b"]},
+    })
+    state = SyncState()
+    state.update(qb)
+    state.commit()
+    assert state.update(qb) == ({"a"}, {"b"})
+    qb.responses[1] = full(3, {"a": {"name": "a", "tags": "x"}, "c": {"name": "c", "tags": ""}})
+    assert state.update(qb) == ({"a", "c"}, {"b"})
+    state.commit()
+    assert qb.requested == [0, 1, 1]
+    assert state.rid == 3
+
+def synced(*responses):
+    # a SyncState fed responses in order, committing after each; returns the state and
+    # what each update reported
+    qb = FakeQB({rid: response for rid, response in enumerate(responses)})
+    state = SyncState()
+    reported = []
+    for _ in responses:
+        reported.append(state.update(qb))
+        state.commit()
+    return state, reported
+
+def test_full_update():
+    state, reported = synced({
+        "rid": 1, "full_update": True,
+        "torrents": {"a": {"name": "a", "state": "uploading"}, "b": {"name": "b", "state": "pausedUP"}},
+        "categories": {"movies": {"name": "movies", "savePath": "/data/movies"}},
+        "tags": ["x", "y"],
+        "server_state": {"connection_status": "connected"},
+    })
+    assert reported == [({"a", "b"}, set())]
+    assert state.torrents == {"a": {"name": "a", "state": "uploading"}, "b": {"name": "b", "state": "pausedUP"}}
+    assert state.categories == {"movies": {"name": "movies", "savePath": "/data/movies"}}
+    assert state.tags == ["x", "y"]
+    assert state.server_state == {"connection_status": "connected"}
+
+def test_partial_delta_merges_fields():
+    state, reported = synced(
+        full(1, {"a": {"name": "a", "state": "uploading", "tags": "", "upspeed": 10}, "b": {"name": "b", "state": "uploading", "tags": "", "upspeed": 0}}),
+        {"rid": 2, "torrents": {"a": {"tags": "x"}, "b": {"upspeed": 5}, "c": {"name": "c", "state": "metaDL"}}},
+    )
+    # b changed only in a volatile field: merged, but not reported
+    assert reported[1] == ({"a", "c"}, set())
+    assert state.torrents == {
+        "a": {"name": "a", "state": "uploading", "tags": "x", "upspeed": 10},
+        "b": {"name": "b", "state": "uploading", "tags": "", "upspeed": 5},
+        "c": {"name": "c", "state": "metaDL"},
+    }
+
+def test_torrents_removed():
+    state, reported = synced(
+        full(1, {"a": {"name": "a"}, "b": {"name": "b"}}),
+        {"rid": 2, "torrents": {"b": {"name": "b2"}}, "torrents_removed": ["b", "z"]},
+    )
+    # a removed torrent isn't also reported as changed; unknown hashes are ignored
+    assert reported[1] == (set(), {"b"})
+    assert state.torrents == {"a": {"name": "a"}}
+
+def test_full_update_reports_differences():
+    # a full update after the first replaces the mirror and reports what differs from it
+    state, reported = synced(
+        full(1, {"a": {"name": "a", "state": "uploading", "upspeed": 1}, "b": {"name": "b", "state": "uploading"}, "c": {"name": "c"}}),
+        full(2, {"a": {"name": "a", "state": "uploading", "upspeed": 9}, "b": {"name": "b", "state": "pausedUP"}, "d": {"name": "d"}}),
+    )
+    assert reported[1] == ({"b", "d"}, {"c"})
+    assert set(state.torrents) == {"a", "b", "d"}
+    assert state.torrents["a"]["upspeed"] == 9
+
+def test_categories_and_tags_deltas():
+    state, _ = synced(
+        {"rid": 1, "full_update": True, "torrents": {}, "categories": {"movies": {"name": "movies", "savePath": ""}, "tv": {"name": "tv", "savePath": ""}}, "tags": ["x", "y"]},
+        {"rid": 2, "categories": {"movies": {"savePath": "/data/movies"}}, "categories_removed": ["tv"], "tags": ["y", "z"], "tags_removed": ["x"], "server_state": {"dl_info_speed": 3}},
+    )
+    assert state.categories == {"movies": {"name": "movies", "savePath": "/data/movies"}}
+    assert state.tags == ["y", "z"]
+    assert state.server_state == {"dl_info_speed": 3}
+
+def test_torrent_dict_restores_hash():
+    state, _ = synced(full(1, {"a": {"name": "a"}}))
+    torrent_dict = state.torrent_dict("a", None)
+    assert torrent_dict.hash == "a"
+    assert torrent_dict.name == "a"
+    assert "hash" not in state.torrents["a"]
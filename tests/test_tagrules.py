@@ -0,0 +1,83 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src.tagrules import TagRuleEngine, compile_rule
+
+def torrent(**fields):
+    # a stand-in TorrentInfo: attributes for INFO_FIELDS, torrent_dict for the rest
+    torrent_dict = fields.pop("torrent_dict", {})
+    attrs = {"is_unregistered": False, "is_tracker_error": False, "is_hardlinked": None, "tracker_name": None}
+    attrs.update(fields)
+    return SimpleNamespace(torrent_dict=torrent_dict, **attrs)
+
+@pytest.mark.parametrize("condition, value, expected", [
+    ({"eq": "TL"}, "TL", True),
+    ({"ne": "TL"}, "TL", False),
+    ({"gt": 5}, 6, True),
+    ({"gt": 5}, None, False),
+    ({"gte": 5}, 5, True),
+    ({"lt": 5}, 5, False),
+    ({"lte": 5}, 5, True),
+    ({"in": ["TL", "BTN"]}, "BTN", True),
+    ({"not_in": ["TL", "BTN"]}, "BTN", False),
+    ({"contains": "movies"}, "/data/movies/", True),
+    ({"contains": "movies"}, None, False),
+    ({"matches": "^/DATA/"}, "/data/movies/", True),
+    ({"gt": 5, "lt": 10}, 7, True),
+    ({"gt": 5, "lt": 10}, 10, False),
+    ("TL", "TL", True),
+    ("TL", "BTN", False),
+])
+def test_operators(condition, value, expected):
+    predicate = compile_rule({"tag": "t", "when": {"save_path_host": condition}})
+    assert predicate(torrent(save_path_host=value)) is expected
+
+def test_booleans_test_truthiness():
+    predicate = compile_rule({"tag": "t", "when": {"is_unregistered": True}})
+    assert predicate(torrent(is_unregistered=1))
+    assert not predicate(torrent(is_unregistered=None))
+    assert compile_rule({"tag": "t", "when": {"is_unregistered": False}})(torrent(is_unregistered=None))
+
+def test_torrent_dict_fields():
+    predicate = compile_rule({"tag": "t", "when": {"size": {"gt": 100}, "category": "tv"}})
+    assert predicate(torrent(torrent_dict={"size": 101, "category": "tv"}))
+    assert not predicate(torrent(torrent_dict={"size": 101, "category": "movies"}))
+    assert not predicate(torrent(torrent_dict={}))
+
+@pytest.mark.parametrize("rule, message", [
+    ({"tag": "t", "when": {"size": {"bigger": 1}}}, "unknown operator 'bigger'"),
+    ({"tag": "t", "when": {"tracker_name": {"matches": "("}}}, "invalid pattern"),
+    ({"tag": "t", "when": {}}, "needs a 'tag'"),
+    ({"when": {"size": 1}}, "needs a 'tag'"),
+])
+def test_invalid_rules(rule, message):
+    with pytest.raises(ValueError, match=message):
+        compile_rule(rule)
+
+def test_evaluate_adds_and_removes():
+    engine = TagRuleEngine([
+        {"tag": "#_big", "when": {"size": {"gt": 100}}},
+        {"tag": "#_big", "when": {"tracker_name": "BTN"}},
+    ])
+    active = engine.active_rules(set())
+    big = torrent(torrent_dict={"size": 101, "up_limit": 0})
+    add, remove = engine.evaluate(big, active)
+    assert "#_big" in add and "#_unregistered" in remove
+    # either rule for a tag is enough
+    add, _ = engine.evaluate(torrent(tracker_name="BTN", torrent_dict={"size": 1, "up_limit": 0}), active)
+    assert "#_big" in add
+    add, remove = engine.evaluate(torrent(is_unregistered=True, torrent_dict={"size": 1, "up_limit": 2048}), active)
+    assert add == ["#_unregistered", "#_throttled"] and "#_big" in remove
+
+def test_file_rules_need_their_feature():
+    engine = TagRuleEngine([{"tag": "#_rar", "when": {"is_rarred": True}}, {"tag": "#_tv", "when": {"category": "tv"}}])
+    assert engine.uses_files
+    tags = [tag for tag, _ in engine.active_rules(set())]
+    assert "#_tv" in tags and "#_rar" not in tags and "#_hardlink" not in tags
+    tags = [tag for tag, _ in engine.active_rules({"tag_rules", "hardlink"})]
+    assert "#_rar" in tags and "#_hardlink" in tags and "#_no_hardlink" in tags
+
+def test_torrent_fields_read_by_rules():
+    engine = TagRuleEngine([{"tag": "a", "when": {"size": 1, "tracker_name": "x"}}, {"tag": "b", "when": {"category": "tv", "size": 2}}])
+    assert engine.torrent_fields == ("size", "category")
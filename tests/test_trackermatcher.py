@@ -0,0 +1,55 @@
+from src.trackermatcher import TrackerMatcher
+
+TRACKERS = [
+    {"name": "BTN", "trackers": ["landof.tv"]},
+    {"name": "TL", "trackers": ["tleechreload", "torrentleech"]},
+    {"name": "sub", "trackers": ["leech"]},
+    {"name": "public", "trackers": ["opentracker", "tracker.example"]},
+]
+
+def test_match_by_substring():
+    matcher = TrackerMatcher(TRACKERS)
+    assert matcher.match(["https://landof.tv/abc/announce"])["name"] == "BTN"
+    assert matcher.match(["https://tracker.torrentleech.org/a/announce"])["name"] == "TL"
+
+def test_no_match():
+    matcher = TrackerMatcher(TRACKERS)
+    assert matcher.match(["udp://elsewhere.net:80/announce"]) is None
+    assert matcher.match([]) is None
+
+def test_earliest_entry_wins_over_position():
+    # "leech" matches earlier in the URL, but TL comes first in the file
+    matcher = TrackerMatcher(TRACKERS)
+    assert matcher.match(["https://leech.torrentleech.org/announce"])["name"] == "TL"
+
+def test_overlapping_patterns():
+    # "tleechreload" starts inside "torrentleech"; the lookahead finds both
+    matcher = TrackerMatcher([{"name": "a", "trackers": ["tleechreload"]}, {"name": "b", "trackers": ["torrentleech"]}])
+    assert matcher.match(["https://torrentleechreload.example/announce"])["name"] == "a"
+
+def test_earliest_entry_over_all_urls():
+    matcher = TrackerMatcher(TRACKERS)
+    urls = ["udp://opentracker.example:1337/announce", "https://landof.tv/announce"]
+    assert matcher.match(urls)["name"] == "BTN"
+
+def test_pattern_listed_twice_belongs_to_first_entry():
+    matcher = TrackerMatcher([{"name": "a", "trackers": ["x.org"]}, {"name": "b", "trackers": ["x.org", "y.org"]}])
+    assert matcher.match(["https://x.org/announce"])["name"] == "a"
+    assert matcher.match(["https://y.org/announce"])["name"] == "b"
+
+def test_patterns_are_literal():
+    matcher = TrackerMatcher([{"name": "a", "trackers": ["a.b"]}])
+    assert matcher.match(["https://axb/announce"]) is None
+    assert matcher.match(["https://a.b/announce"])["name"] == "a"
+
+def test_public_entry_and_empty_config():
+    assert TrackerMatcher(TRACKERS).public_entry["name"] == "public"
+    empty = TrackerMatcher([])
+    assert empty.public_entry is None
+    assert empty.match(["https://landof.tv/announce"]) is None
+
+def test_results_are_memoized():
+    matcher = TrackerMatcher(TRACKERS)
+    matcher.match(["https://landof.tv/announce"])
+    matcher.regex = None
+    assert matcher.match(["https://landof.tv/announce"])["name"] == "BTN"
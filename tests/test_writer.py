@@ -0,0 +1,91 @@
+import threading
+import time
+
+from src.writer import WriteExecutor, WriteTask, WriteReport
+
+def recorder():
+    # a task action factory that logs (name, "start"/"end") and can be held open
+    log, lock = [], threading.Lock()
+    def action(name, seconds=0.0, error=None):
+        def run(qb):
+            with lock:
+                log.append((name, "start"))
+            time.sleep(seconds)
+            with lock:
+                log.append((name, "end"))
+            if error is not None:
+                raise error
+            return name
+        return run
+    return log, action
+
+def position(log, name, event):
+    return log.index((name, event))
+
+def test_same_key_runs_in_order():
+    log, action = recorder()
+    tasks = [
+        WriteTask("tag", ["h1"], action("tag", 0.05)),
+        WriteTask("limit", ["h1"], action("limit", 0.02)),
+        WriteTask("delete", ["h1", "h2"], action("delete")),
+    ]
+    list(WriteExecutor(lambda: None, 4, 0).run(tasks))
+    assert position(log, "tag", "end") < position(log, "limit", "start")
+    assert position(log, "limit", "end") < position(log, "delete", "start")
+
+def test_unrelated_keys_overlap():
+    log, action = recorder()
+    tasks = [WriteTask("slow", ["h1"], action("slow", 0.1)), WriteTask("fast", ["h2"], action("fast"))]
+    results = [result for _, result, _ in WriteExecutor(lambda: None, 2, 0).run(tasks)]
+    assert results == ["fast", "slow"]
+    assert position(log, "fast", "end") < position(log, "slow", "end")
+
+def test_barrier_waits_for_everything_before_it():
+    log, action = recorder()
+    tasks = [
+        WriteTask("a", ["p1"], action("a", 0.05)),
+        WriteTask("b", ["p2"], action("b", 0.03)),
+        WriteTask("cleanup", [], action("cleanup"), barrier=True),
+        WriteTask("c", ["p3"], action("c")),
+    ]
+    list(WriteExecutor(lambda: None, 4, 0).run(tasks))
+    assert position(log, "a", "end") < position(log, "cleanup", "start")
+    assert position(log, "b", "end") < position(log, "cleanup", "start")
+    # and whatever comes after the barrier waits for it
+    assert position(log, "cleanup", "end") < position(log, "c", "start")
+
+def test_failures_are_reported_and_dont_block_the_key():
+    log, action = recorder()
+    tasks = [
+        WriteTask("tag", ["h1"], action("tag", error=RuntimeError("boom")), context=1),
+        WriteTask("delete", ["h1"], action("delete"), context=2),
+    ]
+    report = WriteReport()
+    outcomes = {task.context: error for task, _, error in WriteExecutor(lambda: None, 2, 0).run(tasks, report)}
+    assert isinstance(outcomes[1], RuntimeError) and outcomes[2] is None
+    assert position(log, "tag", "end") < position(log, "delete", "start")
+    assert report.succeeded == 1
+    assert [(task.description, str(error)) for task, error in report.failures] == [("tag", "boom")]
+
+def test_max_in_flight():
+    running, peak, lock = [0], [0], threading.Lock()
+    def action(qb):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.01)
+        with lock:
+            running[0] -= 1
+    tasks = [WriteTask(str(i), [str(i)], action) for i in range(20)]
+    list(WriteExecutor(lambda: None, 3, 0).run(tasks))
+    assert peak[0] <= 3
+
+def test_each_thread_builds_one_client():
+    built = []
+    def build_client():
+        built.append(threading.get_ident())
+        return object()
+    clients = set()
+    tasks = [WriteTask(str(i), [str(i)], lambda qb: clients.add(qb)) for i in range(50)]
+    list(WriteExecutor(build_client, 2, 0).run(tasks))
+    assert len(built) == len(set(built)) == len(clients) <= 2